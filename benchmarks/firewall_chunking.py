@@ -0,0 +1,90 @@
+"""Benchmark Prompt Guard scanning of long tool results across content sizes.
+
+Each size is scanned three ways with the same model: truncated to the first
+window, as the built-in LlamaFirewall scanner does; every window in its own
+forward pass; and every window in batched forward passes. The report shows the
+number of windows, the median latency of each way and the share of the content
+the truncated scan never looks at.
+
+The model must already be downloaded, for example by starting the firewall
+once or running `sre_agent/firewall/startup.sh`.
+
+Usage:
+    python benchmarks/firewall_chunking.py --sizes 1000 8000 32000 128000
+"""
+
+# ruff: noqa: E402
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections.abc import Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sre_agent.firewall.utils.prompt_guard import ChunkedPromptGuard
+
+MODEL_NAME = "meta-llama/Llama-Prompt-Guard-2-86M"
+LOG_LINE = (
+    "2025-06-01T12:00:{second:02d}Z INFO cartservice request_id={i} "
+    "GET /cart/{i} status=200 duration_ms={ms}\n"
+)
+
+
+def _content(chars: int) -> str:
+    lines: list[str] = []
+    while sum(len(line) for line in lines) < chars:
+        i = len(lines)
+        lines.append(LOG_LINE.format(second=i % 60, i=i, ms=i % 97))
+    return "".join(lines)[:chars]
+
+
+def _median_ms(run: Callable[[], object], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main(args: argparse.Namespace) -> None:
+    """Print the latency of each way of scanning at each content size."""
+    model_path = os.path.expanduser(
+        os.path.join(
+            os.environ.get("HF_HOME", "~/.cache/huggingface"),
+            MODEL_NAME.replace("/", "--"),
+        )
+    )
+    batched = ChunkedPromptGuard(model_path, batch_size=args.batch_size)
+    single = ChunkedPromptGuard(model_path, batch_size=1)
+
+    print(
+        f"{'chars':>8} {'windows':>8} {'truncated (ms)':>15} "
+        f"{'per window (ms)':>16} {'batched (ms)':>13} {'unscanned':>10}"
+    )
+    for size in args.sizes:
+        text = _content(size)
+        windows = len(batched.score(text).scores)
+        first = batched.score(text).spans[0][1]
+
+        truncated = _median_ms(lambda: batched.score(text[:first]), args.repeats)
+        per_window = _median_ms(lambda: single.score(text), args.repeats)
+        together = _median_ms(lambda: batched.score(text), args.repeats)
+        print(
+            f"{size:>8} {windows:>8} {truncated:>15.1f} {per_window:>16.1f} "
+            f"{together:>13.1f} {1 - first / len(text):>10.0%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 8000, 32000, 128000]
+    )
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=5)
+    main(parser.parse_args())
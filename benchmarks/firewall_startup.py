@@ -0,0 +1,110 @@
+"""Benchmark cold and warm firewall model startup.
+
+Each start runs in a fresh process and reports the time to get a verified local
+copy of the model, to load the tokenizer and classifier, and to run the warmup
+inference. A cold start uses an empty `HF_HOME` and so downloads the model; a
+warm start finds the copy verified by its manifest and loads it directly.
+
+Cold starts need network access and a Hugging Face token with access to the
+model.
+
+Usage:
+    python benchmarks/firewall_startup.py --warm 3 --cold 1 --verification hash
+"""
+
+# ruff: noqa: E402
+
+import argparse
+import json
+import os
+import statistics
+import subprocess  # nosec B404
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sre_agent.firewall.utils.model_store import Verification, ensure_model
+from sre_agent.firewall.utils.prompt_guard import ChunkedPromptGuard
+
+MODEL_NAME = "meta-llama/Llama-Prompt-Guard-2-86M"
+PHASES = ("verify", "load", "warmup", "total")
+
+
+def _start(args: argparse.Namespace) -> None:
+    """Start the classifier once and print the time of each phase as JSON."""
+    start = time.perf_counter()
+    path = ensure_model(MODEL_NAME, Verification(args.verification))
+    verified = time.perf_counter()
+    guard = ChunkedPromptGuard(path, backend=args.backend)
+    loaded = time.perf_counter()
+    guard.warmup()
+    done = time.perf_counter()
+    print(
+        json.dumps(
+            {
+                "verify": verified - start,
+                "load": loaded - verified,
+                "warmup": done - loaded,
+                "total": done - start,
+            }
+        )
+    )
+
+
+def _run(args: argparse.Namespace, hf_home: str) -> dict[str, float]:
+    command = [
+        sys.executable,
+        __file__,
+        "--child",
+        "--verification",
+        args.verification,
+        "--backend",
+        args.backend,
+    ]
+    output = subprocess.run(  # nosec B603
+        command,
+        env={**os.environ, "HF_HOME": hf_home},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    timings: dict[str, float] = json.loads(output.strip().splitlines()[-1])
+    return timings
+
+
+def main(args: argparse.Namespace) -> None:
+    """Print the median time of each startup phase for cold and warm starts."""
+    hf_home = os.path.expanduser(os.environ.get("HF_HOME", "~/.cache/huggingface"))
+    runs: dict[str, list[dict[str, float]]] = {"cold": [], "warm": []}
+    for _ in range(args.cold):
+        with tempfile.TemporaryDirectory() as empty:
+            runs["cold"].append(_run(args, empty))
+    # The first warm start may still need to download or write a manifest
+    _run(args, hf_home)
+    for _ in range(args.warm):
+        runs["warm"].append(_run(args, hf_home))
+
+    print(f"{'start':>6} " + " ".join(f"{phase + ' (s)':>11}" for phase in PHASES))
+    for name, timings in runs.items():
+        if timings:
+            medians = [statistics.median(t[phase] for t in timings) for phase in PHASES]
+            print(f"{name:>6} " + " ".join(f"{m:>11.2f}" for m in medians))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--warm", type=int, default=3)
+    parser.add_argument("--cold", type=int, default=0)
+    parser.add_argument(
+        "--verification", choices=[v.value for v in Verification], default="hash"
+    )
+    parser.add_argument("--backend", choices=["torch", "onnx"], default="torch")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parsed = parser.parse_args()
+    if parsed.child:
+        _start(parsed)
+    else:
+        main(parsed)
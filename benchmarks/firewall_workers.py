@@ -0,0 +1,137 @@
+"""Benchmark firewall throughput and memory with forked inference workers.
+
+Each level runs in a fresh process which loads the model once and either
+scores in-process (0 workers) or forks that many workers sharing the weights.
+Concurrent scans of a tool result go through the micro-batcher, as in the
+service. The report shows scans per second, the resident set size (RSS) of
+each worker, and the total proportional set size (PSS), which counts shared
+weights once, against what separate copies of the model would use.
+
+Memory figures are read from /proc and so need Linux.
+
+Usage:
+    python benchmarks/firewall_workers.py --workers 0 1 2 4 --scans 200
+"""
+
+# ruff: noqa: E402
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess  # nosec B404
+import sys
+import time
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sre_agent.firewall.utils.batching import MicroBatcher
+from sre_agent.firewall.utils.model_store import ensure_model
+from sre_agent.firewall.utils.prompt_guard import ChunkedPromptGuard
+from sre_agent.firewall.utils.workers import WorkerPool, memory
+
+MODEL_NAME = "meta-llama/Llama-Prompt-Guard-2-86M"
+TOOL_RESULT = (
+    "2025-06-01T12:00:01Z ERROR cartservice Can't access cart storage. "
+    "System.ApplicationException: Wasn't able to connect to redis\n"
+) * 20
+
+
+async def _scan_all(
+    pg: ChunkedPromptGuard,
+    batcher: MicroBatcher[list[int], float],
+    args: argparse.Namespace,
+) -> float:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def _scan() -> None:
+        async with semaphore:
+            inputs, _ = await asyncio.to_thread(pg.windows, TOOL_RESULT)
+            await batcher.submit(inputs)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_scan() for _ in range(args.scans)))
+    return time.perf_counter() - start
+
+
+async def _level(args: argparse.Namespace) -> dict[str, Any]:
+    pg = ChunkedPromptGuard(ensure_model(MODEL_NAME), batch_size=args.batch_size)
+    pool = None
+    if args.child:
+        pool = WorkerPool(pg, args.child)
+        pool.start()
+        batcher = MicroBatcher(
+            pool.infer,
+            max_batch_size=args.batch_size,
+            executor=pool.executor,
+            concurrency=args.child,
+        )
+    else:
+        pg.warmup()
+        batcher = MicroBatcher(pg.classify_windows, max_batch_size=args.batch_size)
+    batcher.start()
+    seconds = await _scan_all(pg, batcher, args)
+    result = {
+        "throughput": args.scans / seconds,
+        "parent": memory(os.getpid()),
+        "workers": list(pool.stats()["processes"].values()) if pool else [],
+    }
+    await batcher.close()
+    return result
+
+
+def _run(args: argparse.Namespace, workers: int) -> dict[str, Any]:
+    command = [
+        sys.executable,
+        __file__,
+        "--child",
+        str(workers),
+        "--scans",
+        str(args.scans),
+        "--concurrency",
+        str(args.concurrency),
+        "--batch-size",
+        str(args.batch_size),
+    ]
+    output = subprocess.run(  # nosec B603
+        command, capture_output=True, text=True, check=True
+    ).stdout
+    result: dict[str, Any] = json.loads(output.strip().splitlines()[-1])
+    return result
+
+
+def main(args: argparse.Namespace) -> None:
+    """Print throughput and memory at each number of workers."""
+    mib = 1024 * 1024
+    print(
+        f"{'workers':>8} {'scans/s':>8} {'worker RSS (MiB)':>24} "
+        f"{'total PSS (MiB)':>16} {'separate copies (MiB)':>22}"
+    )
+    for workers in args.workers:
+        result = _run(args, workers)
+        processes = result["workers"] or [result["parent"]]
+        rss = ", ".join(f"{p['rss'] / mib:.0f}" for p in processes)
+        pss = sum(p["pss"] for p in processes) + (
+            result["parent"]["pss"] if result["workers"] else 0
+        )
+        separate = result["parent"]["rss"] * (1 + len(result["workers"]))
+        print(
+            f"{workers:>8} {result['throughput']:>8.1f} {rss:>24} "
+            f"{pss / mib:>16.0f} {separate / mib:>22.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--scans", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    parsed = parser.parse_args()
+    if parsed.child is not None:
+        print(json.dumps(asyncio.run(_level(parsed))))
+    else:
+        main(parsed)
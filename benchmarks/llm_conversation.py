@@ -0,0 +1,160 @@
+"""Benchmark per-turn payload size and server CPU of stateless vs stateful turns.
+
+A diagnosis is simulated as a series of turns, each appending a tool call and
+a tool result to the history. For every turn the benchmark serialises the
+request the orchestrator would send, then validates and adapts it the way the
+LLM server does, with the Anthropic adapter and a stubbed provider call.
+
+Stateless turns send the whole history and the tool catalogue to `/generate`.
+Stateful turns send only the new messages to a conversation, which keeps the
+already adapted history.
+
+Usage:
+    python benchmarks/llm_conversation.py --turns 15 --result-chars 8000
+"""
+
+# ruff: noqa: E402
+
+import argparse
+import os
+import sys
+import time
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mcp.types import Tool
+
+from sre_agent.llm.utils.adapters import AnthropicTextGenerationPayloadAdapter
+from sre_agent.llm.utils.clients import BaseClient
+from sre_agent.llm.utils.conversations import ConversationStore
+from sre_agent.shared.schemas import (
+    ConversationPayload,
+    ConversationTurnPayload,
+    Message,
+    TextBlock,
+    TextGenerationPayload,
+    ToolCatalogPayload,
+)
+
+
+class StubAnthropicClient(BaseClient):
+    """The Anthropic adapters with the provider call stubbed out."""
+
+    payload_adapter = AnthropicTextGenerationPayloadAdapter
+
+    def complete(self, messages: list[Any], tools: list[Any]) -> Message:
+        """Return a fixed reply."""
+        return Message(id="1", model="stub", content=[TextBlock(text="ok")])
+
+
+def _tools(count: int) -> list[dict[str, Any]]:
+    schema = {
+        "type": "object",
+        "properties": {
+            name: {"type": "string", "description": f"The {name} to use."}
+            for name in ("name", "namespace", "container", "path", "ref")
+        },
+    }
+    return [
+        Tool(
+            name=f"tool_{i}", description="A tool. " * 20, inputSchema=schema
+        ).model_dump(mode="json")
+        for i in range(count)
+    ]
+
+
+def _turn(i: int, result_chars: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "role": "assistant",
+            "content": [
+                {"type": "tool_use", "id": f"t{i}", "name": "tool_0", "arguments": {}}
+            ],
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": f"t{i}",
+                    "name": "tool_0",
+                    "content": [{"type": "text", "text": "x" * result_chars}],
+                    "is_error": False,
+                }
+            ],
+        },
+    ]
+
+
+def _stateless(args: argparse.Namespace) -> tuple[int, float]:
+    client = StubAnthropicClient()
+    tools = _tools(args.tools)
+    messages = [{"role": "user", "content": [{"type": "text", "text": "Diagnose"}]}]
+    sent, cpu = 0, 0.0
+    for i in range(args.turns):
+        body = TextGenerationPayload.model_validate(
+            {"messages": messages, "tools": tools}
+        ).model_dump_json()
+        start = time.process_time()
+        client.generate(TextGenerationPayload.model_validate_json(body))
+        cpu += time.process_time() - start
+        sent += len(body)
+        messages += _turn(i, args.result_chars)
+    return sent, cpu
+
+
+def _stateful(args: argparse.Namespace) -> tuple[int, float]:
+    store = ConversationStore(StubAnthropicClient())
+    messages = [{"role": "user", "content": [{"type": "text", "text": "Diagnose"}]}]
+
+    catalog = ToolCatalogPayload.model_validate(
+        {"tools": _tools(args.tools)}
+    ).model_dump_json()
+    opening = ConversationPayload.model_validate(
+        {"catalog_id": "", "messages": messages}
+    ).model_dump_json()
+    start = time.process_time()
+    catalog_id = store.register_catalog(
+        ToolCatalogPayload.model_validate_json(catalog).tools
+    )
+    conversation_id = store.create(
+        catalog_id, ConversationPayload.model_validate_json(opening).messages
+    )
+    cpu = time.process_time() - start
+    sent = len(catalog) + len(opening)
+
+    new: list[dict[str, Any]] = []
+    for i in range(args.turns):
+        body = ConversationTurnPayload.model_validate(
+            {"messages": new}
+        ).model_dump_json()
+        start = time.process_time()
+        store.generate(
+            conversation_id, ConversationTurnPayload.model_validate_json(body).messages
+        )
+        cpu += time.process_time() - start
+        sent += len(body)
+        new = _turn(i, args.result_chars)
+    return sent, cpu
+
+
+def main(args: argparse.Namespace) -> None:
+    """Print the bytes sent and server CPU time of both modes."""
+    print(
+        f"{args.turns} turns, {args.tools} tools, "
+        f"{args.result_chars} characters per tool result"
+    )
+    print(f"{'mode':>9} {'sent (KB)':>10} {'server cpu (ms)':>16}")
+    for name, run in (("stateless", _stateless), ("stateful", _stateful)):
+        sent, cpu = run(args)
+        print(f"{name:>9} {sent / 1024:>10.0f} {cpu * 1000:>16.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=15)
+    parser.add_argument("--tools", type=int, default=20)
+    parser.add_argument("--result-chars", type=int, default=8000)
+    main(parser.parse_args())
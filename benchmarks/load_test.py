@@ -0,0 +1,445 @@
+"""Load test the orchestrator end to end against local stand-in servers.
+
+Every dependency of the orchestrator is replaced by a local stand-in, served
+from a separate process:
+
+- an SSE MCP server for each of Slack, GitHub, Kubernetes and the prompt
+  server, with the same tool names as the real ones, answering every call
+  after `--mcp-latency` seconds with a result of `--payload-bytes` bytes;
+- a scripted `/generate` LLM server, which requests the tools of one
+  `--script` step per turn and ends the diagnosis after the last step;
+- a stub firewall, allowing every `/check` and `/check_batch` item after
+  `--firewall-latency` seconds.
+
+The orchestrator runs in this process with its real lifespan, so its MCP
+session pool, HTTP clients, job queue and health checks are the production
+ones. `/diagnose` is driven over HTTP at each `--concurrency` level, with
+every request diagnosing a distinct namespace so none are coalesced or served
+from the tool cache.
+
+For each level the harness reports throughput, diagnosis latency
+percentiles, event-loop lag and the process RSS. Lag is how late a 10 ms
+sleep on the orchestrator's event loop wakes up: a few milliseconds means the
+loop is free, tens of milliseconds mean something is blocking it. The load
+generator shares the process, so the figures include its small overhead.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 1 4 16 --payload-bytes 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+import resource
+import socket
+import sys
+import time
+from collections.abc import Iterable
+from typing import Any
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from mcp.server.lowlevel import Server
+from mcp.server.sse import SseServerTransport
+from mcp.types import (
+    GetPromptResult,
+    Prompt,
+    PromptArgument,
+    PromptMessage,
+    TextContent,
+    Tool,
+)
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "sre_agent"))
+sys.path.insert(0, os.path.join(ROOT, "sre_agent", "client"))
+
+BEARER_TOKEN = "load-test"  # nosec B105
+SERVICE = "cartservice"
+LAG_INTERVAL = 0.01
+
+# The tools of each stand-in MCP server, named after the real servers' tools
+MCP_TOOLS = {
+    "kubernetes": ["list_pods", "get_logs"],
+    "github": ["get_file_contents", "create_issue"],
+    "slack": ["slack_post_message"],
+    "prompt-server": [],
+}
+# Tools which return the configured payload; the others acknowledge briefly
+PAYLOAD_TOOLS = {"list_pods", "get_logs", "get_file_contents"}
+DEFAULT_SCRIPT = ["list_pods", "get_logs,get_file_contents", "slack_post_message"]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def _payload(tool: str, namespace: str, size: int) -> str:
+    """Log-like lines adding up to `size` bytes."""
+    lines: list[str] = []
+    total = 0
+    while total < size:
+        i = len(lines)
+        line = (
+            f"2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z INFO {tool} "
+            f"{namespace}/{SERVICE}-{i % 7} request {i} served in {i % 97} ms"
+        )
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)[:size]
+
+
+def _mcp_app(name: str, tools: list[str], latency: float, payload_bytes: int) -> Any:
+    """A stand-in MCP server over SSE with the given tools."""
+    server: Server[Any, Any] = Server(name)
+
+    @server.list_tools()  # type: ignore[no-untyped-call, untyped-decorator]
+    async def list_tools() -> list[Tool]:
+        return [
+            Tool(
+                name=tool,
+                description=f"Stand-in for {tool}.",
+                inputSchema={"type": "object"},
+            )
+            for tool in tools
+        ]
+
+    @server.call_tool()  # type: ignore[no-untyped-call, untyped-decorator]
+    async def call_tool(tool: str, arguments: dict[str, Any]) -> list[TextContent]:
+        await asyncio.sleep(latency)
+        namespace = str(arguments.get("namespace", "default"))
+        text = (
+            _payload(tool, namespace, payload_bytes)
+            if tool in PAYLOAD_TOOLS
+            else f"{tool} done."
+        )
+        return [TextContent(type="text", text=text)]
+
+    @server.list_prompts()  # type: ignore[no-untyped-call, untyped-decorator]
+    async def list_prompts() -> list[Prompt]:
+        return [
+            Prompt(
+                name="diagnose",
+                arguments=[
+                    PromptArgument(name="service", required=True),
+                    PromptArgument(name="namespace"),
+                ],
+            )
+        ]
+
+    @server.get_prompt()  # type: ignore[no-untyped-call, untyped-decorator]
+    async def get_prompt(
+        prompt: str, arguments: dict[str, str] | None
+    ) -> GetPromptResult:
+        await asyncio.sleep(latency)
+        arguments = arguments or {}
+        text = (
+            f"Diagnose {arguments.get('service', SERVICE)} in namespace "
+            f"{arguments.get('namespace', 'default')}."
+        )
+        return GetPromptResult(
+            messages=[
+                PromptMessage(role="user", content=TextContent(type="text", text=text))
+            ]
+        )
+
+    sse = SseServerTransport("/messages/")
+
+    async def handle_sse(request: Request) -> Response:
+        async with sse.connect_sse(request.scope, request.receive, request._send) as (
+            read_stream,
+            write_stream,
+        ):
+            await server.run(
+                read_stream, write_stream, server.create_initialization_options()
+            )
+        return Response()
+
+    return Starlette(
+        routes=[
+            Route("/sse", endpoint=handle_sse, methods=["GET"]),
+            Mount("/messages/", app=sse.handle_post_message),
+        ]
+    )
+
+
+def _turn(messages: list[dict[str, Any]]) -> int:
+    return sum(message["role"] == "assistant" for message in messages)
+
+
+def _llm_app(script: list[list[str]], latency: float) -> FastAPI:
+    """A stand-in LLM server which follows the script, one step per turn."""
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health() -> dict[str, str]:
+        return {"status": "ok"}
+
+    @app.post("/generate")
+    async def generate(payload: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(latency)
+        messages = payload["messages"]
+        turn = _turn(messages)
+        prompt = messages[0]["content"][0].get("text", "")
+        match = re.search(r"namespace (\S+)\.", prompt)
+        namespace = match.group(1) if match else "default"
+
+        content: list[dict[str, Any]]
+        if turn < len(script):
+            content = [
+                {
+                    "type": "tool_use",
+                    "id": f"toolu_{turn}_{i}",
+                    "name": tool,
+                    "arguments": {"namespace": namespace, "name": SERVICE},
+                }
+                for i, tool in enumerate(script[turn])
+            ]
+            stop_reason = "tool_use"
+        else:
+            content = [{"type": "text", "text": "Diagnosis complete."}]
+            stop_reason = "end_turn"
+        return {
+            "id": f"msg_{turn}",
+            "model": "stand-in",
+            "content": content,
+            "stop_reason": stop_reason,
+            "usage": {"input_tokens": 1000 * (turn + 1), "output_tokens": 50},
+        }
+
+    return app
+
+
+def _firewall_app(latency: float) -> FastAPI:
+    """A stand-in firewall which allows everything."""
+    app = FastAPI()
+    allow = {
+        "block": False,
+        "result": {"decision": "allow", "reason": "default", "score": 0.0},
+    }
+
+    @app.get("/health")
+    async def health() -> dict[str, str]:
+        return {"status": "ok"}
+
+    @app.post("/check")
+    async def check(payload: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(latency)
+        return allow
+
+    @app.post("/check_batch")
+    async def check_batch(payload: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(latency)
+        return {"results": [allow for _ in payload["items"]]}
+
+    return app
+
+
+async def _serve(apps: Iterable[tuple[int, Any]]) -> None:
+    servers = [
+        uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error")
+        )
+        for port, app in apps
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def _serve_stand_ins(ports: dict[str, int], args: argparse.Namespace) -> None:
+    script = [step.split(",") for step in args.script]
+    apps = [
+        (
+            ports[name],
+            _mcp_app(name, tools, args.mcp_latency, args.payload_bytes),
+        )
+        for name, tools in MCP_TOOLS.items()
+    ]
+    apps.append((ports["llm"], _llm_app(script, args.llm_latency)))
+    apps.append((ports["firewall"], _firewall_app(args.firewall_latency)))
+    asyncio.run(_serve(apps))
+
+
+def _rss_mib() -> float:
+    """The current resident set size, or the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _sample_lag(samples: list[float]) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - start - LAG_INTERVAL))
+
+
+async def _run_level(
+    orchestrator: Any, client: httpx.AsyncClient, concurrency: int, requests: int
+) -> dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def _diagnose(i: int) -> float:
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                "/diagnose",
+                data={"text": SERVICE, "namespace": f"namespace-{concurrency}-{i}"},
+            )
+            response.raise_for_status()
+            job = orchestrator.STATE["jobs"].get(response.json()["job_id"])
+            await job.done.wait()
+            if job.status == "failed":
+                failures += 1
+            return time.perf_counter() - start
+
+    lag: list[float] = []
+    sampler = asyncio.create_task(_sample_lag(lag))
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(_diagnose(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+
+    return {
+        "throughput": requests / elapsed,
+        "latency": latencies,
+        "lag": lag,
+        "failures": failures,
+        "rss": _rss_mib(),
+    }
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            response = await client.get("/ready")
+            if response.status_code == httpx.codes.OK:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError("The orchestrator did not become ready in time.")
+        await asyncio.sleep(0.2)
+
+
+def _configure_orchestrator(ports: dict[str, int], args: argparse.Namespace) -> None:
+    """Point the orchestrator at the stand-ins through its environment."""
+    tools = [tool for tools in MCP_TOOLS.values() for tool in tools]
+    mcp_urls = ", ".join(
+        f'"{name}": "http://127.0.0.1:{ports[name]}/sse"' for name in MCP_TOOLS
+    )
+    os.environ.update(
+        {
+            "DEV_BEARER_TOKEN": BEARER_TOKEN,
+            "SLACK_SIGNING_SECRET": "load-test",
+            "SLACK_CHANNEL_ID": "load-test",
+            "SERVICES": f'["{SERVICE}"]',
+            "TOOLS": str(tools).replace("'", '"'),
+            "MCP_SERVER_URLS": f"{{{mcp_urls}}}",
+            "LLM_SERVER_URL": f"http://127.0.0.1:{ports['llm']}",
+            "FIREWALL_URL": f"http://127.0.0.1:{ports['firewall']}",
+            "LLM_CONVERSATIONS": "false",
+            "JOB_WORKERS": str(max(args.concurrency)),
+            "JOB_QUEUE_SIZE": str(args.requests or 4 * max(args.concurrency)),
+            "HEALTH_CHECK_INTERVAL": "1",
+            "RUN_STORE_PATH": ":memory:",
+        }
+    )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    ports = {name: _free_port() for name in [*MCP_TOOLS, "llm", "firewall"]}
+    stand_ins = multiprocessing.Process(
+        target=_serve_stand_ins, args=(ports, args), daemon=True
+    )
+    stand_ins.start()
+
+    # The orchestrator reads its configuration from the environment on import
+    _configure_orchestrator(ports, args)
+    import client as orchestrator  # type: ignore[import-not-found]  # noqa: PLC0415
+    from utils.runs import percentiles  # type: ignore  # noqa: PLC0415
+
+    # Health checks fail until the MCP sessions connect; only report errors
+    orchestrator.logger.setLevel(logging.ERROR)
+
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            orchestrator.app, host="127.0.0.1", port=port, log_level="warning"
+        )
+    )
+    serving = asyncio.create_task(server.serve())
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}",
+            headers={"Authorization": f"Bearer {BEARER_TOKEN}"},
+            timeout=None,
+            limits=httpx.Limits(max_connections=None),
+        ) as client:
+            await _wait_ready(client, timeout=60)
+
+            print(
+                f"MCP {args.mcp_latency * 1000:.0f} ms, LLM "
+                f"{args.llm_latency * 1000:.0f} ms, firewall "
+                f"{args.firewall_latency * 1000:.0f} ms, payload "
+                f"{args.payload_bytes} B, script {' | '.join(args.script)}"
+            )
+            print(
+                f"{'concurrency':>11} {'diag/s':>8} {'p50 (s)':>8} {'p90 (s)':>8} "
+                f"{'p99 (s)':>8} {'lag p99':>8} {'lag max':>8} {'RSS MiB':>8} "
+                f"{'failed':>6}"
+            )
+            for concurrency in args.concurrency:
+                result = await _run_level(
+                    orchestrator, client, concurrency, args.requests or 4 * concurrency
+                )
+                latency = percentiles(result["latency"])
+                lag = percentiles(result["lag"]) or {"p99": 0.0, "max": 0.0}
+                print(
+                    f"{concurrency:>11} {result['throughput']:>8.2f} "
+                    f"{latency['p50']:>8.3f} {latency['p90']:>8.3f} "
+                    f"{latency['p99']:>8.3f} {lag['p99'] * 1000:>6.1f}ms "
+                    f"{lag['max'] * 1000:>6.1f}ms {result['rss']:>8.1f} "
+                    f"{result['failures']:>6}"
+                )
+    finally:
+        server.should_exit = True
+        await serving
+        stand_ins.terminate()
+        stand_ins.join(timeout=5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument(
+        "--requests", type=int, default=0, help="Defaults to 4x concurrency."
+    )
+    parser.add_argument("--mcp-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--firewall-latency", type=float, default=0.02)
+    parser.add_argument("--payload-bytes", type=int, default=10_000)
+    parser.add_argument(
+        "--script",
+        nargs="+",
+        default=DEFAULT_SCRIPT,
+        help="The tools requested each turn; a comma separates parallel calls.",
+    )
+    asyncio.run(_main(parser.parse_args()))
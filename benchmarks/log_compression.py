@@ -0,0 +1,111 @@
+"""Benchmark log template compression of `get_logs` output on synthetic logs.
+
+Synthetic logs mimic a busy microservice: access logs, cache and database
+lines, periodic health checks, and a burst of errors with a stack trace. Each
+level reports the estimated token count before and after compression, using
+the common estimate of four characters per token, and the CPU time the
+compression adds.
+
+Usage:
+    python benchmarks/log_compression.py --lines 1000 5000 20000
+"""
+
+# ruff: noqa: E402
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "sre_agent"))
+sys.path.insert(0, os.path.join(ROOT, "sre_agent", "client"))
+
+from utils.logs import compress_logs  # type: ignore[import-not-found]
+
+CHARS_PER_TOKEN = 4
+STACK_TRACE = [
+    "Traceback (most recent call last):",
+    '  File "/app/cart/store.py", line 88, in get_cart',
+    "    return self.redis.hgetall(key)",
+    "redis.exceptions.ConnectionError: Error 111 connecting to redis:6379.",
+]
+
+
+def synthetic_logs(lines: int, seed: int = 0) -> list[str]:
+    """Generate timestamped log lines from a fixed mix of templates."""
+    rng = random.Random(seed)  # nosec B311
+    start = datetime(2024, 5, 1, 10, tzinfo=UTC)
+    paths = ["/cart", "/cart/checkout", "/product/{}", "/recommendations"]
+    out: list[str] = []
+    while len(out) < lines:
+        ts = (start + timedelta(milliseconds=len(out) * 137)).isoformat()
+        roll = rng.random()
+        if roll < 0.55:  # noqa: PLR2004
+            path = rng.choice(paths).format(rng.randint(1, 500))
+            out.append(
+                f"{ts} INFO GET {path} status=200 duration={rng.randint(2, 90)}ms "
+                f"user={rng.getrandbits(32):08x}"
+            )
+        elif roll < 0.75:  # noqa: PLR2004
+            out.append(
+                f"{ts} DEBUG cache {'hit' if rng.random() < 0.8 else 'miss'} "  # noqa: PLR2004
+                f"for key cart:{rng.getrandbits(48):012x}"
+            )
+        elif roll < 0.9:  # noqa: PLR2004
+            out.append(
+                f"{ts} INFO SELECT * FROM carts WHERE user_id = {rng.randint(1, 10**6)}"
+                f" took {rng.uniform(0.1, 40):.2f}ms"
+            )
+        elif roll < 0.97:  # noqa: PLR2004
+            out.append(f"{ts} INFO health check ok pod=cart-{rng.randint(0, 4)}")
+        else:
+            out.append(f"{ts} ERROR failed to load cart {rng.getrandbits(32):08x}")
+            out.extend(f"{ts} {line}" for line in STACK_TRACE)
+    return out[:lines]
+
+
+def _run_level(lines: int, repeats: int, similarity: float) -> dict[str, float]:
+    logs = synthetic_logs(lines)
+    raw = "\n".join(logs)
+    cpu_times = []
+    for _ in range(repeats):
+        start = time.process_time()
+        compressed, miner = compress_logs(logs, similarity_threshold=similarity)
+        cpu_times.append(time.process_time() - start)
+
+    raw_tokens = len(raw) / CHARS_PER_TOKEN
+    compressed_tokens = len(compressed) / CHARS_PER_TOKEN
+    return {
+        "templates": len(miner.templates),
+        "raw_tokens": raw_tokens,
+        "compressed_tokens": compressed_tokens,
+        "reduction": 1 - compressed_tokens / raw_tokens,
+        "cpu_ms": statistics.median(cpu_times) * 1000,
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    """Print a table of token reduction and CPU time per log size."""
+    print(
+        f"{'lines':>7} {'templates':>9} {'tokens in':>10} {'tokens out':>10} "
+        f"{'reduction':>9} {'cpu (ms)':>8}"
+    )
+    for lines in args.lines:
+        r = _run_level(lines, args.repeats, args.similarity)
+        print(
+            f"{lines:>7} {r['templates']:>9.0f} {r['raw_tokens']:>10.0f} "
+            f"{r['compressed_tokens']:>10.0f} {r['reduction']:>9.1%} "
+            f"{r['cpu_ms']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--similarity", type=float, default=0.5)
+    main(parser.parse_args())
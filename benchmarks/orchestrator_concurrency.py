@@ -0,0 +1,250 @@
+"""Benchmark orchestrator throughput for concurrent `/diagnose` requests.
+
+The LLM server and the firewall are replaced by stub servers running in a
+separate process, each answering after a fixed latency. The MCP servers are
+replaced by in-memory sessions. Every diagnosis makes one tool call, so it
+performs two LLM requests and four firewall checks.
+
+If the orchestrator's downstream calls overlap, throughput grows linearly with
+concurrency until a pool limit is reached. If they block the event loop,
+throughput stays flat. The job queue gets a worker per concurrent request, and
+every request diagnoses a distinct namespace so none are coalesced.
+
+Usage:
+    python benchmarks/orchestrator_concurrency.py --concurrency 1 2 4 8 16
+"""
+
+# ruff: noqa: E402
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import time
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "sre_agent"))
+sys.path.insert(0, os.path.join(ROOT, "sre_agent", "client"))
+
+BEARER_TOKEN = "benchmark"  # nosec B105
+SERVICE = "cartservice"
+
+os.environ.setdefault("DEV_BEARER_TOKEN", BEARER_TOKEN)
+os.environ.setdefault("SLACK_SIGNING_SECRET", "benchmark")
+os.environ.setdefault("SLACK_CHANNEL_ID", "benchmark")
+os.environ.setdefault("SERVICES", f'["{SERVICE}"]')
+os.environ.setdefault("TOOLS", '["list_pods"]')
+
+import client as orchestrator  # type: ignore[import-not-found]
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from mcp.types import (
+    CallToolResult,
+    GetPromptResult,
+    PromptMessage,
+    TextContent,
+    Tool,
+)
+from utils.http_clients import create_downstream_clients  # type: ignore
+from utils.jobs import JobQueue  # type: ignore
+from utils.runs import RunStore  # type: ignore
+from utils.schemas import ClientConfig, MCPServer, ServerSession  # type: ignore
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def _stub_app(latency: float) -> FastAPI:
+    """A stub for both the LLM server and the firewall."""
+    app = FastAPI()
+
+    @app.post("/generate")
+    async def generate(payload: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(latency)
+        last = payload["messages"][-1]["content"][0]
+        content: list[dict[str, Any]]
+        if last.get("type") == "tool_result":
+            content = [{"type": "text", "text": "Diagnosis complete."}]
+            stop_reason = "end_turn"
+        else:
+            content = [
+                {"type": "tool_use", "id": "1", "name": "list_pods", "arguments": {}}
+            ]
+            stop_reason = "tool_use"
+        return {
+            "id": "stub",
+            "model": "stub",
+            "content": content,
+            "stop_reason": stop_reason,
+            "usage": {"input_tokens": 100, "output_tokens": 10},
+        }
+
+    allow = {
+        "block": False,
+        "result": {"decision": "allow", "reason": "default", "score": 0.0},
+    }
+
+    @app.post("/check")
+    async def check(payload: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(latency)
+        return allow
+
+    @app.post("/check_batch")
+    async def check_batch(payload: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(latency)
+        return {"results": [allow for _ in payload["items"]]}
+
+    return app
+
+
+def _serve_stub(port: int, latency: float) -> None:
+    uvicorn.run(_stub_app(latency), host="127.0.0.1", port=port, log_level="error")
+
+
+class InMemorySession:
+    """An in-memory MCP session answering after a fixed latency."""
+
+    def __init__(self, latency: float) -> None:
+        """Set the latency of every request."""
+        self.latency = latency
+
+    async def get_prompt(
+        self, name: str, arguments: dict[str, str] | None = None
+    ) -> GetPromptResult:
+        """Return a fixed diagnosis prompt."""
+        await asyncio.sleep(self.latency)
+        return GetPromptResult(
+            messages=[
+                PromptMessage(
+                    role="user", content=TextContent(type="text", text="Diagnose.")
+                )
+            ]
+        )
+
+    async def call_tool(
+        self, name: str, arguments: dict[str, Any] | None = None
+    ) -> CallToolResult:
+        """Return a fixed tool result."""
+        await asyncio.sleep(self.latency)
+        return CallToolResult(content=[TextContent(type="text", text="pod-1 Running")])
+
+
+class InMemoryPool:
+    """A stand-in for the MCP session pool."""
+
+    def __init__(self, latency: float) -> None:
+        """Create a session and tool catalogue per server."""
+        tool = Tool(name="list_pods", inputSchema={"type": "object"})
+        self._sessions = {
+            server: ServerSession(tools=[tool], session=InMemorySession(latency))
+            for server in MCPServer
+        }
+
+    async def sessions(self, timeout: float | None = None) -> dict[Any, Any]:
+        """Return the in-memory sessions."""
+        return dict(self._sessions)
+
+
+async def _diagnose(client: httpx.AsyncClient, namespace: str) -> float:
+    start = time.perf_counter()
+    response = await client.post(
+        "/diagnose",
+        data={"text": SERVICE, "namespace": namespace},
+        headers={"Authorization": f"Bearer {BEARER_TOKEN}"},
+    )
+    response.raise_for_status()
+    await orchestrator.STATE["jobs"].get(response.json()["job_id"]).done.wait()
+    return time.perf_counter() - start
+
+
+async def _run_level(concurrency: int, requests: int) -> dict[str, float]:
+    jobs = JobQueue(
+        orchestrator.run_diagnosis_and_post, workers=concurrency, max_queued=requests
+    )
+    jobs.start()
+    orchestrator.STATE["jobs"] = jobs
+
+    transport = httpx.ASGITransport(app=orchestrator.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _bounded(i: int) -> float:
+            async with semaphore:
+                return await _diagnose(c, f"namespace-{i}")
+
+        start = time.perf_counter()
+        latencies = sorted(
+            await asyncio.gather(*(_bounded(i) for i in range(requests)))
+        )
+        elapsed = time.perf_counter() - start
+
+    await jobs.close()
+
+    return {
+        "throughput": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+
+async def _main(args: argparse.Namespace) -> None:
+    port = _free_port()
+    stub = multiprocessing.Process(
+        target=_serve_stub, args=(port, args.latency), daemon=True
+    )
+    stub.start()
+
+    url = f"http://127.0.0.1:{port}"
+    config = ClientConfig(
+        llm_server_url=url,
+        firewall_url=url,
+        llm_max_connections=args.max_connections,
+        firewall_max_connections=args.max_connections,
+    )
+    orchestrator.STATE["http"] = create_downstream_clients(config)
+    orchestrator.STATE["pool"] = InMemoryPool(args.latency)
+    orchestrator.STATE["tool_cache"] = None
+    orchestrator.STATE["runs"] = RunStore(":memory:")
+    orchestrator.logger.setLevel(logging.WARNING)
+
+    try:
+        async with httpx.AsyncClient() as probe:
+            for _ in range(100):
+                try:
+                    await probe.post(f"{url}/check", json={"content": ""})
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+
+        print(f"Downstream latency per call: {args.latency * 1000:.0f} ms")
+        print(f"{'concurrency':>11} {'diag/s':>8} {'p50 (s)':>8} {'p95 (s)':>8}")
+        for concurrency in args.concurrency:
+            result = await _run_level(concurrency, args.requests or 4 * concurrency)
+            print(
+                f"{concurrency:>11} {result['throughput']:>8.2f} "
+                f"{result['p50']:>8.3f} {result['p95']:>8.3f}"
+            )
+    finally:
+        await orchestrator.STATE["http"].aclose()
+        orchestrator.STATE["runs"].close()
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument(
+        "--requests", type=int, default=0, help="Defaults to 4x concurrency."
+    )
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-connections", type=int, default=20)
+    asyncio.run(_main(parser.parse_args()))
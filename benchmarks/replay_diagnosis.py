@@ -0,0 +1,151 @@
+"""Replay recorded diagnoses to compare the orchestrator across code changes.
+
+Traces are recorded by running the orchestrator with `TRACE_RECORD_DIR` set.
+Each replay runs `MCPClient.process_query` against stand-ins serving the
+trace: the MCP sessions answer prompts and tool calls from it, and the LLM
+server and firewall clients use an HTTP transport answering from it. Nothing
+leaves the process, so a replay measures the orchestrator's own overhead, or
+with `--latency` the recorded latencies added back.
+
+For each trace the script reports the recorded duration, the replay's wall
+clock and CPU time, its tokens and whether its result matches the recording.
+The settings which shape the requests, such as the tools offered and context
+compaction, are taken from the first trace unless set in the environment, so
+a change of setting can be replayed too. Every repeat must build the exact
+same messages, which is reported as deterministic. Requests which no longer
+match the recording, for example because a change altered a prompt, are
+answered with the next recording and counted as diverged.
+
+Usage:
+    python benchmarks/replay_diagnosis.py traces/*.jsonl.gz --repeat 5
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Any
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "sre_agent"))
+sys.path.insert(0, os.path.join(ROOT, "sre_agent", "client"))
+
+
+def _recorded_settings(path: str) -> dict[str, str]:
+    """Read the settings a trace was recorded with from its first line."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        settings: dict[str, str] = json.loads(f.readline()).get("settings", {})
+    return settings
+
+
+def _digest(messages: list[dict[str, Any]]) -> str:
+    def _default(value: Any) -> Any:
+        return value.model_dump() if hasattr(value, "model_dump") else str(value)
+
+    encoded = json.dumps(messages, sort_keys=True, default=_default)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+async def _replay(orchestrator: Any, trace: Any, latency: bool) -> dict[str, Any]:
+    replayer = trace.replayer(latency=latency)
+    http = orchestrator.DownstreamClients(
+        llm=httpx.AsyncClient(
+            transport=replayer.transport("llm"), base_url="http://llm-server"
+        ),
+        firewall=httpx.AsyncClient(
+            transport=replayer.transport("firewall"), base_url="http://firewall"
+        ),
+    )
+    metadata = trace.metadata
+    try:
+        async with orchestrator.MCPClient(http) as client:
+            client.sessions = replayer.sessions()
+            cpu = time.process_time()
+            start = time.perf_counter()
+            result = await client.process_query(
+                service=metadata["service"],
+                slack_channel_id=metadata["slack_channel_id"],
+                repo_url=metadata.get("repo_url"),
+                namespace=metadata.get("namespace"),
+                container=metadata.get("container"),
+            )
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu
+            messages = _digest(client.messages)
+    finally:
+        await http.aclose()
+
+    return {
+        "wall": wall,
+        "cpu": cpu,
+        "tokens": result["token_usage"]["total_tokens"],
+        "matches": result["response"] == trace.result.get("response")
+        and result["token_usage"] == trace.result.get("token_usage"),
+        "messages": messages,
+        "diverged": replayer.diverged,
+    }
+
+
+async def _main(args: argparse.Namespace) -> None:
+    os.environ.setdefault("DEV_BEARER_TOKEN", "replay")
+    os.environ.setdefault("SLACK_SIGNING_SECRET", "replay")
+    os.environ.setdefault("SLACK_CHANNEL_ID", "replay")
+    for variable, value in _recorded_settings(args.traces[0]).items():
+        os.environ.setdefault(variable, value)
+    # The orchestrator reads its configuration from the environment on import
+    import client as orchestrator  # type: ignore[import-not-found]  # noqa: PLC0415
+    from utils.replay import Trace  # type: ignore  # noqa: PLC0415
+
+    traces = [(path, Trace.load(path)) for path in args.traces]
+    orchestrator.logger.setLevel(logging.ERROR)
+
+    if not args.json:
+        print(
+            f"{'trace':<40} {'recorded':>9} {'wall p50':>9} {'cpu p50':>9} "
+            f"{'tokens':>7} {'matches':>7} {'determ.':>7} {'diverged':>8}"
+        )
+    for path, trace in traces:
+        runs = [
+            await _replay(orchestrator, trace, args.latency) for _ in range(args.repeat)
+        ]
+        summary = {
+            "trace": os.path.basename(path),
+            "recorded_seconds": trace.result.get("duration"),
+            "wall_seconds": statistics.median(run["wall"] for run in runs),
+            "cpu_seconds": statistics.median(run["cpu"] for run in runs),
+            "tokens": runs[0]["tokens"],
+            "matches": all(run["matches"] for run in runs),
+            "deterministic": len({run["messages"] for run in runs}) == 1,
+            "diverged": max(run["diverged"] for run in runs),
+        }
+        if args.json:
+            print(json.dumps(summary))
+            continue
+        recorded = summary["recorded_seconds"]
+        print(
+            f"{summary['trace'][:40]:<40} "
+            f"{f'{recorded:.3f}s' if recorded is not None else '-':>9} "
+            f"{summary['wall_seconds']:>8.3f}s {summary['cpu_seconds']:>8.3f}s "
+            f"{summary['tokens']:>7} {'yes' if summary['matches'] else 'no':>7} "
+            f"{'yes' if summary['deterministic'] else 'no':>7} "
+            f"{summary['diverged']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("traces", nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--latency", action="store_true", help="Wait the recorded latencies."
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON lines.")
+    asyncio.run(_main(parser.parse_args()))
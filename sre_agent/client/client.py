@@ -1,49 +1,139 @@
 """An MCP SSE Client for interacting with a server using the MCP protocol."""
 
 import time
-from asyncio import TimeoutError, wait_for
-from contextlib import AsyncExitStack
+from asyncio import Semaphore, TimeoutError, create_task, gather, to_thread, wait_for
+from collections.abc import AsyncGenerator
+from contextlib import AsyncExitStack, asynccontextmanager
 from functools import lru_cache
 from http import HTTPStatus
 from typing import Annotated, Any, cast
 
-import requests
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request, status
-from fastapi.responses import JSONResponse
-from mcp import ClientSession
-from mcp.client.sse import sse_client
+from fastapi import Depends, FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse, Response
 from mcp.shared.exceptions import McpError
 from mcp.types import GetPromptResult, TextContent
+from opentelemetry import trace
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from shared.logger import logger  # type: ignore[import-not-found]
+from shared.metrics import usage_tokens  # type: ignore[import-not-found]
 from shared.schemas import (  # type: ignore[import-not-found]
-    Message,
     MessageBlock,
     TextBlock,
-    TextGenerationPayload,
+    ToolUseBlock,
 )
+from shared.tracing import configure_tracing  # type: ignore[import-not-found]
 from utils.auth import is_request_valid  # type: ignore
-from utils.schemas import ClientConfig, MCPServer, ServerSession  # type: ignore
+from utils.cache import ToolResultCache  # type: ignore
+from utils.context import ContextCompactor, estimate_tokens  # type: ignore
+from utils.conversation import LLMConversation  # type: ignore
+from utils.health import HealthProber, http_check, mcp_check  # type: ignore
+from utils.http_clients import (  # type: ignore
+    DownstreamClients,
+    create_downstream_clients,
+)
+from utils.jobs import JobQueue, QueueFullError  # type: ignore
+from utils.logs import compress_logs  # type: ignore
+from utils.metrics import (  # type: ignore
+    DIAGNOSES_COALESCED,
+    DIAGNOSES_IN_PROGRESS,
+    DIAGNOSIS_DURATION,
+    LLM_REQUEST_DURATION,
+    LLM_TOKENS,
+    TOOL_CALL_DURATION,
+)
+from utils.pool import MCPSessionPool  # type: ignore
+from utils.replay import record_trace, replayed_settings  # type: ignore
+from utils.runs import RunStore  # type: ignore
+from utils.schemas import (  # type: ignore
+    ClientConfig,
+    MCPServer,
+    ServerSession,
+    ToolOutcome,
+)
 
 load_dotenv()
 
 PORT = 3001
 END_TURN = "end_turn"
 
+STATE: dict[str, Any] = {}
+
+TRACER = trace.get_tracer(__name__)
+
 
 @lru_cache
 def _get_client_config() -> ClientConfig:
     return ClientConfig()
 
 
+def _server_url(service: MCPServer) -> str:
+    urls: dict[str, str] = _get_client_config().mcp_server_urls
+    return urls.get(service, f"http://{service}:{PORT}/sse")
+
+
+def _tool_call_message(content: ToolUseBlock) -> str:
+    """Describe a tool call for logs and the firewall."""
+    return f"Calling tool {content.name} with args: {content.arguments}"
+
+
+def _compress_logs_result(result_content: list[Any]) -> list[Any]:
+    """Replace the text of a `get_logs` result with its mined log templates.
+
+    The raw result is kept if compressing it would not make it shorter.
+    """
+    texts = [item.text for item in result_content if isinstance(item, TextContent)]
+    if not texts:
+        return result_content
+
+    start = time.process_time()
+    compressed, miner = compress_logs(
+        (line for text in texts for line in text.splitlines()),
+        similarity_threshold=_get_client_config().log_similarity_threshold,
+    )
+    raw_chars = sum(len(text) for text in texts)
+    logger.info(
+        "Compressed %d log lines into %d templates (%d -> %d chars) in %.1f ms",
+        miner.lines,
+        len(miner.templates),
+        raw_chars,
+        len(compressed),
+        (time.process_time() - start) * 1000,
+    )
+    if len(compressed) >= raw_chars:
+        return result_content
+
+    return [
+        TextContent(type="text", text=compressed),
+        *(item for item in result_content if not isinstance(item, TextContent)),
+    ]
+
+
 class MCPClient:
     """An MCP client for connecting to a server using SSE transport."""
 
-    def __init__(self) -> None:
-        """Initialise the MCP client and set up the LLM API client."""
+    def __init__(
+        self, http: DownstreamClients, tool_cache: ToolResultCache | None = None
+    ) -> None:
+        """Initialise the MCP client with the shared downstream HTTP clients.
+
+        Args:
+            http: The connection pools to the LLM server and the firewall.
+            tool_cache: An optional cache of read-only tool results shared
+                between clients.
+        """
+        self.http = http
+        self.tool_cache = tool_cache
         self.sessions: dict[MCPServer, ServerSession] = {}
         self.messages: list[dict[str, Any]] = []
         self.stop_reason: str | None = None
+        # Fallback data: capture latest logs content to ensure a minimal response
+        self.logs_fallback_text: str | None = None
+        self.logs_fallback_meta: dict[str, Any] | None = None
+        # The time spent waiting on firewall checks, for the run breakdown
+        self.firewall_seconds = 0.0
+        # The service being diagnosed, for labelling metrics
+        self.service = "unknown"
 
     async def __aenter__(self) -> "MCPClient":
         """Set up AsyncExitStack when entering the context manager."""
@@ -76,55 +166,57 @@ class MCPClient:
         Returns:
             True if the input is blocked, False otherwise.
         """
-        logger.info("Running text through Llama Firewall")
-
-        response = requests.post(
-            "http://llama-firewall:8000/check",
-            json={"content": text, "is_tool": is_tool},
-            timeout=60,
-        )
-
-        response.raise_for_status()
-
-        json_data = cast(dict[str, Any], response.json())
-
-        result, block = json_data["result"], cast(bool, json_data["block"])
+        (block,) = await self._run_firewall_checks([text], is_tool=is_tool)
+        return block
 
-        logger.info("Llama Firewall result: %s", "BLOCKED" if block else "ALLOWED")
+    async def _run_firewall_checks(
+        self, texts: list[str], is_tool: bool = False
+    ) -> list[bool]:
+        """Check several texts against the Llama Firewall in a single request.
 
-        if block:
-            self.messages.append({"role": "assistant", "content": result["reason"]})
-            self.stop_reason = END_TURN
-        return block
+        If any text is blocked, the reason for the first block is added to the
+        messages and the turn is ended.
 
-    async def connect_to_sse_server(self, service: MCPServer) -> None:
-        """Connect to an MCP server running with SSE transport."""
-        server_url = f"http://{service}:{PORT}/sse"
-        logger.info(f"Connecting to SSE server: {server_url}")
+        Args:
+            texts: The texts to check.
+            is_tool: Whether these are tool-related checks.
 
-        logger.info("Creating SSE client context")
-        stream_ctx = sse_client(url=server_url)
-        streams = await self.exit_stack.enter_async_context(stream_ctx)
+        Returns:
+            Whether each text is blocked, in the order of the texts.
+        """
+        if not texts:
+            return []
+
+        logger.info("Running %d texts through Llama Firewall", len(texts))
+        start = time.perf_counter()
+
+        with TRACER.start_as_current_span(
+            "firewall.check", attributes={"items": len(texts), "is_tool": is_tool}
+        ) as span:
+            response = await self.http.firewall.post(
+                "/check_batch",
+                json={
+                    "items": [{"content": text, "is_tool": is_tool} for text in texts]
+                },
+            )
 
-        logger.info("Creating MCP client session")
-        session = ClientSession(*streams)
-        session = await self.exit_stack.enter_async_context(session)
+            response.raise_for_status()
 
-        logger.info(f"Initialising session for {server_url}")
-        await session.initialize()
+            results = cast(list[dict[str, Any]], response.json()["results"])
+            blocks = [cast(bool, result["block"]) for result in results]
+            span.set_attribute("blocked", sum(blocks))
+        self.firewall_seconds += time.perf_counter() - start
 
-        logger.info(f"Initialised SSE client for {server_url}")
-        logger.debug("Listing available tools")
-        response = await session.list_tools()
-        tools = response.tools
-        tool_names = [tool.name for tool in tools]
         logger.info(
-            "Connected to %s with tools: %s",
-            server_url,
-            tool_names,
+            "Llama Firewall result: %s",
+            ", ".join("BLOCKED" if block else "ALLOWED" for block in blocks),
         )
 
-        self.sessions[service] = ServerSession(tools=tools, session=session)
+        if any(blocks):
+            reason = results[blocks.index(True)]["result"]["reason"]
+            self.messages.append({"role": "assistant", "content": reason})
+            self.stop_reason = END_TURN
+        return blocks
 
     async def _get_prompt(  # noqa: PLR0913
         self,
@@ -146,12 +238,13 @@ class MCPClient:
         # Drop optional keys that were not provided to satisfy strict typing
         clean_arguments = {k: v for k, v in prompt_arguments.items() if v is not None}
 
-        prompt: GetPromptResult = await self.sessions[
-            MCPServer.PROMPT
-        ].session.get_prompt(
-            "diagnose",
-            arguments=clean_arguments,
-        )
+        with TRACER.start_as_current_span("prompt.fetch"):
+            prompt: GetPromptResult = await self.sessions[
+                MCPServer.PROMPT
+            ].session.get_prompt(
+                "diagnose",
+                arguments=clean_arguments,
+            )
 
         if isinstance(prompt.messages[0].content, TextContent):
             return MessageBlock(
@@ -163,6 +256,259 @@ class MCPClient:
                 f"{type(prompt.messages[0].content)} is invalid for this agent."
             )
 
+    def _find_session(self, tool_name: str) -> ServerSession:
+        """Return the session of the server which provides a tool."""
+        for session in self.sessions.values():
+            if tool_name in [tool.name for tool in session.tools]:
+                return session
+        logger.error(f"Tool {tool_name} not found in available tools")
+        raise ValueError(f"Tool {tool_name} not found in available tools.")
+
+    def _capture_logs_fallback(self, tool_args: Any, result_content: Any) -> None:
+        """Keep an excerpt of a `get_logs` result for a minimal fallback response."""
+        try:
+            extracted_texts: list[str] = []
+            for item in result_content:
+                item_type = getattr(item, "type", None)
+                if item_type is None and isinstance(item, dict):
+                    item_type = item.get("type")
+                if item_type == "text":
+                    item_text = (
+                        getattr(item, "text", None)
+                        if not isinstance(item, dict)
+                        else item.get("text")
+                    )
+                    if isinstance(item_text, str) and item_text.strip():
+                        extracted_texts.append(item_text)
+            if extracted_texts:
+                joined = "\n".join(extracted_texts)
+                # Keep excerpt for fallback
+                lines = joined.splitlines()
+                self.logs_fallback_text = "\n".join(lines[:200])
+                # Preserve useful meta from the call
+                if isinstance(tool_args, dict):
+                    self.logs_fallback_meta = {
+                        k: v
+                        for k, v in tool_args.items()
+                        if k in {"namespace", "container", "name", "tail", "timestamps"}
+                    }
+        except Exception as _e:  # noqa: BLE001
+            # Non-fatal; fallback only
+            logger.debug("Failed to extract logs fallback text: %s", _e)
+
+    async def _execute_tool(self, content: ToolUseBlock) -> ToolOutcome:
+        """Run a single tool call on the MCP server which provides the tool.
+
+        Args:
+            content: The tool use block requested by the LLM.
+
+        Returns:
+            The outcome of the call.
+        """
+        tool_name = content.name
+        tool_args = content.arguments
+
+        session = self._find_session(tool_name)
+        logger.info(_tool_call_message(content))
+        try:
+            tool_start_time = time.perf_counter()
+            with TRACER.start_as_current_span(
+                "tool.call", attributes={"tool": tool_name}
+            ) as span:
+                result = await session.session.call_tool(
+                    tool_name, cast(dict[str, str], tool_args)
+                )
+                span.set_attribute("is_error", bool(result.isError))
+            tool_duration = time.perf_counter() - tool_start_time
+            logger.info("Tool %s call took %.2f seconds", tool_name, tool_duration)
+        except McpError as e:
+            TOOL_CALL_DURATION.labels(self.service, tool_name, "error").observe(
+                time.perf_counter() - tool_start_time
+            )
+            error_msg = (
+                "Tool '"
+                + str(tool_name)
+                + "' failed with error: "
+                + str(e)
+                + ". Tool args were: "
+                + str(tool_args)
+                + ". Check the arguments and try again "
+                "fixing the error."
+            )
+            logger.info(error_msg)
+            return ToolOutcome(
+                content=content,
+                result_content=[TextBlock(type="text", text=error_msg)],
+                is_error=True,
+                duration=time.perf_counter() - tool_start_time,
+            )
+
+        TOOL_CALL_DURATION.labels(
+            self.service, tool_name, "error" if result.isError else "ok"
+        ).observe(tool_duration)
+        result_content: list[Any] = result.content
+        # Capture logs for fallback if available and successful
+        if tool_name == "get_logs" and not result.isError:
+            self._capture_logs_fallback(tool_args, result.content)
+            if _get_client_config().compress_logs:
+                result_content = _compress_logs_result(result.content)
+
+        return ToolOutcome(
+            content=content,
+            result_content=result_content,
+            is_error=result.isError,
+            duration=tool_duration,
+        )
+
+    async def _execute_tools(
+        self, tool_uses: list[ToolUseBlock], semaphore: Semaphore | None = None
+    ) -> list[ToolOutcome]:
+        """Run tool calls, concurrently where allowed.
+
+        Consecutive calls to tools which have not opted out of concurrency run
+        together, bounded by the configured limit. A call to an opted-out tool,
+        such as posting to Slack, runs on its own once every earlier call has
+        finished, and before any later call starts.
+
+        Args:
+            tool_uses: The tool use blocks in the order the LLM returned them.
+            semaphore: Bounds the calls running at once, shared with other
+                calls of the same turn; by default a new one.
+
+        Returns:
+            The outcomes in the same order as the tool use blocks.
+        """
+        config = _get_client_config()
+        semaphore = semaphore or Semaphore(config.tool_concurrency)
+
+        async def _bounded(content: ToolUseBlock) -> ToolOutcome:
+            async with semaphore:
+                return await self._execute_tool(content)
+
+        segments: list[list[ToolUseBlock]] = []
+        for content in tool_uses:
+            if (
+                not segments
+                or content.name in config.sequential_tools
+                or segments[-1][0].name in config.sequential_tools
+            ):
+                segments.append([content])
+            else:
+                segments[-1].append(content)
+
+        outcomes: list[ToolOutcome] = []
+        for segment in segments:
+            outcomes.extend(await gather(*(_bounded(c) for c in segment)))
+        return outcomes
+
+    def _cached_outcomes(self, tool_uses: list[ToolUseBlock]) -> dict[int, ToolOutcome]:
+        """Return the outcomes of the calls the tool result cache can answer.
+
+        Args:
+            tool_uses: The tool use blocks in the order the LLM returned them.
+
+        Returns:
+            The cached outcomes, keyed by the index of their tool use block.
+        """
+        cached: dict[int, ToolOutcome] = {}
+        for i, content in enumerate(tool_uses):
+            logger.info(f"LLM requested to use tool: {content.name}")
+            # A cached result passed both firewall checks for this exact call
+            result_content = (
+                self.tool_cache.get(content.name, content.arguments)
+                if self.tool_cache
+                else None
+            )
+            if result_content is not None:
+                logger.info("Tool %s served from cache", content.name)
+                if content.name == "get_logs":
+                    self._capture_logs_fallback(content.arguments, result_content)
+                cached[i] = ToolOutcome(content=content, result_content=result_content)
+        return cached
+
+    async def _call_tools(self, tool_uses: list[ToolUseBlock]) -> list[ToolOutcome]:
+        """Run the tool calls of a single LLM turn behind the firewall.
+
+        Calls answered by the tool result cache skip the firewall, as their
+        results already passed it. The remaining calls are checked with one
+        firewall request, and their results with one more request once they
+        have all finished. Calls to allowlisted read-only tools which come
+        before any other call start while the first check runs; if it blocks,
+        they are cancelled and their results are never used, as they are if
+        the check fails. Every other call waits for the check, and sequential
+        tools also wait for every earlier call to finish.
+
+        Args:
+            tool_uses: The tool use blocks in the order the LLM returned them.
+
+        Returns:
+            The outcomes in the same order as the tool use blocks or, if a
+            firewall check blocked the turn, only the blocked outcome.
+        """
+        cached = self._cached_outcomes(tool_uses)
+        pending = [c for i, c in enumerate(tool_uses) if i not in cached]
+
+        config = _get_client_config()
+        semaphore = Semaphore(config.tool_concurrency)
+        speculative: list[ToolUseBlock] = []
+        for content in pending:
+            if content.name not in config.speculative_tools:
+                break
+            speculative.append(content)
+        rest = pending[len(speculative) :]
+        fallback = (self.logs_fallback_text, self.logs_fallback_meta)
+        speculation = create_task(self._execute_tools(speculative, semaphore))
+
+        try:
+            blocks = await self._run_firewall_checks(
+                [_tool_call_message(content) for content in pending], is_tool=True
+            )
+            if any(blocks):
+                logger.info("Discarding %d speculative tool calls", len(speculative))
+                speculation.cancel()
+                await gather(speculation, return_exceptions=True)
+                self.logs_fallback_text, self.logs_fallback_meta = fallback
+                return [ToolOutcome(content=pending[blocks.index(True)], blocked=True)]
+
+            # Sequential tools wait for every earlier call, speculative or not
+            split = next(
+                (
+                    i
+                    for i, content in enumerate(rest)
+                    if content.name in config.sequential_tools
+                ),
+                len(rest),
+            )
+            started, others = await gather(
+                speculation, self._execute_tools(rest[:split], semaphore)
+            )
+            executed = (
+                started + others + await self._execute_tools(rest[split:], semaphore)
+            )
+        finally:
+            # Never leave speculative calls running past a failed check
+            speculation.cancel()
+            await gather(speculation, return_exceptions=True)
+
+        blocks = await self._run_firewall_checks(
+            [str(outcome.result_content) for outcome in executed], is_tool=True
+        )
+        if any(blocks):
+            blocked = executed[blocks.index(True)]
+            return [ToolOutcome(content=blocked.content, blocked=True)]
+
+        if self.tool_cache:
+            for outcome in executed:
+                if not outcome.is_error:
+                    self.tool_cache.put(
+                        outcome.content.name,
+                        outcome.content.arguments,
+                        outcome.result_content,
+                    )
+
+        remaining = iter(executed)
+        return [cached.get(i) or next(remaining) for i in range(len(tool_uses))]
+
     async def process_query(  # noqa: C901, PLR0912, PLR0915, PLR0913
         self,
         service: str,
@@ -172,6 +518,7 @@ class MCPClient:
         container: str | None = None,
     ) -> dict[str, Any]:
         """Process a query using Claude and available tools."""
+        self.service = service
         query = await self._get_prompt(
             service,
             slack_channel_id,
@@ -188,7 +535,7 @@ class MCPClient:
 
         available_tools = []
 
-        for service, session in self.sessions.items():
+        for session in self.sessions.values():
             available_tools.extend(
                 [
                     tool.model_dump()
@@ -199,10 +546,6 @@ class MCPClient:
 
         final_text = []
 
-        # Fallback data: capture latest logs content to ensure a minimal response
-        logs_fallback_text: str | None = None
-        logs_fallback_meta: dict[str, Any] | None = None
-
         # Track token usage
         total_input_tokens = 0
         total_output_tokens = 0
@@ -210,189 +553,148 @@ class MCPClient:
         total_cache_read_tokens = 0
 
         tool_retries = 0
+        turns: list[dict[str, Any]] = []
 
-        while (
-            self.stop_reason != END_TURN
-            and tool_retries < _get_client_config().max_tool_retries
-        ):
-            logger.info("Sending request to the LLM")
-            llm_start_time = time.perf_counter()
-
-            payload = TextGenerationPayload(
-                messages=self.messages, tools=available_tools
-            ).model_dump(mode="json")
-
-            logger.debug(payload)
-
-            response = requests.post(
-                "http://llm-server:8000/generate", json=payload, timeout=60
-            )
-
-            response.raise_for_status()
-
-            llm_response = Message(**response.json())
+        config = _get_client_config()
+        compactor = ContextCompactor(
+            config.context_token_budget,
+            keep_recent_turns=config.context_keep_recent_turns,
+            excerpt_chars=config.context_excerpt_chars,
+        )
+        tools_tokens = estimate_tokens(available_tools)
+        conversation = LLMConversation(
+            self.http.llm, available_tools, stateful=config.llm_conversations
+        )
 
-            logger.debug(llm_response)
+        try:
+            while (
+                self.stop_reason != END_TURN
+                and tool_retries < _get_client_config().max_tool_retries
+            ):
+                context = compactor.compact(self.messages, reserved_tokens=tools_tokens)
+                logger.info(
+                    "Context for turn %d: ~%d tokens before compaction, ~%d after "
+                    "(%d tool results compacted)",
+                    context.turn,
+                    context.tokens_before,
+                    context.tokens_after,
+                    context.compacted,
+                )
 
-            llm_duration = time.perf_counter() - llm_start_time
-            logger.info(f"LLM request took {llm_duration:.2f} seconds")
-            self.stop_reason = llm_response.stop_reason
+                logger.info("Sending request to the LLM")
+                llm_start_time = time.perf_counter()
 
-            # Track token usage from this response
-            if llm_response.usage:
-                total_input_tokens += llm_response.usage.input_tokens
-                total_output_tokens += llm_response.usage.output_tokens
-                if llm_response.usage.cache_creation_input_tokens:
-                    total_cache_creation_tokens += (
-                        llm_response.usage.cache_creation_input_tokens
-                    )
-                if llm_response.usage.cache_read_input_tokens:
-                    total_cache_read_tokens += (
-                        llm_response.usage.cache_read_input_tokens
+                with TRACER.start_as_current_span(
+                    "llm.turn", attributes={"turn": context.turn}
+                ) as span:
+                    llm_response = await conversation.generate(
+                        self.messages, rewritten=context.compacted > 0
                     )
-
-            assistant_message_content = []
-
-            for content in llm_response.content:
-                if content.type == "text":
-                    final_text.append(content.text)
-                    logger.debug(f"LLM response: {content.text}")
-                elif content.type == "tool_use":
-                    tool_name = content.name
-                    tool_args = content.arguments
-                    logger.info(f"LLM requested to use tool: {tool_name}")
-
-                    tool_call_msg = f"Calling tool {tool_name} with args: {tool_args}"
-                    if await self._run_firewall_check(
-                        tool_call_msg,
-                        is_tool=True,
-                    ):
-                        break
-
-                    for service, session in self.sessions.items():
-                        if tool_name in [tool.name for tool in session.tools]:
-                            logger.info(tool_call_msg)
-                            try:
-                                tool_start_time = time.perf_counter()
-                                result = await session.session.call_tool(
-                                    tool_name, cast(dict[str, str], tool_args)
-                                )
-                                tool_duration = time.perf_counter() - tool_start_time
-                                logger.info(
-                                    "Tool %s call took %.2f seconds",
-                                    tool_name,
-                                    tool_duration,
-                                )
-                                result_content = result.content
-                                is_error = result.isError
-
-                                # Capture logs for fallback if available and successful
-                                if tool_name == "get_logs" and not is_error:
-                                    try:
-                                        extracted_texts: list[str] = []
-                                        for item in result_content:
-                                            item_type = getattr(item, "type", None)
-                                            if item_type is None and isinstance(
-                                                item, dict
-                                            ):
-                                                item_type = item.get("type")
-                                            if item_type == "text":
-                                                item_text = (
-                                                    getattr(item, "text", None)
-                                                    if not isinstance(item, dict)
-                                                    else item.get("text")
-                                                )
-                                                if (
-                                                    isinstance(item_text, str)
-                                                    and item_text.strip()
-                                                ):
-                                                    extracted_texts.append(item_text)
-                                        if extracted_texts:
-                                            joined = "\n".join(extracted_texts)
-                                            # Keep excerpt for fallback
-                                            lines = joined.splitlines()
-                                            first_two_hundred_lines = lines[:200]
-                                            excerpt = "\n".join(
-                                                first_two_hundred_lines,
-                                            )
-                                            logs_fallback_text = excerpt
-                                            # Preserve useful meta from the call
-                                            if isinstance(tool_args, dict):
-                                                logs_fallback_meta = {
-                                                    k: v
-                                                    for k, v in tool_args.items()
-                                                    if k
-                                                    in {
-                                                        "namespace",
-                                                        "container",
-                                                        "name",
-                                                        "tail",
-                                                        "timestamps",
-                                                    }
-                                                }
-                                    except Exception as _e:  # noqa: BLE001
-                                        # Non-fatal; fallback only
-                                        logger.debug(
-                                            "Failed to extract logs fallback text: %s",
-                                            _e,
-                                        )
-
-                                if await self._run_firewall_check(
-                                    str(result_content), is_tool=True
-                                ):
-                                    break
-
-                                tool_retries = 0
-
-                            except McpError as e:
-                                error_msg = (
-                                    "Tool '"
-                                    + str(tool_name)
-                                    + "' failed with error: "
-                                    + str(e)
-                                    + ". Tool args were: "
-                                    + str(tool_args)
-                                    + ". Check the arguments and try again "
-                                    "fixing the error."
-                                )
-                                logger.info(error_msg)
-                                result_content = [
-                                    TextBlock(
-                                        type="text",
-                                        text=error_msg,
-                                    )
-                                ]
-                                is_error = True
-                                tool_retries += 1
-                            break
-                    else:
-                        logger.error(f"Tool {tool_name} not found in available tools")
-                        raise ValueError(
-                            f"Tool {tool_name} not found in available tools."
+                    span.set_attribute("model", llm_response.model)
+                    if llm_response.usage:
+                        span.set_attributes(
+                            {
+                                f"tokens.{kind}": tokens
+                                for kind, tokens in usage_tokens(
+                                    llm_response.usage
+                                ).items()
+                            }
                         )
 
-                    tool_call_tag = f"[Calling tool {tool_name} with args {tool_args}]"
-                    final_text.append(tool_call_tag)
+                logger.debug(llm_response)
+
+                llm_duration = time.perf_counter() - llm_start_time
+                logger.info(f"LLM request took {llm_duration:.2f} seconds")
+                LLM_REQUEST_DURATION.labels(
+                    service, conversation.provider, llm_response.model
+                ).observe(llm_duration)
+                self.stop_reason = llm_response.stop_reason
+                turn: dict[str, Any] = {
+                    "turn": context.turn,
+                    "model": llm_response.model,
+                    "llm_seconds": llm_duration,
+                    "tokens": (
+                        usage_tokens(llm_response.usage) if llm_response.usage else {}
+                    ),
+                    "firewall_seconds": 0.0,
+                    "tools": [],
+                }
+                turns.append(turn)
+
+                # Track token usage from this response
+                if llm_response.usage:
+                    for kind, tokens in usage_tokens(llm_response.usage).items():
+                        LLM_TOKENS.labels(
+                            service, conversation.provider, llm_response.model, kind
+                        ).inc(tokens)
+                    total_input_tokens += llm_response.usage.input_tokens
+                    total_output_tokens += llm_response.usage.output_tokens
+                    if llm_response.usage.cache_creation_input_tokens:
+                        total_cache_creation_tokens += (
+                            llm_response.usage.cache_creation_input_tokens
+                        )
+                    if llm_response.usage.cache_read_input_tokens:
+                        total_cache_read_tokens += (
+                            llm_response.usage.cache_read_input_tokens
+                        )
 
-                    assistant_message_content.append(content)
-                    self.messages.append(
-                        {"role": "assistant", "content": assistant_message_content}
+                tool_uses: list[ToolUseBlock] = []
+
+                for content in llm_response.content:
+                    if content.type == "text":
+                        final_text.append(content.text)
+                        logger.debug(f"LLM response: {content.text}")
+                    elif content.type == "tool_use":
+                        tool_uses.append(content)
+
+                if not tool_uses:
+                    continue
+
+                firewall_before = self.firewall_seconds
+                outcomes = await self._call_tools(tool_uses)
+                turn["firewall_seconds"] = self.firewall_seconds - firewall_before
+                turn["tools"] = [
+                    {
+                        "name": outcome.content.name,
+                        "seconds": outcome.duration,
+                        "result_chars": len(str(outcome.result_content)),
+                        "is_error": outcome.is_error,
+                        "blocked": outcome.blocked,
+                    }
+                    for outcome in outcomes
+                ]
+                if any(outcome.blocked for outcome in outcomes):
+                    break
+
+                for outcome in outcomes:
+                    tool_retries = tool_retries + 1 if outcome.is_error else 0
+                    final_text.append(
+                        f"[Calling tool {outcome.content.name} with args "
+                        f"{outcome.content.arguments}]"
                     )
 
-                    self.messages.append(
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "tool_result",
-                                    "tool_use_id": content.id,
-                                    "name": tool_name,
-                                    "content": [i.model_dump() for i in result_content],
-                                    "is_error": is_error,
-                                }
-                            ],
-                        }
-                    )
+                self.messages.append(
+                    {"role": "assistant", "content": [o.content for o in outcomes]}
+                )
+                self.messages.append(
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "tool_result",
+                                "tool_use_id": outcome.content.id,
+                                "name": outcome.content.name,
+                                "content": [
+                                    i.model_dump() for i in outcome.result_content
+                                ],
+                                "is_error": outcome.is_error,
+                            }
+                            for outcome in outcomes
+                        ],
+                    }
+                )
+        finally:
+            await conversation.close()
 
         total_duration = time.perf_counter() - start_time
         logger.info(
@@ -403,10 +705,10 @@ class MCPClient:
         logger.info("Query processing completed")
         # Ensure a minimal response using logs if the LLM response was empty
         aggregated_text = "\n".join(final_text).strip()
-        if not aggregated_text and logs_fallback_text:
-            ns = (logs_fallback_meta or {}).get("namespace")
-            container = (logs_fallback_meta or {}).get("container")
-            pod = (logs_fallback_meta or {}).get("name")
+        if not aggregated_text and self.logs_fallback_text:
+            ns = (self.logs_fallback_meta or {}).get("namespace")
+            container = (self.logs_fallback_meta or {}).get("container")
+            pod = (self.logs_fallback_meta or {}).get("name")
             header_parts = []
             if ns:
                 header_parts.append(f"namespace={ns}")
@@ -419,7 +721,7 @@ class MCPClient:
                 if header_parts
                 else "Logs-only fallback summary"
             )
-            aggregated_text = f"{header}\n\n{logs_fallback_text}"
+            aggregated_text = f"{header}\n\n{self.logs_fallback_text}"
         elif not aggregated_text:
             aggregated_text = (
                 "No diagnostics available. No logs or code insights could be retrieved."
@@ -436,21 +738,93 @@ class MCPClient:
             },
             "timing": {
                 "total_duration": total_duration,
+                "firewall_duration": self.firewall_seconds,
             },
+            "context": [report.to_dict() for report in compactor.reports],
+            "turns": turns,
         }
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    """A context manager for the REST application.
+
+    On start-up the application opens a pool of long-lived sessions to the MCP
+    servers and keep-alive HTTP connection pools to the LLM server and the
+    firewall, which every diagnosis shares instead of connecting on its own.
+    """
+    pool = MCPSessionPool(
+        {server: _server_url(server) for server in MCPServer},
+        max_backoff=_get_client_config().mcp_max_backoff,
+    )
+    tracer_provider = configure_tracing("orchestrator")
+    pool.start()
+    STATE["pool"] = pool
+    STATE["http"] = create_downstream_clients(_get_client_config())
+    STATE["tool_cache"] = ToolResultCache(
+        _get_client_config().tool_cache_ttls,
+        max_entries=_get_client_config().tool_cache_max_entries,
+    )
+    STATE["jobs"] = JobQueue(
+        run_diagnosis_and_post,
+        workers=_get_client_config().job_workers,
+        max_queued=_get_client_config().job_queue_size,
+        max_history=_get_client_config().job_history,
+    )
+    STATE["jobs"].start()
+    STATE["runs"] = RunStore(
+        _get_client_config().run_store_path,
+        max_runs=_get_client_config().run_store_max_runs,
+    )
+    config = _get_client_config()
+    STATE["health"] = HealthProber(
+        {
+            **{
+                str(server): mcp_check(connection, config.health_check_timeout)
+                for server, connection in pool.connections.items()
+            },
+            "llm-server": http_check(STATE["http"].llm),
+            "llama-firewall": http_check(STATE["http"].firewall),
+        },
+        interval=config.health_check_interval,
+        timeout=config.health_check_timeout,
+    )
+    STATE["health"].start()
+
+    yield
+
+    await STATE["health"].close()
+    await STATE["jobs"].close()
+    STATE["runs"].close()
+    await pool.close()
+    await STATE["http"].aclose()
+    if tracer_provider:
+        tracer_provider.shutdown()
+    STATE.clear()
+
+
 app: FastAPI = FastAPI(
-    description="A REST API for the SRE Agent orchestration service."
+    description="A REST API for the SRE Agent orchestration service.",
+    lifespan=lifespan,
 )
 
 
+def _diagnosis_key(
+    service: str,
+    repo_url: str | None,
+    namespace: str | None,
+    container: str | None,
+) -> tuple[str, str | None, str | None, str | None]:
+    """The key under which duplicate diagnosis requests are coalesced."""
+    return (service, namespace, container, repo_url)
+
+
 async def run_diagnosis_and_post(
     service: str,
     repo_url: str | None = None,
     namespace: str | None = None,
     container: str | None = None,
-) -> None:
+) -> dict[str, Any]:
     """Run diagnosis for a service and post results back to Slack.
 
     Args:
@@ -458,83 +832,140 @@ async def run_diagnosis_and_post(
         repo_url: Optional GitHub repository URL to override org/repo/root.
         namespace: Optional Kubernetes namespace for scoping diagnostics.
         container: Optional container name to target within the pod.
+
+    Returns:
+        The diagnosis result.
     """
     timeout = _get_client_config().query_timeout
-    try:
-        async with MCPClient() as client:
-            logger.info(f"Creating MCPClient for service: {service}")
-            try:
-                for server in MCPServer:
-                    await client.connect_to_sse_server(service=server)
-
-                if not all(server in client.sessions for server in MCPServer):
-                    missing = [s.name for s in MCPServer if s not in client.sessions]
-                    logger.error(
-                        "MCP Client failed to establish required server sessions: "
-                        f"{', '.join(missing)}"
+    started_at = time.time()
+    start_time = time.perf_counter()
+    outcome = "error"
+    result: dict[str, Any] | None = None
+    DIAGNOSES_IN_PROGRESS.labels(service).inc()
+    # The root span of the diagnosis; downstream services join it through the
+    # traceparent header the HTTP clients add to each request
+    with TRACER.start_as_current_span(
+        "diagnosis",
+        attributes={
+            "service": service,
+            "namespace": namespace or "",
+            "container": container or "",
+        },
+    ):
+        config = _get_client_config()
+        try:
+            async with (
+                record_trace(
+                    config.trace_record_dir,
+                    {
+                        "service": service,
+                        "repo_url": repo_url,
+                        "namespace": namespace,
+                        "container": container,
+                        "slack_channel_id": config.slack_channel_id,
+                        "settings": replayed_settings(config),
+                    },
+                ) as recorder,
+                # A recorded diagnosis calls every tool, so its trace has them all
+                MCPClient(
+                    STATE["http"], None if recorder else STATE["tool_cache"]
+                ) as client,
+            ):
+                logger.info(f"Creating MCPClient for service: {service}")
+                try:
+                    with TRACER.start_as_current_span("mcp.connect"):
+                        client.sessions = await STATE["pool"].sessions(
+                            timeout=config.mcp_connect_timeout
+                        )
+                    if recorder:
+                        client.sessions = recorder.wrap_sessions(client.sessions)
+                    logger.info("MCPClient attached to pooled sessions.")
+
+                except Exception as conn_err:
+                    logger.exception(
+                        f"Failed to connect MCPClient sessions: {conn_err}"
                     )
                     # TODO: Post error back to Slack?
-                    return
-
-                logger.info("MCPClient connections established successfully.")
+                    raise
+
+                async def _run_diagnosis(mcp_client: MCPClient) -> dict[str, Any]:
+                    """Inner function to run the actual diagnosis query."""
+                    result = await mcp_client.process_query(
+                        service=service,
+                        slack_channel_id=_get_client_config().slack_channel_id,
+                        repo_url=repo_url,
+                        namespace=namespace,
+                        container=container,
+                    )
 
-            except Exception as conn_err:
-                logger.exception(f"Failed to connect MCPClient sessions: {conn_err}")
-                # TODO: Post error back to Slack?
-                return
+                    tu = result["token_usage"]
+                    logger.info(
+                        "Token usage - Input: %s, Output: %s, Cache Creation: %s, "
+                        "Cache Read: %s, Total: %s",
+                        tu["input_tokens"],
+                        tu["output_tokens"],
+                        tu["cache_creation_tokens"],
+                        tu["cache_read_tokens"],
+                        tu["total_tokens"],
+                    )
+                    logger.info("Query processed successfully")
+                    logger.info(f"Diagnosis result for {service}: {result['response']}")
+                    return result
+
+                result = await wait_for(_run_diagnosis(client), timeout=timeout)
+                outcome = "ok"
+                if recorder:
+                    recorder.result = {
+                        "response": result["response"],
+                        "token_usage": result["token_usage"],
+                        "duration": result["timing"]["total_duration"],
+                    }
+                return result
 
-            async def _run_diagnosis(mcp_client: MCPClient) -> dict[str, Any]:
-                """Inner function to run the actual diagnosis query."""
-                result = await mcp_client.process_query(
-                    service=service,
-                    slack_channel_id=_get_client_config().slack_channel_id,
-                    repo_url=repo_url,
+        except TimeoutError:
+            outcome = "timeout"
+            logger.error(
+                f"Diagnosis duration exceeded maximum timeout of {timeout} seconds for "
+                f"service {service}"
+            )
+            # TODO: Post error back to Slack?
+            raise
+        except Exception as e:
+            logger.exception(f"Error during background diagnosis for {service}: {e}")
+            # TODO: Post error back to Slack?
+            raise
+        finally:
+            DIAGNOSES_IN_PROGRESS.labels(service).dec()
+            duration = time.perf_counter() - start_time
+            DIAGNOSIS_DURATION.labels(service, outcome).observe(duration)
+            try:
+                await to_thread(
+                    STATE["runs"].record,
+                    service,
                     namespace=namespace,
                     container=container,
+                    started_at=started_at,
+                    duration=duration,
+                    outcome=outcome,
+                    result=result,
                 )
-
-                tu = result["token_usage"]
-                logger.info(
-                    "Token usage - Input: %s, Output: %s, Cache Creation: %s, "
-                    "Cache Read: %s, Total: %s",
-                    tu["input_tokens"],
-                    tu["output_tokens"],
-                    tu["cache_creation_tokens"],
-                    tu["cache_read_tokens"],
-                    tu["total_tokens"],
-                )
-                logger.info("Query processed successfully")
-                logger.info(f"Diagnosis result for {service}: {result['response']}")
-                return result
-
-            await wait_for(_run_diagnosis(client), timeout=timeout)
-
-    except TimeoutError:
-        logger.error(
-            f"Diagnosis duration exceeded maximum timeout of {timeout} seconds for "
-            f"service {service}"
-        )
-        # TODO: Post error back to Slack?
-    except Exception as e:
-        logger.exception(f"Error during background diagnosis for {service}: {e}")
-        # TODO: Post error back to Slack?
+            except Exception as e:  # noqa: BLE001
+                logger.warning("Failed to record the run for %s: %s", service, e)
 
 
 @app.post("/diagnose")
 async def diagnose(
     request: Request,
-    background_tasks: BackgroundTasks,
     _authorisation: Annotated[None, Depends(is_request_valid)],
 ) -> JSONResponse:
     """Handle incoming Slack slash command requests for service diagnosis.
 
     Args:
         request: The FastAPI request object containing form data.
-        background_tasks: FastAPI background tasks handler.
         authorisation: Authorization check result from is_request_valid dependency.
 
     Returns:
-        JSONResponse: indicating the diagnosis has started.
+        JSONResponse: indicating the diagnosis has been queued, with its job ID.
     """
     form_data = await request.form()
     text_data = form_data.get("text", "")
@@ -555,94 +986,148 @@ async def diagnose(
 
     logger.info(f"Received diagnose request for service: {service}")
 
-    background_tasks.add_task(
-        run_diagnosis_and_post,
-        service,
-        repo_url if isinstance(repo_url, str) else None,
-        namespace if isinstance(namespace, str) else None,
-        container if isinstance(container, str) else None,
-    )
+    arguments: dict[str, Any] = {
+        "service": service,
+        "repo_url": repo_url if isinstance(repo_url, str) else None,
+        "namespace": namespace if isinstance(namespace, str) else None,
+        "container": container if isinstance(container, str) else None,
+    }
+    try:
+        job, coalesced = STATE["jobs"].submit(_diagnosis_key(**arguments), **arguments)
+    except QueueFullError as e:
+        logger.warning(f"Rejected diagnose request for {service}: {e}")
+        return JSONResponse(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            content={
+                "response_type": "ephemeral",
+                "text": f"⏳ Too many diagnoses are queued, try `{service}` later.",
+            },
+        )
+
+    if coalesced:
+        DIAGNOSES_COALESCED.labels(service).inc()
 
     return JSONResponse(
         status_code=HTTPStatus.OK,
         content={
             "response_type": "ephemeral",
-            "text": f"🔍 Running diagnosis for `{service}`...",
+            "text": (
+                f"🔍 A diagnosis for `{service}` is already running, joining it..."
+                if coalesced
+                else f"🔍 Running diagnosis for `{service}`..."
+            ),
+            "job_id": job.id,
         },
     )
 
 
 @app.get("/health")
 async def health() -> JSONResponse:
-    """Check if connections to all required MCP servers can be established."""
-    failed_checks: list[str] = []
-    healthy_connections: list[str] = []
-    all_servers = list(MCPServer)
+    """Report the latest background check of the MCP servers, for liveness.
 
-    logger.info("Performing health check by attempting temporary connections...")
+    The MCP servers are pinged over the pooled sessions every
+    `HEALTH_CHECK_INTERVAL` seconds, and probes read that snapshot instead of
+    connecting themselves. Only a failed check is unhealthy, so the service
+    is live while its first checks are still running.
+    """
+    prober: HealthProber = STATE["health"]
+    servers = [str(server) for server in MCPServer]
+    return JSONResponse(
+        content=prober.snapshot(servers),
+        status_code=(
+            status.HTTP_503_SERVICE_UNAVAILABLE
+            if prober.down(servers)
+            else status.HTTP_200_OK
+        ),
+    )
 
-    try:
-        async with MCPClient() as client:
-            for server in all_servers:
-                server_name = server.name
-                try:
-                    logger.debug(
-                        f"Health check: Attempting connection to {server_name}"
-                    )
-                    await client.connect_to_sse_server(service=server)
-                    await client.sessions[server].session.list_tools()
-                    logger.debug(
-                        f"Health check connection successful for {server_name}"
-                    )
-                    healthy_connections.append(server_name)
-                except Exception as e:
-                    msg = (
-                        f"Health check connection failed for {server_name}: "
-                        f"{type(e).__name__} - {e}"
-                    )
-                    logger.error(msg)
-                    failed_checks.append(msg)
 
-    except Exception as client_err:
-        msg = (
-            "Health check failed: Could not initialise or manage MCPClient context: "
-            f"{type(client_err).__name__} - {client_err}"
-        )
-        logger.error(msg)
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """Report whether every downstream dependency passed its latest check.
 
+    Besides the MCP servers, the LLM server and firewall are checked over the
+    shared HTTP clients. A dependency which has not been checked yet, or
+    whose latest check failed, makes the service not ready.
+    """
+    prober: HealthProber = STATE["health"]
+    return JSONResponse(
+        content=prober.snapshot(),
+        status_code=(
+            status.HTTP_200_OK
+            if prober.healthy
+            else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+    )
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """Expose the orchestrator's metrics in the Prometheus text format."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/tool-cache")
+async def tool_cache_stats() -> dict[str, Any]:
+    """Report the hit, miss and eviction counters of the tool result cache."""
+    stats: dict[str, Any] = STATE["tool_cache"].stats()
+    return stats
+
+
+@app.get("/jobs")
+async def list_jobs(
+    _authorisation: Annotated[None, Depends(is_request_valid)],
+) -> dict[str, Any]:
+    """Report the queue's counters and the state and timings of known jobs."""
+    return {
+        "stats": STATE["jobs"].stats(),
+        "jobs": [job.summary() for job in STATE["jobs"].jobs()],
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str, _authorisation: Annotated[None, Depends(is_request_valid)]
+) -> dict[str, Any]:
+    """Report the state, timings and result of a diagnosis job."""
+    job = STATE["jobs"].get(job_id)
+    if job is None:
         raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail={
-                "status": "Unavailable",
-                "detail": msg,
-                "errors": [msg],
-            },
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown job {job_id}."
         )
+    result: dict[str, Any] = job.to_dict()
+    return result
 
-    if failed_checks:
-        status_code = status.HTTP_503_SERVICE_UNAVAILABLE
-        response_detail = {
-            "status": "Partially Available" if healthy_connections else "Unavailable",
-            "detail": "One or more MCP server connections failed health checks.",
-            "healthy_connections": sorted(healthy_connections),
-            "errors": failed_checks,
-        }
-        logger.warning(
-            f"Health check completed with failures. Healthy: "
-            f"{len(healthy_connections)}, "
-            f"Failed: {len(failed_checks)}. Errors: {failed_checks}"
-        )
-    else:
-        status_code = status.HTTP_200_OK
-        checked = sorted([s.name for s in all_servers])
-        response_detail = {
-            "status": "OK",
-            "detail": "All required MCP server connections are healthy.",
-            "checked_servers": checked,
-        }
-        logger.info(
-            "Health check completed successfully. All connections healthy: %s",
-            checked,
-        )
 
-    return JSONResponse(content=response_detail, status_code=status_code)
+@app.get("/runs")
+async def list_runs(
+    _authorisation: Annotated[None, Depends(is_request_valid)],
+    service: str | None = None,
+    limit: int = 50,
+) -> dict[str, Any]:
+    """Report the totals of the most recent diagnosis runs, newest first."""
+    return {"runs": await to_thread(STATE["runs"].runs, service, limit)}
+
+
+@app.get("/runs/stats")
+async def run_stats(
+    _authorisation: Annotated[None, Depends(is_request_valid)],
+    service: str | None = None,
+    since: float | None = None,
+) -> dict[str, Any]:
+    """Report per-service percentiles of run latency, turns, tools and tokens."""
+    stats: dict[str, Any] = await to_thread(STATE["runs"].stats, service, since)
+    return stats
+
+
+@app.get("/runs/{run_id}")
+async def get_run(
+    run_id: str, _authorisation: Annotated[None, Depends(is_request_valid)]
+) -> dict[str, Any]:
+    """Report a run's totals and its per-turn breakdown."""
+    run: dict[str, Any] | None = await to_thread(STATE["runs"].get, run_id)
+    if run is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown run {run_id}."
+        )
+    return run
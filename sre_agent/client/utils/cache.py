@@ -0,0 +1,117 @@
+"""A shared cache for the results of read-only MCP tool calls."""
+
+from __future__ import annotations
+
+import json
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    """A cached tool result and the time it stops being fresh."""
+
+    content: list[Any]
+    expires_at: float
+
+
+class ToolResultCache:
+    """A size-bounded LRU cache of tool results with a TTL per tool.
+
+    Only tools with a TTL policy are cached, so the policies double as the
+    allowlist of tools which are safe to cache. Keys are the tool name plus
+    its arguments normalised to canonical JSON.
+    """
+
+    def __init__(
+        self,
+        ttls: dict[str, float],
+        max_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialise an empty cache.
+
+        Args:
+            ttls: The time to live in seconds of each cacheable tool's results.
+            max_entries: The number of results kept before the least recently
+                used one is evicted.
+            clock: The clock used to expire results.
+        """
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, CachedResult] = OrderedDict()
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self.evictions = 0
+        self.expirations = 0
+
+    def cacheable(self, name: str) -> bool:
+        """Whether results of a tool may be cached."""
+        return self.ttls.get(name, 0) > 0
+
+    @staticmethod
+    def key(name: str, arguments: Any) -> str:
+        """Build the cache key of a tool call."""
+        if isinstance(arguments, dict):
+            arguments = {k: v for k, v in arguments.items() if v is not None}
+        normalised = json.dumps(
+            arguments, sort_keys=True, separators=(",", ":"), default=str
+        )
+        return f"{name}:{normalised}"
+
+    def get(self, name: str, arguments: Any) -> list[Any] | None:
+        """Return the cached result of a tool call, if it is still fresh."""
+        if not self.cacheable(name):
+            return None
+
+        key = self.key(name, arguments)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            self.misses[name] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits[name] += 1
+        return entry.content
+
+    def put(self, name: str, arguments: Any, content: list[Any]) -> None:
+        """Cache the result of a tool call, evicting the least recently used."""
+        if not self.cacheable(name):
+            return
+
+        key = self.key(name, arguments)
+        self._entries[key] = CachedResult(
+            content=content, expires_at=self._clock() + self.ttls[name]
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Return the cache counters, overall and per tool."""
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": sum(self.hits.values()),
+            "misses": sum(self.misses.values()),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "tools": {
+                name: {
+                    "ttl": ttl,
+                    "hits": self.hits[name],
+                    "misses": self.misses[name],
+                }
+                for name, ttl in self.ttls.items()
+            },
+        }
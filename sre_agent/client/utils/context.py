@@ -0,0 +1,164 @@
+"""Token-budgeted compaction of the agent loop's conversation history."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from pydantic import BaseModel
+
+# A rough estimate which holds for English text and JSON across providers
+CHARS_PER_TOKEN = 4
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def estimate_tokens(value: Any) -> int:
+    """Estimate the number of tokens a JSON-serialisable value costs."""
+    return len(json.dumps(value, default=_default)) // CHARS_PER_TOKEN
+
+
+def _text(content: Any) -> str:
+    """Join the text of a tool result's content blocks."""
+    if isinstance(content, str):
+        return content
+    texts = []
+    for block in content:
+        text = (
+            block.get("text")
+            if isinstance(block, dict)
+            else getattr(block, "text", None)
+        )
+        texts.append(
+            text if isinstance(text, str) else json.dumps(block, default=_default)
+        )
+    return "\n".join(texts)
+
+
+@dataclass(frozen=True)
+class CompactionReport:
+    """The estimated size of the context sent on a turn."""
+
+    turn: int
+    tokens_before: int
+    tokens_after: int
+    compacted: int
+
+    def to_dict(self) -> dict[str, int]:
+        """Return the report as a dictionary."""
+        return asdict(self)
+
+
+class ContextCompactor:
+    """Keep the conversation sent to the LLM within a token budget.
+
+    When the estimated size exceeds the budget, tool results the LLM has
+    already responded to are replaced with a short excerpt, oldest first,
+    until the size is back under a lower target. The first message, which
+    holds the diagnosis prompt, and the most recent turns are never touched.
+
+    Compaction is sticky and happens in batches: a compacted result is never
+    rewritten again, and compacting down to the target rather than just under
+    the budget leaves headroom for several turns, so the conversation prefix
+    stays stable and the provider's prompt cache keeps hitting between
+    compactions.
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int,
+        keep_recent_turns: int = 2,
+        excerpt_chars: int = 1000,
+        target_ratio: float = 0.75,
+    ) -> None:
+        """Initialise the compactor.
+
+        Args:
+            budget_tokens: The estimated tokens the messages and tools may use.
+                A budget of 0 disables compaction.
+            keep_recent_turns: The number of recent assistant and tool result
+                message pairs which are kept intact. At least the latest pair
+                is always kept, as the LLM has not responded to it yet.
+            excerpt_chars: The characters of a compacted result which are kept,
+                split between its start and its end.
+            target_ratio: The share of the budget to compact down to.
+        """
+        self.budget_tokens = budget_tokens
+        self.keep_recent_turns = max(1, keep_recent_turns)
+        self.excerpt_chars = excerpt_chars
+        self.target_ratio = target_ratio
+        self.reports: list[CompactionReport] = []
+        self._compacted: set[str] = set()
+
+    def compact(
+        self, messages: list[dict[str, Any]], reserved_tokens: int = 0
+    ) -> CompactionReport:
+        """Compact the messages in place if they exceed the budget.
+
+        Args:
+            messages: The conversation, starting with the prompt.
+            reserved_tokens: Estimated tokens used by the rest of the request,
+                such as the tool definitions.
+
+        Returns:
+            A report of the estimated tokens before and after compaction.
+        """
+        before = estimate_tokens(messages) + reserved_tokens
+        after, compacted = before, 0
+
+        if self.budget_tokens and before > self.budget_tokens:
+            target = int(self.budget_tokens * self.target_ratio)
+            for block in self._consumed_results(messages):
+                if after <= target:
+                    break
+                saved = self._compact_result(block)
+                after -= saved
+                compacted += saved > 0
+            after = estimate_tokens(messages) + reserved_tokens
+
+        report = CompactionReport(
+            turn=len(self.reports) + 1,
+            tokens_before=before,
+            tokens_after=after,
+            compacted=compacted,
+        )
+        self.reports.append(report)
+        return report
+
+    def _consumed_results(self, messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """The uncompacted tool results outside the recent turns, oldest first."""
+        recent = 2 * self.keep_recent_turns
+        return [
+            block
+            for message in messages[1:-recent]
+            if message["role"] == "user" and isinstance(message["content"], list)
+            for block in message["content"]
+            if isinstance(block, dict)
+            and block.get("type") == "tool_result"
+            and block.get("tool_use_id") not in self._compacted
+        ]
+
+    def _compact_result(self, block: dict[str, Any]) -> int:
+        """Replace a tool result with an excerpt, returning the tokens saved."""
+        self._compacted.add(block["tool_use_id"])
+        text = _text(block["content"])
+        if len(text) <= self.excerpt_chars:
+            return 0
+
+        head = text[: self.excerpt_chars // 2]
+        tail = text[-self.excerpt_chars // 2 :]
+        excerpt = (
+            f"[Earlier {block.get('name', 'tool')} result compacted: "
+            f"{len(text)} characters, {text.count(chr(10)) + 1} lines. "
+            "Excerpt follows; call the tool again if more is needed.]\n"
+            f"{head}\n[... {len(text) - len(head) - len(tail)} characters omitted ...]"
+            f"\n{tail}"
+        )
+        before = estimate_tokens(block["content"])
+        block["content"] = [{"type": "text", "text": excerpt}]
+        return before - estimate_tokens(block["content"])
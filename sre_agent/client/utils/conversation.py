@@ -0,0 +1,149 @@
+"""A conversation with the LLM server which sends only new messages each turn."""
+
+from __future__ import annotations
+
+from http import HTTPStatus
+from typing import Any
+
+import httpx
+from shared.logger import logger
+from shared.metrics import PROVIDER_HEADER
+from shared.schemas import (
+    ConversationPayload,
+    ConversationTurnPayload,
+    Message,
+    TextGenerationPayload,
+    ToolCatalogPayload,
+)
+
+
+class LLMConversation:
+    """Generate the turns of a diagnosis through the LLM server.
+
+    In stateful mode the tool catalog is registered once and a conversation is
+    opened on the server, which keeps the provider-native messages, so each
+    turn only sends the messages appended since the previous one. If the
+    history before those messages was rewritten, for example by compaction,
+    a new conversation is opened with the full history.
+
+    If the server does not support conversations, or stateful mode is off,
+    every turn sends the full payload to `/generate`.
+    """
+
+    def __init__(
+        self,
+        http: httpx.AsyncClient,
+        tools: list[dict[str, Any]],
+        stateful: bool = True,
+    ) -> None:
+        """Initialise the conversation.
+
+        Args:
+            http: The client for the LLM server.
+            tools: The tools available to the LLM.
+            stateful: Whether to use the server's conversation API.
+        """
+        self.http = http
+        self.tools = tools
+        self.stateful = stateful
+        # The provider the LLM server last reported, for labelling metrics
+        self.provider = "unknown"
+        self._catalog_id: str | None = None
+        self._conversation_id: str | None = None
+        self._sent = 0
+
+    async def generate(
+        self, messages: list[dict[str, Any]], rewritten: bool = False
+    ) -> Message:
+        """Generate the next message of the conversation.
+
+        Args:
+            messages: The full conversation so far.
+            rewritten: Whether messages already sent have changed since the
+                previous turn.
+
+        Returns:
+            The message generated by the LLM.
+        """
+        if not self.stateful:
+            return await self._generate_stateless(messages)
+
+        if rewritten:
+            await self.close()
+
+        try:
+            return await self._generate_stateful(messages)
+        except _ConversationsUnsupportedError:
+            logger.info("LLM server does not support conversations, using /generate")
+            self.stateful = False
+            return await self._generate_stateless(messages)
+        except _ConversationGoneError:
+            # The server restarted or expired the conversation; start over once
+            logger.info("LLM conversation expired, opening a new one")
+            self._catalog_id = self._conversation_id = None
+            return await self._generate_stateful(messages)
+
+    async def close(self) -> None:
+        """Close the conversation on the server, if one is open."""
+        if self._conversation_id is None:
+            return
+        conversation_id, self._conversation_id = self._conversation_id, None
+        try:
+            await self.http.delete(f"/conversations/{conversation_id}")
+        except httpx.HTTPError as e:
+            logger.debug("Failed to close LLM conversation: %s", e)
+
+    async def _generate_stateless(self, messages: list[dict[str, Any]]) -> Message:
+        payload = TextGenerationPayload(messages=messages, tools=self.tools).model_dump(
+            mode="json"
+        )
+        logger.debug(payload)
+        response = await self.http.post("/generate", json=payload)
+        response.raise_for_status()
+        return self._message(response)
+
+    async def _generate_stateful(self, messages: list[dict[str, Any]]) -> Message:
+        if self._catalog_id is None:
+            response = await self._post(
+                "/catalogs", ToolCatalogPayload(tools=self.tools), unsupported=True
+            )
+            self._catalog_id = response.json()["catalog_id"]
+
+        if self._conversation_id is None:
+            response = await self._post(
+                "/conversations",
+                ConversationPayload(catalog_id=self._catalog_id, messages=messages),
+            )
+            self._conversation_id = response.json()["conversation_id"]
+            self._sent = len(messages)
+
+        response = await self._post(
+            f"/conversations/{self._conversation_id}/generate",
+            ConversationTurnPayload(messages=messages[self._sent :]),
+        )
+        self._sent = len(messages)
+        return self._message(response)
+
+    def _message(self, response: httpx.Response) -> Message:
+        self.provider = response.headers.get(PROVIDER_HEADER, self.provider)
+        return Message(**response.json())
+
+    async def _post(
+        self, url: str, payload: Any, unsupported: bool = False
+    ) -> httpx.Response:
+        response = await self.http.post(url, json=payload.model_dump(mode="json"))
+        if response.status_code == HTTPStatus.NOT_FOUND:
+            # Registering a catalog never 404s on a server with conversations
+            if unsupported:
+                raise _ConversationsUnsupportedError
+            raise _ConversationGoneError
+        response.raise_for_status()
+        return response
+
+
+class _ConversationGoneError(Exception):
+    """The server no longer knows the catalog or conversation."""
+
+
+class _ConversationsUnsupportedError(Exception):
+    """The server has no conversation API."""
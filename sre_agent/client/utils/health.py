@@ -0,0 +1,183 @@
+"""Background health checks of the orchestrator's downstream services."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Collection
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any
+
+import httpx
+from shared.logger import logger
+
+from .pool import PooledConnection
+
+Check = Callable[[], Awaitable[object]]
+
+
+class HealthStatus(StrEnum):
+    """The result of the latest check of a dependency."""
+
+    UNKNOWN = "unknown"
+    OK = "ok"
+    DOWN = "down"
+
+
+@dataclass
+class CheckResult:
+    """The latest check of a single dependency."""
+
+    status: HealthStatus = HealthStatus.UNKNOWN
+    latency: float | None = None
+    checked_at: float | None = None
+    error: str | None = None
+
+    def to_dict(self, now: float) -> dict[str, Any]:
+        """Return the result, with the age of the check in seconds."""
+        return {
+            "status": self.status,
+            "latency_seconds": self.latency,
+            "age_seconds": None if self.checked_at is None else now - self.checked_at,
+            "error": self.error,
+        }
+
+
+def mcp_check(connection: PooledConnection, timeout: float) -> Check:
+    """Ping an MCP server over its pooled session, without opening a new one."""
+
+    async def _check() -> None:
+        if not connection.connected:
+            msg = f"No session to {connection.server}"
+            raise ConnectionError(msg)
+        await connection.request(lambda s: s.send_ping(), timeout)
+
+    return _check
+
+
+def http_check(client: httpx.AsyncClient, path: str = "/health") -> Check:
+    """Request a service's health endpoint over its shared connection pool."""
+
+    async def _check() -> None:
+        response = await client.get(path)
+        response.raise_for_status()
+
+    return _check
+
+
+class HealthProber:
+    """Check every dependency on an interval and keep the latest results.
+
+    Health probes read the cached snapshot, so however often the orchestrator
+    is probed, each dependency is checked once per interval.
+    """
+
+    def __init__(
+        self,
+        checks: dict[str, Check],
+        interval: float = 15.0,
+        timeout: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialise the prober without checking anything.
+
+        Args:
+            checks: A check of each dependency by name, which raises if the
+                dependency is unhealthy.
+            interval: The seconds between the start of each round of checks.
+            timeout: How long a check may take before the dependency is down.
+            clock: The time source, in seconds.
+        """
+        self.checks = checks
+        self.interval = interval
+        self.timeout = timeout
+        self._clock = clock
+        self.results = {name: CheckResult() for name in checks}
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Start checking in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="health-prober")
+
+    async def close(self) -> None:
+        """Stop checking."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = self._clock()
+            await self.check_all()
+            await asyncio.sleep(max(0.0, self.interval - (self._clock() - start)))
+
+    async def check_all(self) -> None:
+        """Check every dependency concurrently and record the results."""
+        await asyncio.gather(*(self._check(name) for name in self.checks))
+
+    async def _check(self, name: str) -> None:
+        start = self._clock()
+        try:
+            await asyncio.wait_for(self.checks[name](), self.timeout)
+        except Exception as e:  # noqa: BLE001
+            error = f"{type(e).__name__} - {e}" if str(e) else type(e).__name__
+            if self.results[name].status != HealthStatus.DOWN:
+                logger.warning("Health check of %s failed: %s", name, error)
+            result = CheckResult(HealthStatus.DOWN, error=error)
+        else:
+            if self.results[name].status == HealthStatus.DOWN:
+                logger.info("Health check of %s recovered", name)
+            result = CheckResult(HealthStatus.OK)
+        result.checked_at = self._clock()
+        result.latency = result.checked_at - start
+        self.results[name] = result
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the latest check of every dependency succeeded."""
+        return all(r.status == HealthStatus.OK for r in self.results.values())
+
+    def down(self, names: Collection[str] | None = None) -> list[str]:
+        """Return the dependencies whose latest check failed.
+
+        Args:
+            names: The dependencies to consider, by default all of them.
+        """
+        return [
+            name
+            for name, result in self.results.items()
+            if (names is None or name in names) and result.status == HealthStatus.DOWN
+        ]
+
+    def snapshot(self, names: Collection[str] | None = None) -> dict[str, Any]:
+        """Return the overall status and the latest check of each dependency.
+
+        Args:
+            names: The dependencies to report, by default all of them.
+        """
+        now = self._clock()
+        results = {
+            name: result
+            for name, result in self.results.items()
+            if names is None or name in names
+        }
+        statuses = {r.status for r in results.values()}
+        if statuses <= {HealthStatus.OK}:
+            overall = "OK"
+        elif statuses == {HealthStatus.UNKNOWN}:
+            overall = "Starting"
+        elif HealthStatus.OK in statuses:
+            overall = "Partially Available"
+        else:
+            overall = "Unavailable"
+        return {
+            "status": overall,
+            "interval_seconds": self.interval,
+            "dependencies": {
+                name: result.to_dict(now) for name, result in results.items()
+            },
+        }
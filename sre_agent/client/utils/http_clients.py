@@ -0,0 +1,64 @@
+"""Shared async HTTP clients for the orchestrator's downstream services."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import httpx
+from opentelemetry.propagate import inject
+
+from .replay import record_exchange
+from .schemas import ClientConfig
+
+
+@dataclass
+class DownstreamClients:
+    """Keep-alive connection pools to the LLM server and the firewall."""
+
+    llm: httpx.AsyncClient
+    firewall: httpx.AsyncClient
+
+    async def aclose(self) -> None:
+        """Close every connection pool."""
+        await self.llm.aclose()
+        await self.firewall.aclose()
+
+
+async def inject_trace_context(request: httpx.Request) -> None:
+    """Pass the current trace to the downstream service in `traceparent`."""
+    inject(request.headers)
+
+
+def _client(
+    service: str, base_url: str, timeout: float, max_connections: int
+) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(timeout, connect=min(timeout, 10.0)),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+        event_hooks={
+            "request": [inject_trace_context],
+            "response": [record_exchange(service)],
+        },
+    )
+
+
+def create_downstream_clients(config: ClientConfig) -> DownstreamClients:
+    """Create the connection pools, sized and timed per downstream service."""
+    return DownstreamClients(
+        llm=_client(
+            "llm",
+            config.llm_server_url,
+            config.llm_timeout,
+            config.llm_max_connections,
+        ),
+        firewall=_client(
+            "firewall",
+            config.firewall_url,
+            config.firewall_timeout,
+            config.firewall_max_connections,
+        ),
+    )
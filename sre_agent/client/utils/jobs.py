@@ -0,0 +1,209 @@
+"""A bounded queue of diagnosis jobs run by a fixed pool of workers."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Any
+from uuid import uuid4
+
+from shared.logger import logger
+
+
+class JobStatus(StrEnum):
+    """The states a job moves through."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted to a full queue."""
+
+
+@dataclass
+class Job:
+    """A unit of work submitted to the queue, with its state and timings."""
+
+    id: str
+    key: Hashable
+    arguments: dict[str, Any]
+    status: JobStatus = JobStatus.QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: Any = None
+    error: str | None = None
+    coalesced: int = 0
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def summary(self) -> dict[str, Any]:
+        """Return the job's state and timings, without its result."""
+        now = time.time()
+        queued_until = self.started_at or self.finished_at or now
+        return {
+            "id": self.id,
+            "status": self.status,
+            "arguments": self.arguments,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queued_seconds": queued_until - self.submitted_at,
+            "run_seconds": (
+                (self.finished_at or now) - self.started_at
+                if self.started_at is not None
+                else None
+            ),
+            "coalesced": self.coalesced,
+            "error": self.error,
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the job's state, timings and result."""
+        return {**self.summary(), "result": self.result}
+
+
+class JobQueue:
+    """Run submitted jobs on a fixed number of workers.
+
+    The queue holds at most `max_queued` jobs waiting for a worker, so a burst
+    of submissions is rejected instead of slowing every job down together.
+    A job submitted with the key of a job which is still queued or running is
+    coalesced onto that job.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[..., Awaitable[Any]],
+        workers: int = 2,
+        max_queued: int = 32,
+        max_history: int = 100,
+    ) -> None:
+        """Initialise an empty queue.
+
+        Args:
+            runner: The coroutine function run with each job's arguments.
+            workers: The number of jobs run at the same time.
+            max_queued: The number of jobs which may wait for a worker.
+            max_history: The number of completed jobs kept for the status API.
+        """
+        self.runner = runner
+        self.workers = workers
+        self.max_history = max_history
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=max_queued)
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._active: dict[Hashable, Job] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        """Start the workers."""
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def close(self) -> None:
+        """Stop the workers, cancelling any running jobs."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key: Hashable, **arguments: Any) -> tuple[Job, bool]:
+        """Queue a job, or attach to the queued or running job with the same key.
+
+        Args:
+            key: The key identifying duplicate jobs.
+            **arguments: The arguments the runner is called with.
+
+        Returns:
+            The job, and whether the submission was coalesced onto an existing
+            job.
+
+        Raises:
+            QueueFullError: If the queue is full.
+        """
+        job = self._active.get(key)
+        if job is not None:
+            job.coalesced += 1
+            self.coalesced += 1
+            logger.info(f"Coalescing job for {key} onto {job.status} job {job.id}")
+            return job, True
+
+        job = Job(id=uuid4().hex, key=key, arguments=arguments)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(
+                f"{self._queue.maxsize} jobs are already waiting for a worker."
+            ) from None
+
+        self.submitted += 1
+        self._active[key] = job
+        self._jobs[job.id] = job
+        self._prune()
+        logger.info(f"Queued job {job.id} for {key}")
+        return job, False
+
+    def get(self, job_id: str) -> Job | None:
+        """Return a job by its ID, if it is still known."""
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        """Return the known jobs, oldest first."""
+        return list(self._jobs.values())
+
+    def stats(self) -> dict[str, int]:
+        """Return the queue's counters."""
+        statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "max_queued": self._queue.maxsize,
+            "queued": statuses.count(JobStatus.QUEUED),
+            "running": statuses.count(JobStatus.RUNNING),
+            "finished": statuses.count(JobStatus.FINISHED),
+            "failed": statuses.count(JobStatus.FAILED),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = JobStatus.RUNNING
+            job.started_at = time.time()
+            logger.info(
+                f"Running job {job.id} after "
+                f"{job.started_at - job.submitted_at:.2f}s in the queue"
+            )
+            try:
+                job.result = await self.runner(**job.arguments)
+                job.status = JobStatus.FINISHED
+            except Exception as e:
+                job.status = JobStatus.FAILED
+                job.error = f"{type(e).__name__}: {e}"
+            finally:
+                job.finished_at = time.time()
+                self._active.pop(job.key, None)
+                job.done.set()
+                self._queue.task_done()
+            logger.info(
+                f"Job {job.id} {job.status} in "
+                f"{job.finished_at - job.started_at:.2f}s"
+            )
+
+    def _prune(self) -> None:
+        completed = [job.id for job in self._jobs.values() if job.done.is_set()]
+        for job_id in completed[: max(0, len(completed) - self.max_history)]:
+            del self._jobs[job_id]
@@ -0,0 +1,175 @@
+"""Compression of log output into templates with a Drain-style miner.
+
+Lines are routed through a fixed-depth parse tree keyed on their token count
+and leading tokens, then matched against the templates at the leaf by the share
+of tokens they have in common. Tokens which differ between lines of a template
+become wildcards, so thousands of near-identical lines collapse into one
+template with a count, a time range and a few sample values per wildcard.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+WILDCARD = "<*>"
+
+_TIMESTAMP = re.compile(
+    r"^\[?(?P<ts>\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?"
+    r"(?:Z|[+-]\d{2}:?\d{2})?)\]?\s+"
+)
+_HAS_DIGIT = re.compile(r"\d")
+
+
+@dataclass
+class LogTemplate:
+    """A group of log lines sharing a template."""
+
+    tokens: list[str]
+    count: int = 0
+    first_timestamp: str | None = None
+    last_timestamp: str | None = None
+    samples: dict[int, list[str]] = field(default_factory=dict)
+
+    def similarity(self, tokens: list[str]) -> float:
+        """The share of a line's tokens equal to the template's at each position."""
+        same = sum(
+            1
+            for ours, theirs in zip(self.tokens, tokens, strict=True)
+            if ours == theirs and ours != WILDCARD
+        )
+        return same / len(tokens) if tokens else 1.0
+
+    def add(self, tokens: list[str], timestamp: str | None, max_samples: int) -> None:
+        """Merge a line into the template, widening differing tokens."""
+        if self.count:
+            for i, (ours, theirs) in enumerate(zip(self.tokens, tokens, strict=True)):
+                if ours not in (theirs, WILDCARD):
+                    # The value seen before the position became a wildcard
+                    self.samples[i] = [ours]
+                    self.tokens[i] = WILDCARD
+        for i, token in enumerate(tokens):
+            if self.tokens[i] == WILDCARD:
+                samples = self.samples.setdefault(i, [])
+                if token not in samples and len(samples) < max_samples:
+                    samples.append(token)
+
+        self.count += 1
+        if timestamp is not None:
+            self.first_timestamp = self.first_timestamp or timestamp
+            self.last_timestamp = timestamp
+
+    def render(self) -> str:
+        """Render the template as a single line."""
+        header = f"[x{self.count}]"
+        if self.first_timestamp:
+            header += f" {self.first_timestamp}"
+            if self.last_timestamp != self.first_timestamp:
+                header += f" .. {self.last_timestamp}"
+        line = f"{header} | {' '.join(self.tokens)}"
+        if self.samples:
+            values = "; ".join(
+                f"#{n}: {', '.join(values)}"
+                for n, (_, values) in enumerate(sorted(self.samples.items()), 1)
+            )
+            line += f" | samples {values}"
+        return line
+
+
+@dataclass
+class _Node:
+    children: dict[str, _Node] = field(default_factory=dict)
+    templates: list[LogTemplate] = field(default_factory=list)
+
+
+class LogTemplateMiner:
+    """Cluster log lines into templates as they stream in."""
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.5,
+        depth: int = 4,
+        max_children: int = 100,
+        max_samples: int = 3,
+    ) -> None:
+        """Initialise an empty parse tree.
+
+        Args:
+            similarity_threshold: The share of tokens a line must have in common
+                with a template to join it.
+            depth: The depth of the parse tree, including the root and the
+                token-count layer, so `depth - 2` leading tokens route a line.
+            max_children: The number of children a tree node may have before
+                further tokens are routed to a wildcard child.
+            max_samples: The number of distinct values kept per wildcard.
+        """
+        self.similarity_threshold = similarity_threshold
+        self.depth = depth
+        self.max_children = max_children
+        self.max_samples = max_samples
+        self.templates: list[LogTemplate] = []
+        self.lines = 0
+        self._tree: dict[int, _Node] = {}
+
+    def add(self, line: str) -> None:
+        """Add a log line to the template it matches, or start a new template."""
+        line = line.strip()
+        if not line:
+            return
+        self.lines += 1
+
+        timestamp = None
+        if match := _TIMESTAMP.match(line):
+            timestamp = match["ts"]
+            line = line[match.end() :]
+        tokens = line.split()
+
+        leaf = self._leaf(tokens)
+        best, best_similarity = None, -1.0
+        for template in leaf.templates:
+            similarity = template.similarity(tokens)
+            if similarity > best_similarity:
+                best, best_similarity = template, similarity
+
+        if best is None or best_similarity < self.similarity_threshold:
+            best = LogTemplate(tokens=list(tokens))
+            leaf.templates.append(best)
+            self.templates.append(best)
+        best.add(tokens, timestamp, self.max_samples)
+
+    def _leaf(self, tokens: list[str]) -> _Node:
+        node = self._tree.setdefault(len(tokens), _Node())
+        for token in tokens[: self.depth - 2]:
+            key = WILDCARD if _HAS_DIGIT.search(token) else token
+            if key not in node.children and len(node.children) >= self.max_children:
+                key = WILDCARD
+            node = node.children.setdefault(key, _Node())
+        return node
+
+    def render(self) -> str:
+        """Render the templates in the order they first appeared."""
+        header = (
+            f"{self.lines} log lines compressed into {len(self.templates)} "
+            f"templates ({WILDCARD} marks a variable, #n its sample values):"
+        )
+        return "\n".join([header, *(t.render() for t in self.templates)])
+
+
+def compress_logs(
+    lines: Iterable[str], similarity_threshold: float = 0.5
+) -> tuple[str, LogTemplateMiner]:
+    """Compress log lines into rendered templates.
+
+    Args:
+        lines: The log lines, consumed one at a time.
+        similarity_threshold: The share of tokens a line must have in common
+            with a template to join it.
+
+    Returns:
+        The rendered templates and the miner holding them.
+    """
+    miner = LogTemplateMiner(similarity_threshold=similarity_threshold)
+    for line in lines:
+        miner.add(line)
+    return miner.render(), miner
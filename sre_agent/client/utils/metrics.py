@@ -0,0 +1,40 @@
+"""Prometheus metrics of the orchestrator."""
+
+from prometheus_client import Counter, Gauge, Histogram
+from shared.metrics import LATENCY_BUCKETS
+
+DIAGNOSIS_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+DIAGNOSIS_DURATION = Histogram(
+    "sre_agent_diagnosis_duration_seconds",
+    "End-to-end duration of a diagnosis.",
+    ["service", "outcome"],
+    buckets=DIAGNOSIS_BUCKETS,
+)
+DIAGNOSES_COALESCED = Counter(
+    "sre_agent_diagnoses_coalesced",
+    "Diagnosis requests attached to a job already queued or running.",
+    ["service"],
+)
+DIAGNOSES_IN_PROGRESS = Gauge(
+    "sre_agent_diagnoses_in_progress",
+    "Diagnoses currently running.",
+    ["service"],
+)
+LLM_REQUEST_DURATION = Histogram(
+    "sre_agent_llm_request_duration_seconds",
+    "Duration of a request to the LLM server.",
+    ["service", "provider", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "sre_agent_llm_tokens",
+    "Tokens used by diagnoses, by type.",
+    ["service", "provider", "model", "type"],
+)
+TOOL_CALL_DURATION = Histogram(
+    "sre_agent_tool_call_duration_seconds",
+    "Duration of an MCP tool call.",
+    ["service", "tool", "status"],
+    buckets=LATENCY_BUCKETS,
+)
@@ -0,0 +1,297 @@
+"""A pool of long-lived MCP sessions shared across diagnoses."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from typing import Any
+
+import anyio
+from mcp import ClientSession
+from mcp.client.session import MessageHandlerFnT
+from mcp.client.sse import sse_client
+from mcp.shared.exceptions import McpError
+from mcp.types import (
+    CONNECTION_CLOSED,
+    CallToolResult,
+    GetPromptResult,
+    ServerNotification,
+    Tool,
+    ToolListChangedNotification,
+)
+from shared.logger import logger
+
+from .schemas import MCPServer, ServerSession
+
+SessionFactory = Callable[
+    [str, MessageHandlerFnT], AbstractAsyncContextManager[ClientSession]
+]
+
+# Errors raised when a request is written to a session whose transport is gone.
+# The request never reached the server, so it is always safe to retry it.
+_SEND_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError)
+
+
+@asynccontextmanager
+async def open_sse_session(
+    url: str, message_handler: MessageHandlerFnT
+) -> AsyncIterator[ClientSession]:
+    """Open an SSE transport and an initialised MCP client session on top of it."""
+    async with (
+        sse_client(url=url) as (read_stream, write_stream),
+        ClientSession(
+            read_stream, write_stream, message_handler=message_handler
+        ) as session,
+    ):
+        await session.initialize()
+        yield session
+
+
+def _is_connection_closed(error: McpError) -> bool:
+    return error.error.code == CONNECTION_CLOSED
+
+
+class PooledConnection:
+    """A self-healing connection to a single MCP server.
+
+    The connection is owned by a background task which opens the SSE stream,
+    keeps it open for as long as it is healthy and reconnects with exponential
+    backoff when it drops. Concurrent callers share the same `ClientSession`,
+    which multiplexes requests over the stream by request id.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        server: MCPServer,
+        url: str,
+        session_factory: SessionFactory = open_sse_session,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ) -> None:
+        """Initialise the connection without connecting to the server."""
+        self.server = server
+        self.url = url
+        self._session_factory = session_factory
+        self._initial_backoff = initial_backoff
+        self._max_backoff = max_backoff
+
+        self._session: ClientSession | None = None
+        self._tools: list[Tool] | None = None
+        self._tools_lock = asyncio.Lock()
+        self._ready = asyncio.Event()
+        self._disconnected = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self.reconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        """Whether the connection currently holds an initialised session."""
+        return self._ready.is_set()
+
+    def start(self) -> None:
+        """Start the background task which owns the connection."""
+        if self._task is None:
+            self._task = asyncio.create_task(
+                self._run(), name=f"mcp-connection-{self.server}"
+            )
+
+    async def close(self) -> None:
+        """Stop the background task and close the session."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except BaseException as e:  # noqa: BLE001
+            if not isinstance(e, asyncio.CancelledError):
+                logger.warning("Suppressing error closing %s: %s", self.server, e)
+        self._task = None
+
+    async def _run(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                logger.info(f"Connecting to SSE server: {self.url}")
+                async with self._session_factory(
+                    self.url, self._handle_message
+                ) as session:
+                    self._session = session
+                    self._tools = None
+                    self._disconnected.clear()
+                    self._ready.set()
+                    attempt = 0
+                    logger.info("Pooled session for %s is ready", self.server)
+                    await self._disconnected.wait()
+                    logger.warning("Pooled session for %s dropped", self.server)
+            except Exception as e:  # noqa: BLE001
+                logger.warning(
+                    "Connection to %s failed: %s - %s",
+                    self.server,
+                    type(e).__name__,
+                    e,
+                )
+            finally:
+                self._ready.clear()
+                self._session = None
+
+            attempt += 1
+            self.reconnects += 1
+            delay = random.uniform(  # nosec B311
+                0, min(self._max_backoff, self._initial_backoff * 2**attempt)
+            )
+            logger.info("Reconnecting to %s in %.2f seconds", self.server, delay)
+            await asyncio.sleep(delay)
+
+    async def _handle_message(self, message: Any) -> None:
+        """Watch the session's incoming messages for drops and tool changes."""
+        if isinstance(message, Exception):
+            logger.warning("Transport error from %s: %s", self.server, message)
+            self.mark_disconnected()
+        elif isinstance(message, ServerNotification) and isinstance(
+            message.root, ToolListChangedNotification
+        ):
+            logger.info("Tool list changed on %s, invalidating cache", self.server)
+            self._tools = None
+
+    def mark_disconnected(self, session: ClientSession | None = None) -> None:
+        """Tear down a session so the background task reconnects.
+
+        Args:
+            session: The session which failed. If the connection has already
+                moved on to a newer session, the newer session is left alone.
+        """
+        if session is not None and session is not self._session:
+            return
+        self._ready.clear()
+        self._session = None
+        self._disconnected.set()
+
+    async def wait_ready(self, timeout: float | None = None) -> ClientSession:
+        """Wait until the connection holds a session and return it."""
+        await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        if self._session is None:  # Dropped between the event and the wake-up
+            return await self.wait_ready(timeout)
+        return self._session
+
+    async def request(
+        self,
+        send: Callable[[ClientSession], Awaitable[Any]],
+        timeout: float | None,
+    ) -> Any:
+        """Send a request, reconnecting and retrying once if it was never sent."""
+        session = await self.wait_ready(timeout)
+        try:
+            return await send(session)
+        except _SEND_ERRORS:
+            logger.warning("Session for %s is closed, reconnecting", self.server)
+            self.mark_disconnected(session)
+        except McpError as e:
+            if _is_connection_closed(e):
+                # The request may have reached the server, so do not replay it.
+                self.mark_disconnected(session)
+            raise
+
+        session = await self.wait_ready(timeout)
+        return await send(session)
+
+    async def list_tools(self, timeout: float | None = None) -> list[Tool]:
+        """Return the server's tools, served from cache until they change."""
+        async with self._tools_lock:
+            if self._tools is None:
+                response = await self.request(lambda s: s.list_tools(), timeout)
+                self._tools = list(response.tools)
+                logger.info(
+                    "Connected to %s with tools: %s",
+                    self.url,
+                    [tool.name for tool in self._tools],
+                )
+            return self._tools
+
+
+class PooledSession:
+    """A `ClientSession`-like view of a pooled connection for a single client."""
+
+    def __init__(self, connection: PooledConnection, timeout: float | None) -> None:
+        """Initialise the view over a pooled connection."""
+        self._connection = connection
+        self._timeout = timeout
+
+    async def call_tool(
+        self, name: str, arguments: dict[str, Any] | None = None
+    ) -> CallToolResult:
+        """Call a tool on the pooled session."""
+        result: CallToolResult = await self._connection.request(
+            lambda s: s.call_tool(name, arguments), self._timeout
+        )
+        return result
+
+    async def get_prompt(
+        self, name: str, arguments: dict[str, str] | None = None
+    ) -> GetPromptResult:
+        """Get a prompt from the pooled session."""
+        result: GetPromptResult = await self._connection.request(
+            lambda s: s.get_prompt(name, arguments=arguments), self._timeout
+        )
+        return result
+
+    async def list_tools(self) -> list[Tool]:
+        """List the tools of the pooled session."""
+        return await self._connection.list_tools(self._timeout)
+
+
+class MCPSessionPool:
+    """Long-lived sessions to every MCP server, shared by concurrent diagnoses."""
+
+    def __init__(
+        self,
+        urls: dict[MCPServer, str],
+        session_factory: SessionFactory = open_sse_session,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ) -> None:
+        """Initialise a connection per server without connecting."""
+        self.connections = {
+            server: PooledConnection(
+                server,
+                url,
+                session_factory=session_factory,
+                initial_backoff=initial_backoff,
+                max_backoff=max_backoff,
+            )
+            for server, url in urls.items()
+        }
+
+    def start(self) -> None:
+        """Start connecting to every server in the background."""
+        for connection in self.connections.values():
+            connection.start()
+
+    async def close(self) -> None:
+        """Close every connection in the pool."""
+        await asyncio.gather(
+            *(connection.close() for connection in self.connections.values())
+        )
+
+    async def sessions(
+        self, timeout: float | None = None
+    ) -> dict[MCPServer, ServerSession]:
+        """Return a session and its tools for every server in the pool.
+
+        Args:
+            timeout: How long to wait for each server to become available.
+
+        Raises:
+            TimeoutError: If a server is not connected within the timeout.
+        """
+
+        async def _session(connection: PooledConnection) -> ServerSession:
+            session = PooledSession(connection, timeout)
+            return ServerSession(tools=await session.list_tools(), session=session)
+
+        servers = list(self.connections)
+        results = await asyncio.gather(
+            *(_session(self.connections[server]) for server in servers)
+        )
+        return dict(zip(servers, results, strict=True))
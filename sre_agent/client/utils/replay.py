@@ -0,0 +1,415 @@
+"""Record diagnoses to trace files and replay them without their dependencies."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict, deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+from uuid import uuid4
+
+import httpx
+from mcp.shared.exceptions import McpError
+from mcp.types import CallToolResult, ErrorData, GetPromptResult, Tool
+from shared.logger import logger
+
+from .schemas import ClientConfig, MCPServer, ServerSession
+
+if TYPE_CHECKING:
+    from mcp import ClientSession
+
+    from .pool import PooledSession
+
+TRACE_VERSION = 1
+# The settings which change what a diagnosis sends, by environment variable
+REPLAYED_SETTINGS = {
+    "TOOLS": "tools",
+    "LLM_CONVERSATIONS": "llm_conversations",
+    "COMPRESS_LOGS": "compress_logs",
+    "LOG_SIMILARITY_THRESHOLD": "log_similarity_threshold",
+    "CONTEXT_TOKEN_BUDGET": "context_token_budget",
+    "CONTEXT_KEEP_RECENT_TURNS": "context_keep_recent_turns",
+    "CONTEXT_EXCERPT_CHARS": "context_excerpt_chars",
+}
+
+# The recorder of the diagnosis running in the current task, if any
+ACTIVE_RECORDER: ContextVar[TraceRecorder | None] = ContextVar(
+    "active_recorder", default=None
+)
+
+
+def replayed_settings(config: ClientConfig) -> dict[str, str]:
+    """Return the settings a replay needs, as the variables which set them."""
+    return {
+        variable: json.dumps(getattr(config, name))
+        for variable, name in REPLAYED_SETTINGS.items()
+    }
+
+
+def _digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _arguments_key(name: str, arguments: Any) -> str:
+    return f"{name}:{json.dumps(arguments, sort_keys=True, default=str)}"
+
+
+class TraceRecorder:
+    """Collect the downstream exchanges of a single diagnosis.
+
+    Every LLM server and firewall response, and every prompt and tool call on
+    the MCP sessions, is kept with its latency. Request bodies are kept only
+    as digests, which is all a replay needs to match them, so a trace stays
+    close to the size of the responses.
+    """
+
+    def __init__(self, metadata: dict[str, Any]) -> None:
+        """Initialise an empty trace.
+
+        Args:
+            metadata: The diagnosis arguments and settings the replay needs.
+        """
+        self.metadata = metadata
+        self.events: list[dict[str, Any]] = []
+        self.result: dict[str, Any] | None = None
+
+    def add(self, event: dict[str, Any]) -> None:
+        """Append an exchange to the trace."""
+        self.events.append(event)
+
+    def wrap_sessions(
+        self, sessions: dict[MCPServer, ServerSession]
+    ) -> dict[MCPServer, ServerSession]:
+        """Return the sessions with their calls recorded, noting their tools."""
+        self.metadata["servers"] = {
+            str(server): [
+                tool.model_dump(mode="json", by_alias=True) for tool in session.tools
+            ]
+            for server, session in sessions.items()
+        }
+        return {
+            server: ServerSession(
+                tools=session.tools,
+                session=RecordingSession(session.session, self),
+            )
+            for server, session in sessions.items()
+        }
+
+    def save(self, path: str) -> None:
+        """Write the trace as gzipped JSON lines."""
+        lines = [
+            {"type": "meta", "version": TRACE_VERSION, **self.metadata},
+            *self.events,
+            {"type": "result", **(self.result or {})},
+        ]
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for line in lines:
+                f.write(json.dumps(line, separators=(",", ":"), default=str) + "\n")
+
+
+@asynccontextmanager
+async def record_trace(
+    directory: str | None, metadata: dict[str, Any]
+) -> AsyncIterator[TraceRecorder | None]:
+    """Record the diagnosis run in this context to a trace file in `directory`.
+
+    The recorder is active for this task and every task it starts, so HTTP
+    responses are attributed to the right diagnosis when several run at once.
+    The trace is written on exit, even if the diagnosis failed, creating the
+    directory if needed. A trace which cannot be written is logged and skipped
+    rather than failing the diagnosis.
+
+    Args:
+        directory: Where trace files are written, or None to not record.
+        metadata: The diagnosis arguments and settings the replay needs.
+    """
+    if directory is None:
+        yield None
+        return
+
+    recorder = TraceRecorder({"started_at": time.time(), **metadata})
+    token = ACTIVE_RECORDER.set(recorder)
+    try:
+        yield recorder
+    finally:
+        ACTIVE_RECORDER.reset(token)
+        path = os.path.join(
+            directory,
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{metadata.get('service')}-"
+            f"{uuid4().hex[:8]}.jsonl.gz",
+        )
+        try:
+            os.makedirs(directory, exist_ok=True)
+            await asyncio.to_thread(recorder.save, path)
+            logger.info("Recorded %d exchanges to %s", len(recorder.events), path)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Failed to write the trace %s: %s", path, e)
+
+
+def record_exchange(service: str) -> Callable[[httpx.Response], Awaitable[None]]:
+    """Build a response hook recording exchanges with `service` to the trace."""
+
+    async def _record(response: httpx.Response) -> None:
+        recorder = ACTIVE_RECORDER.get()
+        if recorder is None:
+            return
+        body = await response.aread()
+        try:
+            seconds: float | None = response.elapsed.total_seconds()
+        except RuntimeError:
+            # A response built in memory is never timed
+            seconds = None
+        recorder.add(
+            {
+                "type": "http",
+                "service": service,
+                "method": response.request.method,
+                "path": response.request.url.path,
+                "request": _digest(response.request.content),
+                "status": response.status_code,
+                "body": body.decode(),
+                "seconds": seconds,
+            }
+        )
+
+    return _record
+
+
+class RecordingSession:
+    """An MCP session which records its prompts and tool calls."""
+
+    def __init__(
+        self,
+        session: ClientSession | PooledSession | RecordingSession | ReplaySession,
+        recorder: TraceRecorder,
+    ) -> None:
+        """Wrap a session.
+
+        Args:
+            session: The session the calls are made on.
+            recorder: The trace the calls are recorded to.
+        """
+        self._session = session
+        self._recorder = recorder
+
+    async def call_tool(
+        self, name: str, arguments: dict[str, Any] | None = None
+    ) -> CallToolResult:
+        """Call a tool and record its result, error or how it ended early."""
+        event: dict[str, Any] = {"type": "tool", "name": name, "arguments": arguments}
+        start = time.perf_counter()
+        try:
+            result = await self._session.call_tool(name, arguments)
+        except McpError as e:
+            event["error"] = e.error.model_dump(mode="json")
+            raise
+        except asyncio.CancelledError:
+            # Speculative calls are cancelled whenever the firewall blocks a turn
+            event["cancelled"] = True
+            raise
+        except Exception as e:
+            event["exception"] = f"{type(e).__name__}: {e}"
+            raise
+        else:
+            event["result"] = result.model_dump(mode="json", by_alias=True)
+            return result
+        finally:
+            event["seconds"] = time.perf_counter() - start
+            self._recorder.add(event)
+
+    async def get_prompt(
+        self, name: str, arguments: dict[str, str] | None = None
+    ) -> GetPromptResult:
+        """Get a prompt and record it."""
+        start = time.perf_counter()
+        result = await self._session.get_prompt(name, arguments)
+        self._recorder.add(
+            {
+                "type": "prompt",
+                "name": name,
+                "arguments": arguments,
+                "result": result.model_dump(mode="json", by_alias=True),
+                "seconds": time.perf_counter() - start,
+            }
+        )
+        return result
+
+
+@dataclass
+class Trace:
+    """A recorded diagnosis: its metadata, exchanges and result."""
+
+    metadata: dict[str, Any]
+    events: list[dict[str, Any]]
+    result: dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str) -> Trace:
+        """Read a trace file written by `TraceRecorder.save`."""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        metadata = lines[0]
+        if metadata.get("type") != "meta" or metadata.get("version") != TRACE_VERSION:
+            raise ValueError(f"{path} is not a version {TRACE_VERSION} trace.")
+        result = lines[-1] if lines[-1].get("type") == "result" else {}
+        return cls(
+            metadata=metadata,
+            events=[line for line in lines[1:] if line.get("type") != "result"],
+            result=result,
+        )
+
+    def replayer(self, latency: bool = False) -> Replayer:
+        """Return stand-ins serving this trace's responses."""
+        return Replayer(self, latency=latency)
+
+
+class Replayer:
+    """Serve a trace's recorded responses in place of the real dependencies.
+
+    Tool calls are matched on their name and arguments and HTTP requests on
+    their method, path and body, each taking the earliest unused recording.
+    A request the trace has no exact match for, for example because a code
+    change altered a prompt, gets the next recording for the same tool or
+    path and is counted as diverged, so the replay carries on.
+    """
+
+    def __init__(self, trace: Trace, latency: bool = False) -> None:
+        """Index the trace's recordings.
+
+        Args:
+            trace: The recorded diagnosis.
+            latency: Whether to wait the recorded latency before each response.
+        """
+        self.trace = trace
+        self.latency = latency
+        self.diverged = 0
+        self._prompts: deque[dict[str, Any]] = deque()
+        self._tools: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self._http: dict[tuple[str, str, str], list[dict[str, Any]]] = defaultdict(list)
+        for event in trace.events:
+            if event["type"] == "prompt":
+                self._prompts.append(event)
+            elif event["type"] == "tool":
+                self._tools[event["name"]].append(event)
+            elif event["type"] == "http":
+                key = (event["service"], event["method"], event["path"])
+                self._http[key].append(event)
+
+    def sessions(self) -> dict[MCPServer, ServerSession]:
+        """Return a replaying session per recorded server, with its tools."""
+        return {
+            MCPServer(server): ServerSession(
+                tools=[Tool.model_validate(tool) for tool in tools],
+                session=ReplaySession(self),
+            )
+            for server, tools in self.trace.metadata.get("servers", {}).items()
+        }
+
+    def transport(self, service: str) -> ReplayTransport:
+        """Return an HTTP transport replaying the exchanges with `service`."""
+        return ReplayTransport(self, service)
+
+    def _take(
+        self, recordings: list[dict[str, Any]], matches: Callable[[Any], bool]
+    ) -> dict[str, Any] | None:
+        for i, event in enumerate(recordings):
+            if matches(event):
+                return recordings.pop(i)
+        if recordings:
+            self.diverged += 1
+            return recordings.pop(0)
+        return None
+
+    async def _wait(self, event: dict[str, Any]) -> None:
+        if self.latency and event.get("seconds"):
+            await asyncio.sleep(event["seconds"])
+
+    async def call_tool(self, name: str, arguments: Any) -> CallToolResult:
+        """Return the recorded result of a tool call."""
+        key = _arguments_key(name, arguments)
+        event = self._take(
+            self._tools[name],
+            lambda e: _arguments_key(e["name"], e["arguments"]) == key,
+        )
+        if event is None:
+            self.diverged += 1
+            raise McpError(
+                ErrorData(code=-32602, message=f"No recorded call to {name}.")
+            )
+        await self._wait(event)
+        if "error" in event:
+            raise McpError(ErrorData.model_validate(event["error"]))
+        if event.get("cancelled"):
+            # The turn which cancelled the call discards whatever it returns
+            raise McpError(
+                ErrorData(code=-32603, message=f"The call to {name} was cancelled.")
+            )
+        if "exception" in event:
+            raise RuntimeError(f"The call to {name} failed: {event['exception']}")
+        return CallToolResult.model_validate(event["result"])
+
+    async def get_prompt(self) -> GetPromptResult:
+        """Return the recorded prompt."""
+        if not self._prompts:
+            raise McpError(ErrorData(code=-32602, message="No recorded prompt."))
+        event = self._prompts.popleft()
+        await self._wait(event)
+        return GetPromptResult.model_validate(event["result"])
+
+    async def respond(self, service: str, request: httpx.Request) -> httpx.Response:
+        """Return the recorded response to an HTTP request."""
+        digest = _digest(await request.aread())
+        event = self._take(
+            self._http[(service, request.method, request.url.path)],
+            lambda e: e["request"] == digest,
+        )
+        if event is None:
+            self.diverged += 1
+            return httpx.Response(404, json={"detail": "No recorded response."})
+        await self._wait(event)
+        return httpx.Response(
+            event["status"],
+            content=event["body"].encode(),
+            headers={"content-type": "application/json"},
+        )
+
+
+class ReplaySession:
+    """An MCP session answering from a trace."""
+
+    def __init__(self, replayer: Replayer) -> None:
+        """Serve the replayer's recorded prompts and tool calls."""
+        self._replayer = replayer
+
+    async def call_tool(
+        self, name: str, arguments: dict[str, Any] | None = None
+    ) -> CallToolResult:
+        """Return the recorded result of a tool call."""
+        return await self._replayer.call_tool(name, arguments)
+
+    async def get_prompt(
+        self, name: str, arguments: dict[str, str] | None = None
+    ) -> GetPromptResult:
+        """Return the recorded prompt."""
+        return await self._replayer.get_prompt()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """An HTTP transport answering from a trace."""
+
+    def __init__(self, replayer: Replayer, service: str) -> None:
+        """Serve the replayer's recorded exchanges with `service`."""
+        self._replayer = replayer
+        self._service = service
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Return the recorded response to the request."""
+        return await self._replayer.respond(self._service, request)
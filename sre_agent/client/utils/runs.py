@@ -0,0 +1,275 @@
+"""A local SQLite store of diagnosis runs for latency and token analytics."""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any
+from uuid import uuid4
+
+from shared.logger import logger
+
+TOKEN_TYPES = ("input", "output", "cache_creation", "cache_read")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    service TEXT NOT NULL,
+    namespace TEXT,
+    container TEXT,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    turns INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cache_creation_tokens INTEGER NOT NULL,
+    cache_read_tokens INTEGER NOT NULL,
+    llm_seconds REAL NOT NULL,
+    tool_seconds REAL NOT NULL,
+    firewall_seconds REAL NOT NULL,
+    breakdown TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_service ON runs (service, started_at);
+"""
+
+_SUMMARY_COLUMNS = (
+    "id",
+    "service",
+    "namespace",
+    "container",
+    "started_at",
+    "duration",
+    "outcome",
+    "turns",
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_tokens",
+    "cache_read_tokens",
+    "llm_seconds",
+    "tool_seconds",
+    "firewall_seconds",
+)
+
+
+def percentiles(values: list[float]) -> dict[str, float] | None:
+    """Return the nearest-rank p50, p90 and p99, the mean and the maximum."""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def _rank(p: float) -> float:
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        "p50": _rank(50),
+        "p90": _rank(90),
+        "p99": _rank(99),
+        "mean": sum(ordered) / len(ordered),
+        "max": ordered[-1],
+    }
+
+
+class RunStore:
+    """Keep a record of each diagnosis with a per-turn breakdown.
+
+    Every run stores its totals in columns, for listing and filtering, and
+    its turns as JSON: the LLM latency and tokens of each turn, and the
+    latency and result size of each tool call and the firewall time it
+    caused. Only the most recent `max_runs` runs are kept.
+
+    Calls block on SQLite, so the async API runs them on a thread.
+    """
+
+    def __init__(self, path: str = "runs.db", max_runs: int = 10_000) -> None:
+        """Open the store, creating its table if needed.
+
+        Args:
+            path: The SQLite database file, or `:memory:`. Its directory is
+                created if needed.
+            max_runs: The number of runs kept.
+        """
+        self.path = path
+        self.max_runs = max_runs
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def record(  # noqa: PLR0913
+        self,
+        service: str,
+        *,
+        namespace: str | None,
+        container: str | None,
+        started_at: float,
+        duration: float,
+        outcome: str,
+        result: dict[str, Any] | None,
+    ) -> str:
+        """Store a finished run.
+
+        Args:
+            service: The service diagnosed.
+            namespace: The Kubernetes namespace, if given.
+            container: The container, if given.
+            started_at: The Unix time the run started.
+            duration: The run's duration in seconds.
+            outcome: How the run ended, `ok`, `timeout` or `error`.
+            result: The result of `process_query`, if the run finished.
+
+        Returns:
+            The run's ID.
+        """
+        turns: list[dict[str, Any]] = (result or {}).get("turns", [])
+        usage = (result or {}).get("token_usage", {})
+        run_id = uuid4().hex
+        row = {
+            "id": run_id,
+            "service": service,
+            "namespace": namespace,
+            "container": container,
+            "started_at": started_at,
+            "duration": duration,
+            "outcome": outcome,
+            "turns": len(turns),
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+            "cache_creation_tokens": usage.get("cache_creation_tokens", 0),
+            "cache_read_tokens": usage.get("cache_read_tokens", 0),
+            "llm_seconds": sum(t["llm_seconds"] for t in turns),
+            "tool_seconds": sum(
+                tool["seconds"] or 0.0 for t in turns for tool in t["tools"]
+            ),
+            "firewall_seconds": (result or {})
+            .get("timing", {})
+            .get("firewall_duration", 0.0),
+            "breakdown": json.dumps(turns),
+        }
+        with self._lock, self._db:
+            self._db.execute(
+                f"INSERT INTO runs ({', '.join(row)}) "  # nosec B608
+                f"VALUES ({', '.join(':' + column for column in row)})",
+                row,
+            )
+            self._db.execute(
+                "DELETE FROM runs WHERE id NOT IN "
+                "(SELECT id FROM runs ORDER BY started_at DESC LIMIT ?)",
+                (self.max_runs,),
+            )
+        logger.info("Recorded run %s for %s (%s)", run_id, service, outcome)
+        return run_id
+
+    def runs(self, service: str | None = None, limit: int = 50) -> list[dict[str, Any]]:
+        """Return the totals of the most recent runs, newest first."""
+        query = f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM runs"  # nosec B608
+        parameters: tuple[Any, ...] = ()
+        if service is not None:
+            query += " WHERE service = ?"
+            parameters = (service,)
+        with self._lock:
+            rows = self._db.execute(
+                query + " ORDER BY started_at DESC LIMIT ?", (*parameters, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, run_id: str) -> dict[str, Any] | None:
+        """Return a run's totals and per-turn breakdown, if it is stored."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        run["breakdown"] = json.loads(run["breakdown"])
+        return run
+
+    def stats(
+        self, service: str | None = None, since: float | None = None
+    ) -> dict[str, Any]:
+        """Aggregate the stored runs per service.
+
+        Args:
+            service: Only aggregate this service's runs.
+            since: Only aggregate runs started at or after this Unix time.
+
+        Returns:
+            For each service, the number of runs by outcome and the
+            percentiles of run duration, turns, LLM latency per turn, firewall
+            time per run and the latency and result size of each tool, with
+            token totals by type.
+        """
+        conditions = ["started_at >= ?"]
+        parameters: list[Any] = [since or 0.0]
+        if service is not None:
+            conditions.append("service = ?")
+            parameters.append(service)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM runs WHERE {' AND '.join(conditions)}",  # nosec B608
+                parameters,
+            ).fetchall()
+
+        by_service: dict[str, list[sqlite3.Row]] = defaultdict(list)
+        for row in rows:
+            by_service[row["service"]].append(row)
+        return {
+            "generated_at": time.time(),
+            "services": {
+                name: self._aggregate(service_rows)
+                for name, service_rows in sorted(by_service.items())
+            },
+        }
+
+    @staticmethod
+    def _aggregate(rows: list[sqlite3.Row]) -> dict[str, Any]:
+        llm: list[float] = []
+        tools: dict[str, dict[str, list[float]]] = defaultdict(
+            lambda: {"seconds": [], "result_chars": []}
+        )
+        cached: Counter[str] = Counter()
+        for row in rows:
+            for turn in json.loads(row["breakdown"]):
+                llm.append(turn["llm_seconds"])
+                for tool in turn["tools"]:
+                    values = tools[tool["name"]]
+                    if tool["seconds"] is None:
+                        cached[tool["name"]] += 1
+                        continue
+                    values["seconds"].append(tool["seconds"])
+                    values["result_chars"].append(tool["result_chars"])
+
+        return {
+            "runs": len(rows),
+            "outcomes": dict(Counter(row["outcome"] for row in rows)),
+            "duration_seconds": percentiles([row["duration"] for row in rows]),
+            "turns": percentiles([row["turns"] for row in rows]),
+            "llm_seconds_per_turn": percentiles(llm),
+            "firewall_seconds": percentiles([row["firewall_seconds"] for row in rows]),
+            "tokens": {
+                kind: sum(row[f"{kind}_tokens"] for row in rows) for kind in TOKEN_TYPES
+            },
+            "tools": {
+                name: {
+                    "calls": len(values["seconds"]),
+                    "cached": cached[name],
+                    "latency_seconds": percentiles(values["seconds"]),
+                    "result_chars": percentiles(values["result_chars"]),
+                }
+                for name, values in sorted(tools.items())
+            },
+        }
@@ -5,17 +5,63 @@ import json
 import os
 from dataclasses import dataclass, field, fields
 from enum import StrEnum
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from dotenv import load_dotenv
 
 if TYPE_CHECKING:
     from _typeshed import DataclassInstance
+
+    from .pool import PooledSession
+    from .replay import RecordingSession, ReplaySession
 from mcp import ClientSession
 from mcp.types import Tool
 from shared.logger import logger
+from shared.schemas import ToolUseBlock
 
 DEFAULT_QUERY_TIMEOUT = 300
+DEFAULT_MCP_CONNECT_TIMEOUT = 30
+DEFAULT_MCP_MAX_BACKOFF = 30
+DEFAULT_DOWNSTREAM_TIMEOUT = 60
+DEFAULT_DOWNSTREAM_MAX_CONNECTIONS = 20
+DEFAULT_TOOL_CONCURRENCY = 4
+DEFAULT_TOOL_CACHE_MAX_ENTRIES = 256
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_HEALTH_CHECK_INTERVAL = 15.0
+DEFAULT_HEALTH_CHECK_TIMEOUT = 5.0
+DEFAULT_RUN_STORE_PATH = "/data/runs.db"
+DEFAULT_RUN_STORE_MAX_RUNS = 10_000
+DEFAULT_JOB_QUEUE_SIZE = 32
+DEFAULT_JOB_HISTORY = 100
+DEFAULT_LOG_SIMILARITY_THRESHOLD = 0.5
+DEFAULT_CONTEXT_TOKEN_BUDGET = 100_000
+DEFAULT_CONTEXT_KEEP_RECENT_TURNS = 2
+DEFAULT_CONTEXT_EXCERPT_CHARS = 1000
+# Read-only tools whose results are cached, with their time to live in seconds.
+# Logs are the live signal of a diagnosis, so get_logs is only cached on request.
+DEFAULT_TOOL_CACHE_TTLS = {
+    "list_pods": 15.0,
+    "get_file_contents": 300.0,
+}
+# Tools with side effects which run one at a time, in the order the LLM asked
+DEFAULT_SEQUENTIAL_TOOLS = [
+    "slack_post_message",
+    "slack_reply_to_thread",
+    "slack_add_reaction",
+    "create_issue",
+    "add_issue_comment",
+    "update_issue",
+    "create_branch",
+    "create_or_update_file",
+    "push_files",
+    "create_pull_request",
+]
+# Read-only tools which may start before the firewall has checked the call
+DEFAULT_SPECULATIVE_TOOLS = [
+    "list_pods",
+    "get_logs",
+    "get_file_contents",
+]
 
 load_dotenv()
 
@@ -48,12 +94,66 @@ def _load_json_list_env(var_name: str) -> list[str]:
     return [item.strip() for item in raw_value.split(",") if item.strip()]
 
 
+def _load_json_dict_env(var_name: str, default: dict[str, float]) -> dict[str, float]:
+    """Load a JSON object of numbers from env; fall back to default if unset."""
+    raw_value = os.getenv(var_name)
+    if raw_value is None or raw_value.strip() == "":
+        return dict(default)
+
+    try:
+        parsed = json.loads(raw_value)
+        if isinstance(parsed, dict):
+            return {str(k): float(v) for k, v in parsed.items()}
+    except Exception as e:
+        logger.debug("Failed to parse %s as JSON object: %s", var_name, e)
+
+    logger.warning("Ignoring invalid %s, using the defaults.", var_name)
+    return dict(default)
+
+
+def _load_json_str_dict_env(var_name: str) -> dict[str, str]:
+    """Load a JSON object of strings from env; treat unset or invalid as {}."""
+    raw_value = os.getenv(var_name)
+    if raw_value is None or raw_value.strip() == "":
+        return {}
+
+    try:
+        parsed = json.loads(raw_value)
+        if isinstance(parsed, dict):
+            return {str(k): str(v) for k, v in parsed.items()}
+    except Exception as e:
+        logger.debug("Failed to parse %s as JSON object: %s", var_name, e)
+
+    logger.warning("Ignoring invalid %s.", var_name)
+    return {}
+
+
+def _load_bool_env(var_name: str, default: bool) -> bool:
+    """Load a boolean flag from env; accept true/false, yes/no and 1/0."""
+    raw_value = os.getenv(var_name)
+    if raw_value is None or raw_value.strip() == "":
+        return default
+    return raw_value.strip().lower() in {"1", "true", "yes", "on"}
+
+
 @dataclass
 class ServerSession:
     """A dataclass to hold the session and tools for a server."""
 
     tools: list[Tool]
-    session: ClientSession
+    session: ClientSession | PooledSession | RecordingSession | ReplaySession
+
+
+@dataclass
+class ToolOutcome:
+    """The outcome of a single tool call requested by the LLM."""
+
+    content: ToolUseBlock
+    result_content: list[Any] = field(default_factory=list)
+    is_error: bool = False
+    blocked: bool = False
+    # The seconds the call took, or None if it was served from the cache
+    duration: float | None = None
 
 
 class MCPServer(StrEnum):
@@ -90,6 +190,101 @@ class ClientConfig:
         os.getenv("QUERY_TIMEOUT", DEFAULT_QUERY_TIMEOUT) or DEFAULT_QUERY_TIMEOUT
     )
     services: list[str] = field(default_factory=lambda: _load_json_list_env("SERVICES"))
+    mcp_connect_timeout: int = int(
+        os.getenv("MCP_CONNECT_TIMEOUT", DEFAULT_MCP_CONNECT_TIMEOUT)
+        or DEFAULT_MCP_CONNECT_TIMEOUT
+    )
+    mcp_max_backoff: int = int(
+        os.getenv("MCP_MAX_BACKOFF", DEFAULT_MCP_MAX_BACKOFF) or DEFAULT_MCP_MAX_BACKOFF
+    )
+    # SSE URLs of MCP servers which are not at their default address
+    mcp_server_urls: dict[str, str] = field(
+        default_factory=lambda: _load_json_str_dict_env("MCP_SERVER_URLS")
+    )
+    llm_server_url: str = os.getenv("LLM_SERVER_URL", "http://llm-server:8000")
+    llm_timeout: float = float(
+        os.getenv("LLM_TIMEOUT", DEFAULT_DOWNSTREAM_TIMEOUT)
+        or DEFAULT_DOWNSTREAM_TIMEOUT
+    )
+    llm_max_connections: int = int(
+        os.getenv("LLM_MAX_CONNECTIONS", DEFAULT_DOWNSTREAM_MAX_CONNECTIONS)
+        or DEFAULT_DOWNSTREAM_MAX_CONNECTIONS
+    )
+    firewall_url: str = os.getenv("FIREWALL_URL", "http://llama-firewall:8000")
+    firewall_timeout: float = float(
+        os.getenv("FIREWALL_TIMEOUT", DEFAULT_DOWNSTREAM_TIMEOUT)
+        or DEFAULT_DOWNSTREAM_TIMEOUT
+    )
+    firewall_max_connections: int = int(
+        os.getenv("FIREWALL_MAX_CONNECTIONS", DEFAULT_DOWNSTREAM_MAX_CONNECTIONS)
+        or DEFAULT_DOWNSTREAM_MAX_CONNECTIONS
+    )
+    tool_concurrency: int = int(
+        os.getenv("TOOL_CONCURRENCY", DEFAULT_TOOL_CONCURRENCY)
+        or DEFAULT_TOOL_CONCURRENCY
+    )
+    sequential_tools: list[str] = field(
+        default_factory=lambda: _load_json_list_env("SEQUENTIAL_TOOLS")
+        or DEFAULT_SEQUENTIAL_TOOLS
+    )
+    speculative_tools: list[str] = field(
+        default_factory=lambda: (
+            _load_json_list_env("SPECULATIVE_TOOLS")
+            if "SPECULATIVE_TOOLS" in os.environ
+            else DEFAULT_SPECULATIVE_TOOLS
+        )
+    )
+    tool_cache_ttls: dict[str, float] = field(
+        default_factory=lambda: _load_json_dict_env(
+            "TOOL_CACHE_TTLS", DEFAULT_TOOL_CACHE_TTLS
+        )
+    )
+    tool_cache_max_entries: int = int(
+        os.getenv("TOOL_CACHE_MAX_ENTRIES", DEFAULT_TOOL_CACHE_MAX_ENTRIES)
+        or DEFAULT_TOOL_CACHE_MAX_ENTRIES
+    )
+    job_workers: int = int(
+        os.getenv("JOB_WORKERS", DEFAULT_JOB_WORKERS) or DEFAULT_JOB_WORKERS
+    )
+    job_queue_size: int = int(
+        os.getenv("JOB_QUEUE_SIZE", DEFAULT_JOB_QUEUE_SIZE) or DEFAULT_JOB_QUEUE_SIZE
+    )
+    job_history: int = int(
+        os.getenv("JOB_HISTORY", DEFAULT_JOB_HISTORY) or DEFAULT_JOB_HISTORY
+    )
+    health_check_interval: float = float(
+        os.getenv("HEALTH_CHECK_INTERVAL", DEFAULT_HEALTH_CHECK_INTERVAL)
+        or DEFAULT_HEALTH_CHECK_INTERVAL
+    )
+    health_check_timeout: float = float(
+        os.getenv("HEALTH_CHECK_TIMEOUT", DEFAULT_HEALTH_CHECK_TIMEOUT)
+        or DEFAULT_HEALTH_CHECK_TIMEOUT
+    )
+    run_store_path: str = os.getenv("RUN_STORE_PATH", DEFAULT_RUN_STORE_PATH)
+    run_store_max_runs: int = int(
+        os.getenv("RUN_STORE_MAX_RUNS", DEFAULT_RUN_STORE_MAX_RUNS)
+        or DEFAULT_RUN_STORE_MAX_RUNS
+    )
+    # Where a trace of every diagnosis is written for replay; unset to not record
+    trace_record_dir: str | None = os.getenv("TRACE_RECORD_DIR") or None
+    llm_conversations: bool = _load_bool_env("LLM_CONVERSATIONS", False)
+    compress_logs: bool = _load_bool_env("COMPRESS_LOGS", False)
+    log_similarity_threshold: float = float(
+        os.getenv("LOG_SIMILARITY_THRESHOLD", DEFAULT_LOG_SIMILARITY_THRESHOLD)
+        or DEFAULT_LOG_SIMILARITY_THRESHOLD
+    )
+    context_token_budget: int = int(
+        os.getenv("CONTEXT_TOKEN_BUDGET", DEFAULT_CONTEXT_TOKEN_BUDGET)
+        or DEFAULT_CONTEXT_TOKEN_BUDGET
+    )
+    context_keep_recent_turns: int = int(
+        os.getenv("CONTEXT_KEEP_RECENT_TURNS", DEFAULT_CONTEXT_KEEP_RECENT_TURNS)
+        or DEFAULT_CONTEXT_KEEP_RECENT_TURNS
+    )
+    context_excerpt_chars: int = int(
+        os.getenv("CONTEXT_EXCERPT_CHARS", DEFAULT_CONTEXT_EXCERPT_CHARS)
+        or DEFAULT_CONTEXT_EXCERPT_CHARS
+    )
 
     def __post_init__(self) -> None:
         """A post-constructor method for the dataclass."""
@@ -1,58 +1,176 @@
 """Encapsulation of LlamaFirewall functionality."""
-import os
-from collections.abc import AsyncGenerator
+import asyncio
+import logging
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable
 from contextlib import asynccontextmanager
+from typing import Any
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from llamafirewall import (
     LlamaFirewall,
+    Role,
     ScanDecision,
+    ScannerType,
     ScanResult,
     ToolMessage,
     UserMessage,
 )
+from opentelemetry import trace
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
-from transformers import AutoModelForSequenceClassification
-from transformers.models.auto.tokenization_auto import AutoTokenizer
 
-STATE = {}
+# Support both package (tests) and module-only (container) layouts
+try:  # package layout
+    from sre_agent.firewall.utils.cache import ScanCache  # type: ignore
+    from sre_agent.firewall.utils.metrics import (  # type: ignore
+        SCAN_DURATION,
+        SCANS_IN_PROGRESS,
+    )
+    from sre_agent.firewall.utils.model_store import (  # type: ignore
+        Verification,
+        ensure_model,
+    )
+    from sre_agent.firewall.utils.prefilter import (  # type: ignore
+        Prefilter,
+        PrefilterMode,
+    )
+    from sre_agent.firewall.utils.scanners import (  # type: ignore
+        CHUNKED_PROMPT_GUARD,
+        ChunkedPromptGuardScanner,
+    )
+    from sre_agent.firewall.utils.schemas import FirewallConfig  # type: ignore
+    from sre_agent.firewall.utils.tracing import (  # type: ignore
+        configure_tracing,
+        server_span,
+    )
+except ModuleNotFoundError:  # module-only layout inside container
+    from utils.cache import ScanCache  # type: ignore
+    from utils.metrics import SCAN_DURATION, SCANS_IN_PROGRESS  # type: ignore
+    from utils.model_store import Verification, ensure_model  # type: ignore
+    from utils.prefilter import Prefilter, PrefilterMode  # type: ignore
+    from utils.scanners import (  # type: ignore
+        CHUNKED_PROMPT_GUARD,
+        ChunkedPromptGuardScanner,
+    )
+    from utils.schemas import FirewallConfig  # type: ignore
+    from utils.tracing import configure_tracing, server_span  # type: ignore
 
+logging.basicConfig(level=logging.INFO)
+LOG = logging.getLogger(__name__)
 
-def load_models() -> None:
-    """Asynchronously load the models for LlamaFirewall."""
-    model_name = "meta-llama/Llama-Prompt-Guard-2-86M"
+MODEL_NAME = "meta-llama/Llama-Prompt-Guard-2-86M"
 
-    if not os.environ.get("HF_HOME"):
-        os.environ["HF_HOME"] = "~/.cache/huggingface"
+STATE: dict[str, Any] = {}
 
-    model_path = os.path.expanduser(
-        os.path.join(os.environ["HF_HOME"], model_name.replace("/", "--"))
-    )
+TRACER = trace.get_tracer(__name__)
 
-    model = AutoModelForSequenceClassification.from_pretrained(model_name)  # type: ignore[no-untyped-call]
-    model.save_pretrained(model_path)
 
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    tokenizer.save_pretrained(model_path)
+def load_models(config: FirewallConfig) -> str:
+    """Make sure a verified local copy of the model exists and return its path."""
+    return ensure_model(MODEL_NAME, Verification(config.model_verification))
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Lifespan context manager for the FastAPI app.
 
-    This function initializes the LlamaFirewall and yields control to the app.
+    This function initializes the LlamaFirewall, warms up the model so the
+    service only reports healthy once scans are fast, and yields control to
+    the app.
     """
-    load_models()
+    start = time.perf_counter()
+    config = FirewallConfig()
+    model_path = load_models(config)
+    verified = time.perf_counter()
 
-    STATE["llama_firewall"] = LlamaFirewall()
+    workers = config.workers
+    if workers and config.backend != "torch":
+        # ONNX Runtime sessions are not fork-safe, and already use every core
+        LOG.warning("FIREWALL_WORKERS needs the torch backend, running in-process")
+        workers = 0
+
+    # Score long content in windows with a classifier loaded once, rather than
+    # the built-in scanner which truncates to one window and reloads per scan
+    STATE["batcher"] = ChunkedPromptGuardScanner.configure(
+        model_path,
+        window=config.prompt_guard_window,
+        overlap=config.prompt_guard_overlap,
+        batch_size=config.prompt_guard_batch_size,
+        threshold=config.prompt_guard_threshold,
+        backend=config.backend,
+        threads=config.inference_threads,
+        max_wait=config.micro_batch_wait_ms / 1000,
+        workers=workers,
+    )
+    STATE["llama_firewall"] = LlamaFirewall(
+        {
+            Role.TOOL: [ScannerType.CODE_SHIELD, CHUNKED_PROMPT_GUARD],
+            Role.USER: [CHUNKED_PROMPT_GUARD],
+            Role.SYSTEM: [],
+            Role.ASSISTANT: [ScannerType.CODE_SHIELD],
+            Role.MEMORY: [],
+        }
+    )
+
+    # Content the pre-filter passes as clean skips Prompt Guard when enforced,
+    # but tool content is still checked by the cheap CodeShield scanner
+    STATE["light_firewall"] = LlamaFirewall(
+        {
+            Role.TOOL: [ScannerType.CODE_SHIELD],
+            Role.USER: [],
+            Role.SYSTEM: [],
+            Role.ASSISTANT: [ScannerType.CODE_SHIELD],
+            Role.MEMORY: [],
+        }
+    )
+    STATE["prefilter"] = Prefilter(
+        PrefilterMode(config.prefilter_mode), max_chars=config.prefilter_max_chars
+    )
+
+    STATE["scan_cache"] = (
+        ScanCache(
+            max_entries=config.scan_cache_max_entries,
+            max_bytes=config.scan_cache_max_bytes,
+            ttl=config.scan_cache_ttl,
+        )
+        if config.scan_cache_ttl > 0
+        else None
+    )
+
+    loaded = time.perf_counter()
+    warmup = ChunkedPromptGuardScanner.warmup()
+    LOG.info(
+        "Firewall ready in %.2f seconds: model verified in %.2f, loaded in %.2f, "
+        "warmed up in %.2f",
+        time.perf_counter() - start,
+        verified - start,
+        loaded - verified,
+        warmup,
+    )
+    # The span exporter runs on a thread, so tracing starts once any workers
+    # have been forked from this process
+    tracer_provider = configure_tracing("llama-firewall")
 
     yield
+    await STATE["batcher"].close()
+    if tracer_provider:
+        tracer_provider.shutdown()
     STATE.clear()
 
 
 app = FastAPI(lifespan=lifespan)
 
 
+@app.middleware("http")
+async def trace_requests(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Trace each request as part of the caller's trace."""
+    with server_span(TRACER, f"{request.method} {request.url.path}", request.headers):
+        return await call_next(request)
+
+
 class FirewallPayload(BaseModel):
     """Payload for the firewall check.
 
@@ -77,6 +195,72 @@ class FirewallResponse(BaseModel):
     result: ScanResult
 
 
+class FirewallBatchPayload(BaseModel):
+    """Payload for checking several texts at once.
+
+    Attributes:
+        items: The texts to scan.
+    """
+
+    items: list[FirewallPayload]
+
+
+class FirewallBatchResponse(BaseModel):
+    """Results of a batch scan.
+
+    Attributes:
+        results: The result of each scan, in the order of the items.
+    """
+
+    results: list[FirewallResponse]
+
+
+async def _scan(payload: FirewallPayload) -> FirewallResponse:
+    start = time.perf_counter()
+    kind = "tool" if payload.is_tool else "user"
+    with (
+        TRACER.start_as_current_span(
+            "firewall.scan", attributes={"kind": kind}
+        ) as span,
+        SCANS_IN_PROGRESS.track_inprogress(),
+    ):
+        path, result = await _scan_result(payload)
+        block = result.decision == ScanDecision.BLOCK
+        span.set_attributes({"path": path, "block": block, "score": result.score})
+    SCAN_DURATION.labels(kind, path, "block" if block else "allow").observe(
+        time.perf_counter() - start
+    )
+    return FirewallResponse(block=block, result=result)
+
+
+async def _scan_result(payload: FirewallPayload) -> tuple[str, ScanResult]:
+    """Scan content and name what answered: the cache, light firewall or model."""
+    cache = STATE["scan_cache"]
+    result = cache.get(payload.content, payload.is_tool) if cache else None
+    path = "cache"
+    if result is None:
+        path = "model"
+        msg = (
+            ToolMessage(content=payload.content)
+            if payload.is_tool
+            else UserMessage(content=payload.content)
+        )
+        prefilter = STATE["prefilter"]
+        if prefilter.mode == PrefilterMode.OFF:
+            result = await STATE["llama_firewall"].scan_async(msg)
+        else:
+            decision = prefilter.classify(payload.content, payload.is_tool)
+            if prefilter.enforced and not decision.needs_model:
+                path = "light"
+                result = await STATE["light_firewall"].scan_async(msg)
+            else:
+                result = await STATE["llama_firewall"].scan_async(msg)
+                prefilter.record(decision, result.decision == ScanDecision.BLOCK)
+        if cache:
+            cache.put(payload.content, payload.is_tool, result)
+    return path, result
+
+
 @app.post("/check")
 async def check_with_llama_firewall(
     payload: FirewallPayload,
@@ -90,13 +274,58 @@ async def check_with_llama_firewall(
     Returns:
         FirewallResponse: The result of the scan, including block status and reason.
     """
-    msg = (
-        ToolMessage(content=payload.content)
-        if payload.is_tool
-        else UserMessage(content=payload.content)
-    )
-    result = await STATE["llama_firewall"].scan_async(msg)
-    return FirewallResponse(block=result.decision == ScanDecision.BLOCK, result=result)
+    return await _scan(payload)
+
+
+@app.post("/check_batch")
+async def check_batch_with_llama_firewall(
+    payload: FirewallBatchPayload,
+) -> FirewallBatchResponse:
+    """Scan several texts with LlamaFirewall in a single request.
+
+    Args:
+        payload: The payload containing the texts to scan.
+
+    Returns:
+        FirewallBatchResponse: The result of each scan, in the order of the items.
+    """
+    # Scanned concurrently so the items share batched forward passes
+    results = await asyncio.gather(*(_scan(item) for item in payload.items))
+    return FirewallBatchResponse(results=list(results))
+
+
+@app.get("/scan-cache")
+def scan_cache_stats() -> dict[str, Any]:
+    """Report the hit, miss and eviction counters of the scan result cache."""
+    cache = STATE["scan_cache"]
+    return cache.stats() if cache else {"enabled": False}
+
+
+@app.get("/batching")
+def batching_stats() -> dict[str, Any]:
+    """Report the queue wait and batch size histograms of the micro-batcher."""
+    stats: dict[str, Any] = STATE["batcher"].stats()
+    return stats
+
+
+@app.get("/workers")
+def worker_stats() -> dict[str, Any]:
+    """Report the memory of the service process and of each inference worker."""
+    pool = ChunkedPromptGuardScanner.pool
+    return pool.stats() if pool else {"workers": 0}
+
+
+@app.get("/prefilter")
+def prefilter_stats() -> dict[str, Any]:
+    """Report the pre-filter's decisions by tier and its agreement with the model."""
+    stats: dict[str, Any] = STATE["prefilter"].stats()
+    return stats
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    """Expose the firewall's metrics in the Prometheus text format."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/health")
@@ -1,28 +1,9 @@
-echo "Downloading Llama-Prompt-Guard-2-86M model..."
+echo "Checking the local copy of Llama-Prompt-Guard-2-86M, downloading it if needed..."
 
-uv python3 -c "
-from transformers import (
-    AutoModelForSequenceClassification,
-    AutoTokenizer,
-)
-import os
+uv run python3 -c "
+from utils.model_store import ensure_model
 
-# Define the model name before using it
-model_name = 'meta-llama/Llama-Prompt-Guard-2-86M'
-
-if not os.environ.get('HF_HOME'):
-    os.environ['HF_HOME'] = '~/.cache/huggingface'
-
-model_path = os.path.expanduser(
-    os.path.join(os.environ['HF_HOME'], model_name.replace('/', '--'))
-)
-
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-
-# Save the model and tokenizer locally
-model.save_pretrained(model_path)
-tokenizer.save_pretrained(model_path)
+ensure_model('meta-llama/Llama-Prompt-Guard-2-86M')
 "
 
 echo "... done!"
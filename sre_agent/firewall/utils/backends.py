@@ -0,0 +1,142 @@
+"""Inference backends for the Prompt Guard classifier."""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Callable
+from enum import StrEnum
+
+import numpy as np
+import numpy.typing as npt
+
+# Computes the logits of a padded batch of token IDs and its attention mask
+Classifier = Callable[
+    [npt.NDArray[np.int64], npt.NDArray[np.int64]], npt.NDArray[np.float32]
+]
+
+ONNX_OPSET = 17
+
+
+class InferenceBackend(StrEnum):
+    """The runtimes the classifier can run on."""
+
+    TORCH = "torch"
+    ONNX = "onnx"
+
+
+def softmax_scores(logits: npt.NDArray[np.float32]) -> list[float]:
+    """Return the probability of the last, malicious, class of each row."""
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    probabilities = shifted / shifted.sum(axis=-1, keepdims=True)
+    return [float(p) for p in probabilities[:, -1]]
+
+
+def onnx_model_path(model_path: str) -> str:
+    """Where the quantised ONNX export of a model is kept."""
+    return os.path.join(model_path, "onnx", "model.int8.onnx")
+
+
+def export_onnx(model_path: str, output_path: str) -> None:
+    """Export a sequence classifier to ONNX with int8 dynamic quantisation.
+
+    Weights of the linear layers are stored as int8 and activations are
+    quantised at run time, which suits a CPU-bound encoder like Prompt Guard.
+
+    Args:
+        model_path: The local path of the PyTorch model.
+        output_path: The path to write the quantised model to.
+    """
+    # Only needed to export, so the runtime image may omit the exporters
+    import torch  # noqa: PLC0415
+    from onnxruntime.quantization import QuantType, quantize_dynamic  # noqa: PLC0415
+    from transformers import AutoModelForSequenceClassification  # noqa: PLC0415
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
+    sample = torch.ones((1, 8), dtype=torch.int64)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    float_path = f"{output_path}.fp32"
+    torch.onnx.export(
+        model,
+        (sample, sample),
+        float_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=ONNX_OPSET,
+    )
+    # Write to a temporary file so a partial export is never loaded
+    quantize_dynamic(float_path, f"{output_path}.tmp", weight_type=QuantType.QInt8)
+    os.replace(f"{output_path}.tmp", output_path)
+    os.remove(float_path)
+
+
+def _torch_classifier(model_path: str, threads: int) -> Classifier:
+    import torch  # noqa: PLC0415
+    from transformers import AutoModelForSequenceClassification  # noqa: PLC0415
+
+    if threads:
+        torch.set_num_threads(threads)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    # Safetensors weights are memory-mapped rather than read into new buffers
+    model = AutoModelForSequenceClassification.from_pretrained(
+        model_path, use_safetensors=True
+    )
+    model.to(device).eval()
+
+    def classify(
+        input_ids: npt.NDArray[np.int64], attention_mask: npt.NDArray[np.int64]
+    ) -> npt.NDArray[np.float32]:
+        with torch.inference_mode():
+            logits = model(
+                input_ids=torch.from_numpy(input_ids).to(device),
+                attention_mask=torch.from_numpy(attention_mask).to(device),
+            ).logits
+        return logits.float().cpu().numpy()  # type: ignore[no-any-return]
+
+    return classify
+
+
+def _onnx_classifier(model_path: str, threads: int) -> Classifier:
+    import onnxruntime as ort  # noqa: PLC0415
+
+    path = onnx_model_path(model_path)
+    if not os.path.exists(path):
+        export_onnx(model_path, path)
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def classify(
+        input_ids: npt.NDArray[np.int64], attention_mask: npt.NDArray[np.int64]
+    ) -> npt.NDArray[np.float32]:
+        (logits,) = session.run(
+            ["logits"], {"input_ids": input_ids, "attention_mask": attention_mask}
+        )
+        return logits  # type: ignore[no-any-return]
+
+    return classify
+
+
+def load_classifier(
+    backend: InferenceBackend, model_path: str, threads: int = 0
+) -> Classifier:
+    """Load the classifier on a backend.
+
+    Args:
+        backend: The runtime to run the classifier on.
+        model_path: The local path of the PyTorch model. The ONNX backend
+            exports and quantises it on first use.
+        threads: The threads used by inference, 0 for the runtime's default.
+
+    Returns:
+        A function computing the logits of a batch.
+    """
+    if backend == InferenceBackend.ONNX:
+        return _onnx_classifier(model_path, threads)
+    return _torch_classifier(model_path, threads)
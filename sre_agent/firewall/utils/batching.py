@@ -0,0 +1,225 @@
+"""Micro-batching of concurrent inference requests."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
+
+I = TypeVar("I")  # noqa: E741
+O = TypeVar("O")  # noqa: E741
+
+QUEUE_WAIT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Histogram:
+    """A histogram of observations in fixed buckets."""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        """Initialise empty buckets.
+
+        Args:
+            buckets: The inclusive upper bound of each bucket, in order.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record an observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the cumulative count at each bucket bound, the count and sum."""
+        cumulative, total = {}, 0
+        for bound, count in zip(
+            (*map(str, self.buckets), "+Inf"), self.counts, strict=True
+        ):
+            total += count
+            cumulative[bound] = total
+        return {"buckets": cumulative, "count": self.count, "sum": self.sum}
+
+
+@dataclass
+class _Request(Generic[I, O]):  # noqa: UP046
+    items: list[I]
+    future: asyncio.Future[list[O]]
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher(Generic[I, O]):  # noqa: UP046
+    """Run the items of concurrent requests through one batched inference call.
+
+    Requests are queued. Once the oldest has waited `max_wait` seconds, or the
+    queue holds `max_batch_size` items, whole requests are taken in arrival
+    order up to that size and inferred together on the executor, and each
+    request gets the outputs of its own items back. At most `concurrency`
+    batches are inferred at once; requests arriving while they all run are
+    batched on the next one.
+    """
+
+    def __init__(
+        self,
+        infer: Callable[[list[I]], list[O]],
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        executor: Executor | None = None,
+        concurrency: int = 1,
+    ) -> None:
+        """Initialise the batcher.
+
+        Args:
+            infer: Computes the output of each item of a batch.
+            max_batch_size: The number of items which triggers a batch. A
+                single request with more items is inferred on its own.
+            max_wait: The longest a request waits for others to join it.
+            executor: Where inference runs, by default a single thread.
+            concurrency: The number of batches inferred at once, which should
+                match the executor's workers.
+        """
+        self.infer = infer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="inference"
+        )
+        self._queue: deque[_Request[I, O]] = deque()
+        self._queued_items = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self.concurrency = concurrency
+        self._slots = asyncio.Semaphore(concurrency)
+        self._inferring: set[asyncio.Task[None]] = set()
+        self.queue_wait = Histogram(QUEUE_WAIT_BUCKETS)
+        self.batch_items = Histogram(BATCH_SIZE_BUCKETS)
+        self.batch_requests = Histogram(BATCH_SIZE_BUCKETS)
+
+    def start(self) -> None:
+        """Start dispatching batches."""
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop dispatching and fail the requests still queued."""
+        tasks = [*self._inferring, *([self._task] if self._task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        while self._queue:
+            request = self._queue.popleft()
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("Batcher closed."))
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, items: list[I]) -> list[O]:
+        """Infer a request's items as part of a batch.
+
+        Args:
+            items: The items to infer.
+
+        Returns:
+            The output of each item, in order.
+        """
+        if not items:
+            return []
+        request: _Request[I, O] = _Request(
+            items, asyncio.get_running_loop().create_future()
+        )
+        self._queue.append(request)
+        self._queued_items += len(items)
+        self._wakeup.set()
+        return await request.future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._queue:
+                continue
+
+            # Give requests arriving shortly after the oldest a chance to join
+            remaining = self._queue[0].enqueued_at + self.max_wait - time.perf_counter()
+            while self._queued_items < self.max_batch_size and remaining > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except TimeoutError:
+                    break
+                self._wakeup.clear()
+                remaining = (
+                    self._queue[0].enqueued_at + self.max_wait - time.perf_counter()
+                )
+
+            # Requests keep queueing, and so batching, while every slot is busy
+            await self._slots.acquire()
+            batch = self._take()
+            if self._queue:
+                self._wakeup.set()
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._infer(loop, batch))
+            self._inferring.add(task)
+            task.add_done_callback(self._inferring.discard)
+
+    def _take(self) -> list[_Request[I, O]]:
+        batch: list[_Request[I, O]] = []
+        size = 0
+        now = time.perf_counter()
+        while self._queue and (
+            not batch or size + len(self._queue[0].items) <= self.max_batch_size
+        ):
+            request = self._queue.popleft()
+            self._queued_items -= len(request.items)
+            # The caller gave up, for example because its client disconnected
+            if request.future.done():
+                continue
+            batch.append(request)
+            size += len(request.items)
+            self.queue_wait.observe(now - request.enqueued_at)
+        return batch
+
+    async def _infer(
+        self, loop: asyncio.AbstractEventLoop, batch: list[_Request[I, O]]
+    ) -> None:
+        items = [item for request in batch for item in request.items]
+        self.batch_items.observe(len(items))
+        self.batch_requests.observe(len(batch))
+        try:
+            outputs = await loop.run_in_executor(self._executor, self.infer, items)
+        except Exception as e:  # noqa: BLE001
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        start = 0
+        for request in batch:
+            end = start + len(request.items)
+            if not request.future.done():
+                request.future.set_result(outputs[start:end])
+            start = end
+
+    def stats(self) -> dict[str, Any]:
+        """Return the batching settings, queue depth and histograms."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait": self.max_wait,
+            "concurrency": self.concurrency,
+            "inferring": len(self._inferring),
+            "queued_requests": len(self._queue),
+            "queued_items": self._queued_items,
+            "queue_wait_seconds": self.queue_wait.to_dict(),
+            "batch_items": self.batch_items.to_dict(),
+            "batch_requests": self.batch_requests.to_dict(),
+        }
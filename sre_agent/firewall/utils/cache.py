@@ -0,0 +1,126 @@
+"""A cache of firewall scan results keyed on a hash of the scanned content."""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+# Rough per-entry overhead of the key, entry and dictionary slot
+ENTRY_OVERHEAD_BYTES = 200
+
+
+@dataclass(frozen=True)
+class CachedScan(Generic[T]):  # noqa: UP046
+    """A cached scan result, its approximate size and when it expires."""
+
+    result: T
+    size: int
+    expires_at: float
+
+
+class ScanCache(Generic[T]):  # noqa: UP046
+    """A size and memory bounded LRU cache of scan results with a TTL.
+
+    Keys are the SHA-256 of the content and whether it is tool-related, so the
+    content is not kept as a key. Results may still quote it, as a scanner's
+    reason can include the window of content which it blocked. The memory
+    bound counts the size of each result as measured by `sizeof` plus a fixed
+    overhead per entry.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float = 3600.0,
+        sizeof: Callable[[T], int] = lambda result: len(repr(result)),
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialise an empty cache.
+
+        Args:
+            max_entries: The number of results kept before the least recently
+                used one is evicted.
+            max_bytes: The approximate memory the results may use before the
+                least recently used one is evicted.
+            ttl: The time to live of each result in seconds.
+            sizeof: Measures the approximate size of a result in bytes.
+            clock: The clock used to expire results.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._clock = clock
+        self._entries: OrderedDict[str, CachedScan[T]] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(content: str, is_tool: bool) -> str:
+        """Build the cache key of a scan."""
+        digest = hashlib.sha256(content.encode("utf-8", "surrogatepass"))
+        digest.update(b"\x01" if is_tool else b"\x00")
+        return digest.hexdigest()
+
+    def get(self, content: str, is_tool: bool) -> T | None:
+        """Return the cached result of a scan, if it is still fresh."""
+        key = self.key(content, is_tool)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.result
+
+    def put(self, content: str, is_tool: bool, result: T) -> None:
+        """Cache the result of a scan, evicting the least recently used."""
+        key = self.key(content, is_tool)
+        if key in self._entries:
+            self._remove(key)
+
+        size = self._sizeof(result) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        self._entries[key] = CachedScan(
+            result=result, size=size, expires_at=self._clock() + self.ttl
+        )
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        self.bytes -= self._entries.pop(key).size
+
+    def stats(self) -> dict[str, Any]:
+        """Return the cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
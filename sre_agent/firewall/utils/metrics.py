@@ -0,0 +1,16 @@
+"""Prometheus metrics of the firewall."""
+
+from prometheus_client import Gauge, Histogram
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+SCAN_DURATION = Histogram(
+    "firewall_scan_duration_seconds",
+    "Duration of a firewall scan, by how it was answered and its decision.",
+    ["kind", "path", "decision"],
+    buckets=LATENCY_BUCKETS,
+)
+SCANS_IN_PROGRESS = Gauge(
+    "firewall_scans_in_progress",
+    "Firewall scans currently running.",
+)
@@ -0,0 +1,172 @@
+"""A local copy of the firewall model, verified against a manifest of checksums."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from enum import StrEnum
+from typing import Any
+
+LOG = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+# Derived files kept next to the model, such as the ONNX export
+DERIVED_DIRS = ("onnx",)
+HASH_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+class Verification(StrEnum):
+    """How thoroughly the local copy is checked before it is loaded."""
+
+    HASH = "hash"
+    SIZE = "size"
+
+
+def model_path(model_name: str) -> str:
+    """The local path of a model in the Hugging Face home directory."""
+    if not os.environ.get("HF_HOME"):
+        os.environ["HF_HOME"] = "~/.cache/huggingface"
+    return os.path.expanduser(
+        os.path.join(os.environ["HF_HOME"], model_name.replace("/", "--"))
+    )
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _model_files(path: str) -> list[str]:
+    files: list[str] = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = [d for d in dirs if root != path or d not in DERIVED_DIRS]
+        files.extend(
+            os.path.relpath(os.path.join(root, name), path)
+            for name in names
+            if name != MANIFEST
+        )
+    return sorted(files)
+
+
+def write_manifest(path: str, model_name: str) -> dict[str, Any]:
+    """Record the size and SHA-256 of every file of a local model.
+
+    Args:
+        path: The directory the model was saved to.
+        model_name: The name of the model on the Hugging Face Hub.
+
+    Returns:
+        The manifest written to the directory.
+    """
+    manifest = {
+        "model": model_name,
+        "files": {
+            name: {
+                "size": os.path.getsize(os.path.join(path, name)),
+                "sha256": _sha256(os.path.join(path, name)),
+            }
+            for name in _model_files(path)
+        },
+    }
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def verify_manifest(
+    path: str, model_name: str, verification: Verification = Verification.HASH
+) -> bool:
+    """Check that a local model is complete and unchanged.
+
+    Args:
+        path: The directory of the local model.
+        model_name: The name of the model the copy must be of.
+        verification: Whether to check the checksum of each file, or only
+            that each file exists with the recorded size.
+
+    Returns:
+        Whether the local copy can be loaded as is.
+    """
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    if manifest.get("model") != model_name or not manifest.get("files"):
+        return False
+
+    for name, expected in manifest["files"].items():
+        file_path = os.path.join(path, name)
+        if (
+            not os.path.isfile(file_path)
+            or os.path.getsize(file_path) != expected["size"]
+        ):
+            LOG.warning("Local model file %s is missing or truncated", name)
+            return False
+        if (
+            verification == Verification.HASH
+            and _sha256(file_path) != expected["sha256"]
+        ):
+            LOG.warning("Local model file %s does not match its checksum", name)
+            return False
+    return True
+
+
+def _download(model_name: str, path: str) -> None:
+    # Only needed without a local copy
+    from transformers import (  # noqa: PLC0415
+        AutoModelForSequenceClassification,
+        AutoTokenizer,
+    )
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.save_pretrained(path, safe_serialization=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(path)
+
+
+def ensure_model(
+    model_name: str, verification: Verification = Verification.HASH
+) -> str:
+    """Return the path of a verified local copy of a model, downloading if needed.
+
+    A copy whose manifest verifies is used without contacting the Hub, so a
+    restart works offline. Otherwise the model is downloaded, saved as
+    safetensors so its weights can be memory-mapped, and given a manifest.
+    The new copy replaces the old one only once it is complete.
+
+    Args:
+        model_name: The name of the model on the Hugging Face Hub.
+        verification: How thoroughly to check an existing local copy.
+
+    Returns:
+        The local path of the model.
+    """
+    path = model_path(model_name)
+    start = time.perf_counter()
+    if verify_manifest(path, model_name, verification):
+        LOG.info(
+            "Using local copy of %s, verified by %s in %.2f seconds",
+            model_name,
+            verification,
+            time.perf_counter() - start,
+        )
+        return path
+
+    LOG.info("No verified local copy of %s, downloading it", model_name)
+    staging = f"{path}.download"
+    shutil.rmtree(staging, ignore_errors=True)
+    _download(model_name, staging)
+    write_manifest(staging, model_name)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    LOG.info("Downloaded %s in %.2f seconds", model_name, time.perf_counter() - start)
+    return path
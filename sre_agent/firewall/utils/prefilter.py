@@ -0,0 +1,161 @@
+"""A cheap first tier deciding which content needs scanning by the model."""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any
+
+LOG = logging.getLogger(__name__)
+
+# Phrases and markup typical of prompt injections, matched case-insensitively
+DEFAULT_PATTERNS = {
+    "override": (
+        r"\b(ignore|disregard|forget|override)\b.{0,40}\b(instructions?|prompts?|"
+        r"rules|guidelines|context|above|previous|prior)\b"
+    ),
+    "new_instructions": r"\b(new|updated|real|actual)\s+instructions?\b",
+    "role_play": r"\b(you are now|act as|pretend to be|from now on,? you)\b",
+    "jailbreak": r"\b(jailbreak|developer mode|dan mode|do anything now)\b",
+    "system_prompt": r"\b(system|hidden|initial)\s+prompt\b",
+    "exfiltration": (
+        r"\b(send|post|print|reveal|leak|exfiltrate|upload)\b.{0,40}\b(secrets?|"
+        r"tokens?|credentials?|passwords?|api keys?|kubeconfig|\.env)\b"
+    ),
+    "chat_markup": (
+        r"<\|(im_start|im_end|system|user|assistant)\|>|\[/?INST\]|<<SYS>>|"
+        r"^\s*(system|assistant)\s*:"
+    ),
+    # Zero-width, bidirectional control and Unicode tag characters hide text
+    "hidden_text": r"[\u200b-\u200f\u202a-\u202e\u2060-\u2064\ufeff\U000e0000-\U000e007f]",  # noqa: E501
+}
+
+
+class PrefilterMode(StrEnum):
+    """How the pre-filter's decisions are used."""
+
+    OFF = "off"
+    SHADOW = "shadow"
+    ENFORCE = "enforce"
+
+
+@dataclass(frozen=True)
+class PrefilterDecision:
+    """Whether content needs the model, and the tier which decided.
+
+    Attributes:
+        needs_model: Whether the content must be scanned by the model.
+        tier: The tier which decided, `size`, `pattern` or `clean`.
+        reason: What the tier found.
+    """
+
+    needs_model: bool
+    tier: str
+    reason: str
+
+
+class Prefilter:
+    """Decide with compiled patterns and size whether content needs the model.
+
+    Content longer than `max_chars`, or matching any pattern, goes to the
+    model. Other content, such as structured tool calls and plain logs, is
+    clean and may skip it.
+    """
+
+    def __init__(
+        self,
+        mode: PrefilterMode = PrefilterMode.SHADOW,
+        max_chars: int = 2000,
+        patterns: dict[str, str] | None = None,
+    ) -> None:
+        """Compile the patterns.
+
+        Args:
+            mode: How decisions are used. In shadow mode the model scans all
+                content and disagreements are recorded; in enforce mode clean
+                content skips the model.
+            max_chars: The length above which content always goes to the model.
+            patterns: Named regular expressions flagging content for the model.
+        """
+        self.mode = mode
+        self.max_chars = max_chars
+        self.patterns = {
+            name: re.compile(pattern, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+            for name, pattern in (patterns or DEFAULT_PATTERNS).items()
+        }
+        self.tiers: Counter[str] = Counter()
+        self.outcomes: Counter[str] = Counter()
+
+    @property
+    def enforced(self) -> bool:
+        """Whether clean content skips the model."""
+        return self.mode == PrefilterMode.ENFORCE
+
+    def classify(self, content: str, is_tool: bool) -> PrefilterDecision:
+        """Decide whether content needs the model, and log the decision.
+
+        Args:
+            content: The text to scan.
+            is_tool: Whether the content is tool-related.
+
+        Returns:
+            The decision and the tier which made it.
+        """
+        if len(content) > self.max_chars:
+            decision = PrefilterDecision(
+                needs_model=True, tier="size", reason=f"{len(content)} characters"
+            )
+        else:
+            matched = [n for n, p in self.patterns.items() if p.search(content)]
+            decision = (
+                PrefilterDecision(
+                    needs_model=True, tier="pattern", reason=", ".join(matched)
+                )
+                if matched
+                else PrefilterDecision(needs_model=False, tier="clean", reason="")
+            )
+
+        self.tiers[decision.tier] += 1
+        LOG.info(
+            "Pre-filter (%s): %s %s content, tier %s%s",
+            self.mode,
+            "model scan for" if decision.needs_model else "no model scan needed for",
+            "tool" if is_tool else "user",
+            decision.tier,
+            f" ({decision.reason})" if decision.reason else "",
+        )
+        return decision
+
+    def record(self, decision: PrefilterDecision, blocked: bool) -> None:
+        """Compare a decision with the model's verdict on the same content.
+
+        Content the pre-filter passed as clean but the model blocked is a
+        miss, which would let an attack through in enforce mode.
+
+        Args:
+            decision: The pre-filter's decision.
+            blocked: Whether the model blocked the content.
+        """
+        if decision.needs_model:
+            outcome = "flagged_blocked" if blocked else "flagged_allowed"
+        else:
+            outcome = "missed" if blocked else "clean_allowed"
+        self.outcomes[outcome] += 1
+        if outcome == "missed":
+            LOG.warning(
+                "Pre-filter disagreement: content passed as clean was blocked by "
+                "the model"
+            )
+
+    def stats(self) -> dict[str, Any]:
+        """Return the decisions by tier and, in shadow mode, the agreement."""
+        return {
+            "mode": self.mode,
+            "max_chars": self.max_chars,
+            "tiers": dict(self.tiers),
+            "skipped": self.tiers["clean"] if self.enforced else 0,
+            "outcomes": dict(self.outcomes),
+        }
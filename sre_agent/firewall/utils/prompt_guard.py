@@ -0,0 +1,237 @@
+"""Prompt Guard scanning of long content in overlapping token windows."""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+LOG = logging.getLogger(__name__)
+
+
+def token_windows(n_tokens: int, window: int, overlap: int) -> list[tuple[int, int]]:
+    """Split a token sequence into overlapping windows which cover all of it.
+
+    Args:
+        n_tokens: The number of tokens in the sequence.
+        window: The maximum number of tokens in a window.
+        overlap: The number of tokens shared by consecutive windows.
+
+    Returns:
+        The start and end of each window. The last window ends at the final
+        token, so no token is left unscanned.
+    """
+    if window <= overlap:
+        msg = f"Window of {window} tokens must be larger than overlap of {overlap}."
+        raise ValueError(msg)
+    if n_tokens <= window:
+        return [(0, n_tokens)]
+
+    stride = window - overlap
+    starts = list(range(0, n_tokens - window, stride))
+    starts.append(n_tokens - window)
+    return [(start, start + window) for start in starts]
+
+
+def normalise_whitespace(text: str, tokenizer: Any) -> tuple[str, list[int]]:
+    """Collapse whitespace the way LlamaFirewall's Prompt Guard scanner does.
+
+    The text is tokenised with its whitespace removed, and a single space is
+    put back only before tokens which followed whitespace, so an injection
+    spelt out with spaces, such as "i g n o r e", reads as the words it hides.
+
+    Args:
+        text: The text to normalise.
+        tokenizer: The Prompt Guard tokenizer.
+
+    Returns:
+        The normalised text, and for each of its characters the index of the
+        character in the original text it came from.
+    """
+    try:
+        kept = [i for i, char in enumerate(text) if not char.isspace()]
+        cleaned = "".join(text[i] for i in kept)
+        parts: list[str] = []
+        index_map: list[int] = []
+        last_end = 0
+        for token in tokenizer.tokenize(cleaned):
+            token_str = tokenizer.convert_tokens_to_string([token])
+            start = cleaned.index(token_str, last_end)
+            end = start + len(token_str)
+            original_start = kept[start]
+            if original_start > 0 and text[original_start - 1].isspace():
+                parts.append(" ")
+                index_map.append(original_start - 1)
+            parts.append(token_str)
+            index_map.extend(kept[start:end])
+            last_end = end
+        return "".join(parts), index_map
+    except Exception as e:  # noqa: BLE001
+        LOG.error("Failed to normalise text for Prompt Guard: %s", e)
+        return text, list(range(len(text)))
+
+
+@dataclass(frozen=True)
+class WindowScores:
+    """The jailbreak score of each window of a text.
+
+    Attributes:
+        scores: The score of each window.
+        spans: The character span of each window in the text.
+    """
+
+    scores: list[float]
+    spans: list[tuple[int, int]]
+
+    @property
+    def worst(self) -> int:
+        """The index of the window with the highest score."""
+        return max(range(len(self.scores)), key=self.scores.__getitem__)
+
+
+class ChunkedPromptGuard:
+    """The Prompt Guard classifier applied to every window of long content.
+
+    The text is normalised like LlamaFirewall's own Prompt Guard scanner does,
+    tokenised once, split into overlapping windows that fit the model's
+    context, and all windows are scored in batched forward passes.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        model_path: str,
+        *,
+        window: int = 512,
+        overlap: int = 64,
+        batch_size: int = 32,
+        backend: str = "torch",
+        threads: int = 0,
+    ) -> None:
+        """Load the tokenizer and model.
+
+        Args:
+            model_path: The local path of the Prompt Guard model.
+            window: The maximum number of tokens the model sees at once,
+                including special tokens.
+            overlap: The number of tokens shared by consecutive windows, so
+                an injection split across a boundary is seen whole.
+            batch_size: The maximum number of windows per forward pass.
+            backend: The inference backend, `torch` or `onnx`.
+            threads: The threads used by inference, 0 for the runtime's default.
+        """
+        # Imported here so windowing does not need the inference dependencies
+        from transformers import AutoTokenizer  # noqa: PLC0415
+
+        from .backends import InferenceBackend, load_classifier  # noqa: PLC0415
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.classify = load_classifier(InferenceBackend(backend), model_path, threads)
+        self.window = window - self.tokenizer.num_special_tokens_to_add()
+        self.overlap = overlap
+        self.batch_size = batch_size
+
+    def windows(self, text: str) -> tuple[list[list[int]], list[tuple[int, int]]]:
+        """Normalise and tokenise a text once and split it into model inputs.
+
+        Args:
+            text: The text to scan.
+
+        Returns:
+            The token IDs of each window, with special tokens, and the
+            character span of each window in the original text.
+        """
+        normalised, index_map = normalise_whitespace(text, self.tokenizer)
+        encoding = self.tokenizer(
+            normalised,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            verbose=False,
+        )
+        ids: list[int] = encoding["input_ids"]
+        offsets: list[tuple[int, int]] = encoding["offset_mapping"]
+        windows = token_windows(len(ids), self.window, self.overlap)
+
+        def _original(start: int, end: int) -> tuple[int, int]:
+            # Map a span of the normalised text back onto the original text
+            if end <= start:
+                return (0, 0)
+            return (index_map[start], index_map[end - 1] + 1)
+
+        spans = [
+            _original(offsets[start][0], offsets[end - 1][1]) if end > start else (0, 0)
+            for start, end in windows
+        ]
+        inputs = [
+            self.tokenizer.build_inputs_with_special_tokens(ids[start:end])
+            for start, end in windows
+        ]
+        return inputs, spans
+
+    def classify_windows(self, inputs: list[list[int]]) -> list[float]:
+        """Score windows, possibly of different texts, in batched forward passes.
+
+        Args:
+            inputs: The token IDs of each window.
+
+        Returns:
+            The jailbreak score of each window.
+        """
+        from .backends import softmax_scores  # noqa: PLC0415
+
+        scores: list[float] = []
+        for i in range(0, len(inputs), self.batch_size):
+            batch = self.tokenizer.pad(
+                {"input_ids": inputs[i : i + self.batch_size]}, return_tensors="np"
+            )
+            logits = self.classify(
+                batch["input_ids"].astype("int64"),
+                batch["attention_mask"].astype("int64"),
+            )
+            scores.extend(softmax_scores(logits))
+        return scores
+
+    def score(self, text: str) -> WindowScores:
+        """Score every window of a text.
+
+        Args:
+            text: The text to scan.
+
+        Returns:
+            The jailbreak score and character span of each window.
+        """
+        inputs, spans = self.windows(text)
+        return WindowScores(scores=self.classify_windows(inputs), spans=spans)
+
+    def warmup(self) -> float:
+        """Run a full batch of full windows so the first scan is not slow.
+
+        Returns:
+            The time the warmup took in seconds.
+        """
+        start = time.perf_counter()
+        inputs, _ = self.windows("warm up " * self.window)
+        self.classify_windows((inputs * self.batch_size)[: self.batch_size])
+        return time.perf_counter() - start
+
+
+@lru_cache
+def get_prompt_guard(  # noqa: PLR0913
+    model_path: str,
+    *,
+    window: int,
+    overlap: int,
+    batch_size: int,
+    backend: str = "torch",
+    threads: int = 0,
+) -> ChunkedPromptGuard:
+    """Load the classifier once and share it between scans."""
+    return ChunkedPromptGuard(
+        model_path,
+        window=window,
+        overlap=overlap,
+        batch_size=batch_size,
+        backend=backend,
+        threads=threads,
+    )
@@ -0,0 +1,153 @@
+"""Custom LlamaFirewall scanners."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from llamafirewall import (
+    Message,
+    ScanDecision,
+    Scanner,
+    ScanResult,
+    ScanStatus,
+    Trace,
+    register_llamafirewall_scanner,
+)
+
+from .batching import MicroBatcher
+from .prompt_guard import WindowScores, get_prompt_guard
+from .workers import WorkerPool
+
+CHUNKED_PROMPT_GUARD = "chunked_prompt_guard"
+ALLOW_REASON = "No prompt injection detected"
+
+
+@register_llamafirewall_scanner(CHUNKED_PROMPT_GUARD)
+class ChunkedPromptGuardScanner(Scanner):  # type: ignore[misc]
+    """A Prompt Guard scanner which scans all of long content.
+
+    LlamaFirewall creates a scanner for every scan, so the classifier is loaded
+    once by `configure` and shared. The windows of concurrent scans are scored
+    together by a micro-batcher. A text is blocked if any of its windows
+    scores at or above the threshold.
+    """
+
+    settings: dict[str, Any] = {}
+    batcher: MicroBatcher[list[int], float] | None = None
+    pool: WorkerPool | None = None
+
+    def __init__(self) -> None:
+        """Initialise the scanner with the configured classifier."""
+        super().__init__(
+            scanner_name="Chunked Prompt Guard Scanner",
+            block_threshold=self.settings["threshold"],
+        )
+        self.pg = get_prompt_guard(**self.settings["classifier"])
+
+    @classmethod
+    def configure(  # noqa: PLR0913
+        cls,
+        model_path: str,
+        *,
+        window: int = 512,
+        overlap: int = 64,
+        batch_size: int = 32,
+        threshold: float = 0.9,
+        backend: str = "torch",
+        threads: int = 0,
+        max_wait: float = 0.005,
+        workers: int = 0,
+    ) -> MicroBatcher[list[int], float]:
+        """Configure and load the classifier used by every scan.
+
+        Must be called from the event loop which serves the scans.
+
+        Args:
+            model_path: The local path of the Prompt Guard model.
+            window: The maximum number of tokens per window.
+            overlap: The number of tokens shared by consecutive windows.
+            batch_size: The maximum number of windows per forward pass.
+            threshold: The score at or above which a window is blocked.
+            backend: The inference backend, `torch` or `onnx`.
+            threads: The threads used by inference, 0 for the runtime's default.
+            max_wait: The longest a scan waits for others to share its batch.
+            workers: The number of forked processes running inference, 0 to
+                run it on a thread of this process. Only the torch backend
+                can be forked.
+
+        Returns:
+            The started micro-batcher, to be closed on shutdown.
+        """
+        cls.settings = {
+            "threshold": threshold,
+            "classifier": {
+                "model_path": model_path,
+                "window": window,
+                "overlap": overlap,
+                "batch_size": batch_size,
+                "backend": backend,
+                # Workers set their own threads after the fork
+                "threads": 0 if workers else threads,
+            },
+        }
+        pg = get_prompt_guard(**cls.settings["classifier"])
+        if workers:
+            cls.pool = WorkerPool(pg, workers, threads)
+            cls.batcher = MicroBatcher(
+                cls.pool.infer,
+                max_batch_size=batch_size,
+                max_wait=max_wait,
+                executor=cls.pool.executor,
+                concurrency=workers,
+            )
+        else:
+            cls.batcher = MicroBatcher(
+                pg.classify_windows, max_batch_size=batch_size, max_wait=max_wait
+            )
+        cls.batcher.start()
+        return cls.batcher
+
+    @classmethod
+    def warmup(cls) -> float:
+        """Run a warmup inference on the configured classifier or its workers.
+
+        Returns:
+            The time the warmup took in seconds.
+        """
+        if cls.pool:
+            return cls.pool.start()
+        return get_prompt_guard(**cls.settings["classifier"]).warmup()
+
+    async def scan(
+        self, message: Message, past_trace: Trace | None = None
+    ) -> ScanResult:
+        """Scan every window of the message content."""
+        text = message.content
+        inputs, spans = await asyncio.to_thread(self.pg.windows, text)
+        if self.batcher is None:
+            msg = "The scanner must be configured before scanning."
+            raise RuntimeError(msg)
+        windows = WindowScores(scores=await self.batcher.submit(inputs), spans=spans)
+
+        worst = windows.worst
+        score = windows.scores[worst]
+        if score < self.block_threshold:
+            return ScanResult(
+                decision=ScanDecision.ALLOW,
+                reason=ALLOW_REASON,
+                score=score,
+                status=ScanStatus.SUCCESS,
+            )
+
+        start, end = windows.spans[worst]
+        return ScanResult(
+            decision=ScanDecision.BLOCK,
+            reason=(
+                "Received text is likely to be a prompt injection attack, with a "
+                f"probability of {score}, in window {worst + 1} of "
+                f'{len(windows.scores)}.\n Window text: "{text[start:end]}"'
+            ),
+            score=score,
+            status=ScanStatus.SUCCESS,
+        )
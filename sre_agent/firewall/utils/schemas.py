@@ -0,0 +1,79 @@
+"""Schemas for the firewall."""
+
+import os
+from dataclasses import dataclass
+
+DEFAULT_SCAN_CACHE_MAX_ENTRIES = 4096
+DEFAULT_SCAN_CACHE_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_SCAN_CACHE_TTL = 3600.0
+DEFAULT_PROMPT_GUARD_WINDOW = 512
+DEFAULT_PROMPT_GUARD_OVERLAP = 64
+DEFAULT_PROMPT_GUARD_BATCH_SIZE = 32
+DEFAULT_PROMPT_GUARD_THRESHOLD = 0.9
+DEFAULT_FIREWALL_BACKEND = "torch"
+DEFAULT_MICRO_BATCH_WAIT_MS = 5.0
+DEFAULT_MODEL_VERIFICATION = "hash"
+DEFAULT_FIREWALL_WORKERS = 0
+DEFAULT_PREFILTER_MODE = "shadow"
+DEFAULT_PREFILTER_MAX_CHARS = 2000
+
+
+@dataclass(frozen=True)
+class FirewallConfig:
+    """A config class containing firewall configuration from the environment.
+
+    Attributes:
+        scan_cache_max_entries: The number of scan results kept.
+        scan_cache_max_bytes: The approximate memory the cached results may use.
+        scan_cache_ttl: Seconds a scan result is reused for, 0 disables the cache.
+        prompt_guard_window: The tokens Prompt Guard scores at once.
+        prompt_guard_overlap: The tokens shared by consecutive windows.
+        prompt_guard_batch_size: The windows scored in one forward pass.
+        prompt_guard_threshold: The window score at which content is blocked.
+        backend: The inference backend of the classifier, `torch` or `onnx`.
+        inference_threads: The threads used by inference, 0 for the default.
+        micro_batch_wait_ms: The longest a scan waits for concurrent scans to
+            share its forward pass.
+        model_verification: How the local model is checked against its
+            manifest before loading, `hash` or `size`.
+        workers: The forked processes running inference with shared weights,
+            0 to run it on a thread of the service process.
+        prefilter_mode: How the pre-filter is used, `off`, `shadow` to only
+            compare it with the model, or `enforce` to skip the model for
+            content it passes as clean.
+        prefilter_max_chars: The length above which content always goes to
+            the model.
+    """
+
+    scan_cache_max_entries: int = int(
+        os.getenv("SCAN_CACHE_MAX_ENTRIES", DEFAULT_SCAN_CACHE_MAX_ENTRIES)
+    )
+    scan_cache_max_bytes: int = int(
+        os.getenv("SCAN_CACHE_MAX_BYTES", DEFAULT_SCAN_CACHE_MAX_BYTES)
+    )
+    scan_cache_ttl: float = float(os.getenv("SCAN_CACHE_TTL", DEFAULT_SCAN_CACHE_TTL))
+    prompt_guard_window: int = int(
+        os.getenv("PROMPT_GUARD_WINDOW", DEFAULT_PROMPT_GUARD_WINDOW)
+    )
+    prompt_guard_overlap: int = int(
+        os.getenv("PROMPT_GUARD_OVERLAP", DEFAULT_PROMPT_GUARD_OVERLAP)
+    )
+    prompt_guard_batch_size: int = int(
+        os.getenv("PROMPT_GUARD_BATCH_SIZE", DEFAULT_PROMPT_GUARD_BATCH_SIZE)
+    )
+    prompt_guard_threshold: float = float(
+        os.getenv("PROMPT_GUARD_THRESHOLD", DEFAULT_PROMPT_GUARD_THRESHOLD)
+    )
+    backend: str = os.getenv("FIREWALL_BACKEND", DEFAULT_FIREWALL_BACKEND)
+    inference_threads: int = int(os.getenv("FIREWALL_INFERENCE_THREADS", "0"))
+    micro_batch_wait_ms: float = float(
+        os.getenv("MICRO_BATCH_WAIT_MS", DEFAULT_MICRO_BATCH_WAIT_MS)
+    )
+    model_verification: str = os.getenv(
+        "MODEL_VERIFICATION", DEFAULT_MODEL_VERIFICATION
+    )
+    workers: int = int(os.getenv("FIREWALL_WORKERS", DEFAULT_FIREWALL_WORKERS))
+    prefilter_mode: str = os.getenv("PREFILTER_MODE", DEFAULT_PREFILTER_MODE)
+    prefilter_max_chars: int = int(
+        os.getenv("PREFILTER_MAX_CHARS", DEFAULT_PREFILTER_MAX_CHARS)
+    )
@@ -0,0 +1,135 @@
+"""Forked worker processes sharing the firewall classifier's weights."""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from .prompt_guard import ChunkedPromptGuard
+
+LOG = logging.getLogger(__name__)
+
+# Set in the parent before forking, so workers inherit the loaded model and
+# share its pages copy-on-write rather than each loading a copy
+_PROMPT_GUARD: ChunkedPromptGuard | None = None
+_WARMED_UP: Any = None
+WARMUP_TIMEOUT = 300.0
+
+
+def _init_worker(threads: int, warmed_up: Any) -> None:
+    import torch  # noqa: PLC0415
+
+    global _WARMED_UP  # noqa: PLW0603
+    _WARMED_UP = warmed_up
+    torch.set_num_threads(threads)
+
+
+def _classify_windows(inputs: list[list[int]]) -> list[float]:
+    if _PROMPT_GUARD is None:
+        msg = "Worker started without a classifier."
+        raise RuntimeError(msg)
+    return _PROMPT_GUARD.classify_windows(inputs)
+
+
+def _warmup() -> tuple[int, float]:
+    if _PROMPT_GUARD is None:
+        msg = "Worker started without a classifier."
+        raise RuntimeError(msg)
+    seconds = _PROMPT_GUARD.warmup()
+    # Hold this worker until every worker has taken a warmup
+    _WARMED_UP.wait(WARMUP_TIMEOUT)
+    return os.getpid(), seconds
+
+
+def memory(pid: int) -> dict[str, int]:
+    """Return the resident and proportional set sizes of a process in bytes.
+
+    The proportional set size divides each shared page between the processes
+    sharing it, so summing it over the workers counts shared weights once.
+    """
+    sizes = {"rss": 0, "pss": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key.lower() in sizes:
+                    sizes[key.lower()] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return sizes
+
+
+class WorkerPool:
+    """A pool of processes forked after the classifier is loaded.
+
+    Forking shares the model's weights copy-on-write, as inference only reads
+    them, so N workers use far less than N times the memory of one. Torch must
+    not have run inference in the parent before the fork, so the warmup runs
+    in the workers. Nor should the parent have started other threads, such as
+    a span exporter, as a forked child only gets a copy of the forking thread.
+    """
+
+    def __init__(self, pg: ChunkedPromptGuard, workers: int, threads: int = 0) -> None:
+        """Prepare the pool; the workers are forked on `start`.
+
+        Args:
+            pg: The loaded classifier the workers inherit.
+            workers: The number of worker processes.
+            threads: The inference threads of each worker, by default the
+                cores divided between the workers.
+        """
+        global _PROMPT_GUARD  # noqa: PLW0603
+        _PROMPT_GUARD = pg
+        self.workers = workers
+        threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        context = multiprocessing.get_context("fork")
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(threads, context.Barrier(workers)),
+        )
+        self.pids: list[int] = []
+
+    @staticmethod
+    def infer(inputs: list[list[int]]) -> list[float]:
+        """Score windows in whichever worker runs the call."""
+        return _classify_windows(inputs)
+
+    def start(self) -> float:
+        """Fork every worker and warm each one up.
+
+        Returns:
+            The time the warmup took in seconds.
+        """
+        start = time.perf_counter()
+        if threading.active_count() > 1:
+            LOG.warning(
+                "Forking firewall workers with %d threads running: %s",
+                threading.active_count(),
+                [thread.name for thread in threading.enumerate()],
+            )
+        # A fork context starts every worker on the first submission, and the
+        # barrier makes each worker take exactly one warmup
+        results = [
+            future.result()
+            for future in [self.executor.submit(_warmup) for _ in range(self.workers)]
+        ]
+        self.pids = sorted(pid for pid, _ in results)
+        LOG.info("Started %d firewall workers: %s", self.workers, self.pids)
+        return time.perf_counter() - start
+
+    def stats(self) -> dict[str, Any]:
+        """Return the memory of the parent and of each worker."""
+        workers = {str(pid): memory(pid) for pid in self.pids}
+        return {
+            "workers": self.workers,
+            "parent": memory(os.getpid()),
+            "processes": workers,
+            "total_pss": sum(w["pss"] for w in workers.values()),
+        }
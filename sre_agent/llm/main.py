@@ -1,11 +1,14 @@
 """A server for making requests to an LLM."""
 
-from collections.abc import AsyncGenerator, Callable
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable
 from contextlib import asynccontextmanager
 from typing import Any
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from opentelemetry import trace
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from sre_agent.llm.utils.clients import (
     AnthropicClient,
@@ -15,17 +18,34 @@ from sre_agent.llm.utils.clients import (
     OpenAIClient,
     SelfHostedClient,
 )
+from sre_agent.llm.utils.conversations import (
+    ConversationStore,
+    UnknownConversationError,
+)
+from sre_agent.llm.utils.metrics import GENERATE_DURATION, GENERATE_IN_PROGRESS, TOKENS
 from sre_agent.llm.utils.schemas import (
     LLMSettings,
     Provider,
 )
 from sre_agent.shared.logger import logger
-from sre_agent.shared.schemas import Message, TextGenerationPayload
+from sre_agent.shared.metrics import PROVIDER_HEADER, usage_tokens
+from sre_agent.shared.schemas import (
+    Conversation,
+    ConversationPayload,
+    ConversationTurnPayload,
+    Message,
+    TextGenerationPayload,
+    ToolCatalog,
+    ToolCatalogPayload,
+)
+from sre_agent.shared.tracing import configure_tracing, server_span
 
 load_dotenv()
 
 
-STATE: dict[str, BaseClient] = {}
+STATE: dict[str, Any] = {}
+
+TRACER = trace.get_tracer(__name__)
 
 
 # Lazily instantiate the selected provider to avoid requiring env for all providers
@@ -44,27 +64,122 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[Any, Any]:
 
     On start-up the application will establish an LLM function and settings.
     """
-    selected_provider = LLMSettings().provider
-    factory = LLM_CLIENT_FACTORY.get(selected_provider, lambda: DummyClient())
+    tracer_provider = configure_tracing("llm-server")
+    settings = LLMSettings()
+    factory = LLM_CLIENT_FACTORY.get(settings.provider, lambda: DummyClient(settings))
     STATE["client"] = factory()
+    STATE["provider"] = settings.provider
 
     if STATE["client"] is None:
         supported = ", ".join([p.value for p in Provider])
         raise ValueError(f"Unknown LLM provider. Supported providers are: {supported}")
 
+    STATE["conversations"] = ConversationStore(
+        STATE["client"],
+        ttl_seconds=settings.conversation_ttl,
+        max_conversations=settings.max_conversations,
+    )
+
     yield
+    if tracer_provider:
+        tracer_provider.shutdown()
     STATE.clear()
 
 
 app = FastAPI(lifespan=lifespan)
 
 
+@app.middleware("http")
+async def trace_requests(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Trace each request as part of the caller's trace."""
+    with server_span(TRACER, f"{request.method} {request.url.path}", request.headers):
+        return await call_next(request)
+
+
+@app.middleware("http")
+async def report_provider(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Name the provider on each response, so callers can label their metrics."""
+    response = await call_next(request)
+    if "provider" in STATE:
+        response.headers[PROVIDER_HEADER] = str(STATE["provider"])
+    return response
+
+
+def _observe(generate: Callable[[], Message]) -> Message:
+    """Generate a response, recording its latency and token usage."""
+    provider = str(STATE["provider"])
+    start = time.perf_counter()
+    with (
+        TRACER.start_as_current_span(
+            "llm.generate", attributes={"provider": provider}
+        ) as span,
+        GENERATE_IN_PROGRESS.labels(provider).track_inprogress(),
+    ):
+        response = generate()
+        span.set_attribute("model", response.model)
+    GENERATE_DURATION.labels(provider, response.model).observe(
+        time.perf_counter() - start
+    )
+    if response.usage:
+        for kind, tokens in usage_tokens(response.usage).items():
+            TOKENS.labels(provider, response.model, kind).inc(tokens)
+    return response
+
+
 @app.post("/generate")
 def generate(payload: TextGenerationPayload) -> Message:
     """An endpoint for generating text from messages and tools."""
     logger.debug(f"Payload: {payload}")
 
-    return STATE["client"].generate(payload)
+    return _observe(lambda: STATE["client"].generate(payload))
+
+
+@app.post("/catalogs")
+def register_catalog(payload: ToolCatalogPayload) -> ToolCatalog:
+    """An endpoint for registering the tools used by later conversations."""
+    catalog_id = STATE["conversations"].register_catalog(payload.tools)
+    return ToolCatalog(catalog_id=catalog_id)
+
+
+@app.post("/conversations")
+def create_conversation(payload: ConversationPayload) -> Conversation:
+    """An endpoint for opening a conversation with its initial messages."""
+    try:
+        conversation_id = STATE["conversations"].create(
+            payload.catalog_id, payload.messages
+        )
+    except UnknownConversationError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return Conversation(conversation_id=conversation_id)
+
+
+@app.post("/conversations/{conversation_id}/generate")
+def generate_turn(conversation_id: str, payload: ConversationTurnPayload) -> Message:
+    """An endpoint for appending messages to a conversation and generating text."""
+    try:
+        response = _observe(
+            lambda: STATE["conversations"].generate(conversation_id, payload.messages)
+        )
+    except UnknownConversationError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return response
+
+
+@app.delete("/conversations/{conversation_id}")
+def delete_conversation(conversation_id: str) -> dict[str, str]:
+    """An endpoint for closing a conversation."""
+    STATE["conversations"].delete(conversation_id)
+    return {"status": "deleted"}
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    """Expose the LLM server's metrics in the Prometheus text format."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/health")
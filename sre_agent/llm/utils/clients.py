@@ -1,6 +1,8 @@
 """A collection of clients for performing text generation."""
 
 import os
+import random
+import time
 from abc import ABC, abstractmethod
 from typing import Any
 
@@ -9,6 +11,7 @@ from anthropic.types import MessageParam as AnthropicMessageBlock
 from anthropic.types import ToolParam
 from google import genai
 from google.genai import types
+from mcp.types import Tool
 from pydantic import BaseModel
 
 from sre_agent.llm.utils.adapters import (
@@ -16,50 +19,142 @@ from sre_agent.llm.utils.adapters import (
     AnthropicToMCPAdapter,
     GeminiTextGenerationPayloadAdapter,
     GeminiToMCPAdapter,
+    LLMTextGenerationPayloadAdapter,
 )
 from sre_agent.llm.utils.schemas import (
     LLMSettings,
+    MockScenario,
+    ScenarioTurn,
 )
 from sre_agent.shared.logger import logger
 from sre_agent.shared.schemas import (
     Content,
     Message,
+    MessageBlock,
     TextBlock,
     TextGenerationPayload,
+    ToolUseBlock,
     Usage,
 )
 
 
 class BaseClient(ABC):
-    """A base client for LLM clients to implement."""
+    """A base client for LLM clients to implement.
+
+    Generation is split into adapting MCP messages and tools to the provider's
+    native types and completing from the native types, so that stateful
+    conversations can keep already adapted messages and only adapt new ones.
+    """
+
+    # The adapter to the provider's native types; None keeps MCP types
+    payload_adapter: type[LLMTextGenerationPayloadAdapter] | None = None
 
     def __init__(self, settings: LLMSettings = LLMSettings()) -> None:
         """The constructor for the base client."""
         self.settings = settings
 
+    def adapt_messages(self, messages: list[MessageBlock]) -> list[Any]:
+        """Convert messages to the provider's native types."""
+        if self.payload_adapter is None:
+            return list(messages)
+        adapted, _ = self.payload_adapter(
+            TextGenerationPayload(messages=messages)
+        ).adapt()
+        return adapted
+
+    def adapt_tools(self, tools: list[Tool]) -> list[Any]:
+        """Convert tools to the provider's native types."""
+        if self.payload_adapter is None:
+            return list(tools)
+        _, adapted = self.payload_adapter(
+            TextGenerationPayload(messages=[], tools=tools)
+        ).adapt()
+        return adapted
+
     @abstractmethod
-    def generate(self, payload: TextGenerationPayload) -> Message:
-        """An abstract method for generating text using an LLM."""
+    def complete(self, messages: list[Any], tools: list[Any]) -> Message:
+        """An abstract method for generating text from provider-native types."""
         pass
 
+    def generate(self, payload: TextGenerationPayload) -> Message:
+        """A method for generating text from MCP messages and tools."""
+        return self.complete(
+            self.adapt_messages(payload.messages), self.adapt_tools(payload.tools)
+        )
+
 
 class DummyClient(BaseClient):
-    """A dummy client for mocking responses from an LLM."""
+    """A dummy client for mocking responses from an LLM.
 
-    def generate(self, payload: TextGenerationPayload) -> Message:
-        """A concrete generate method which returns a mocked response."""
-        msg = "This is a template response from a dummy model."
-        content: Content = [TextBlock(text=msg, type="text")]
+    Without a scenario every turn ends with a template response. With a
+    `MOCK_SCENARIO` file the client replays the scenario's turns, picking each
+    by the number of assistant messages so far so that concurrent
+    conversations follow the script independently. A turn waits for a latency
+    drawn from its distribution and reports the scenario's usage, so the agent
+    loop can be exercised and timed without a model.
+    """
 
-        response = Message(
-            id="0",
-            model=self.settings.model,
+    def __init__(self, settings: LLMSettings | None = None) -> None:
+        """The constructor for the dummy client.
+
+        The settings are read when the client is created, not when the module
+        is imported, so `MOCK_SCENARIO` set after import is honoured.
+        """
+        settings = settings or LLMSettings()
+        super().__init__(settings)
+        self.scenario: MockScenario | None = None
+        if settings.mock_scenario:
+            with open(settings.mock_scenario) as f:
+                self.scenario = MockScenario.model_validate_json(f.read())
+            logger.info(
+                "Replaying %d mock turns from %s",
+                len(self.scenario.turns),
+                settings.mock_scenario,
+            )
+        self._random = random.Random(self.scenario.seed if self.scenario else None)
+
+    def _replay(self, scenario: MockScenario, turn: int) -> Message:
+        """Wait out the latency of a scenario turn and return its response."""
+        step = (
+            scenario.turns[turn]
+            if turn < len(scenario.turns)
+            else ScenarioTurn(text="Diagnosis complete.")
+        )
+        time.sleep((step.latency or scenario.latency).sample(self._random))
+        content: Content = [TextBlock(text=step.text, type="text")] if step.text else []
+        content += [
+            ToolUseBlock(
+                id=f"toolu_mock_{turn}_{i}", name=tool.name, arguments=tool.arguments
+            )
+            for i, tool in enumerate(step.tool_uses)
+        ]
+        return Message(
+            id=f"mock_{turn}",
+            model=scenario.model or self.settings.model,
             content=content,
             role="assistant",
-            stop_reason="end_turn",
-            usage=None,
+            stop_reason="tool_use" if step.tool_uses else "end_turn",
+            usage=step.usage,
         )
 
+    def complete(self, messages: list[Any], tools: list[Any]) -> Message:
+        """A concrete complete method which returns a mocked response."""
+        if self.scenario is not None:
+            turn = sum(message.role == "assistant" for message in messages)
+            response = self._replay(self.scenario, turn)
+        else:
+            msg = "This is a template response from a dummy model."
+            content: Content = [TextBlock(text=msg, type="text")]
+
+            response = Message(
+                id="0",
+                model=self.settings.model,
+                content=content,
+                role="assistant",
+                stop_reason="end_turn",
+                usage=None,
+            )
+
         if response.usage:
             logger.info(
                 "Token usage - Input: %s, Output: %s",
@@ -72,6 +167,8 @@ class DummyClient(BaseClient):
 class AnthropicClient(BaseClient):
     """A client for performing text generation using the Anthropic client."""
 
+    payload_adapter = AnthropicTextGenerationPayloadAdapter
+
     def __init__(self, settings: LLMSettings = LLMSettings()) -> None:
         """The constructor for the Anthropic client."""
         super().__init__(settings)
@@ -96,8 +193,9 @@ class AnthropicClient(BaseClient):
             else:
                 blocks.append(content)
 
-        # Add cache control to the blocks
-        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+        # Add cache control to a copy of the final block, so that messages kept
+        # by a conversation never accumulate cache breakpoints
+        blocks[-1] = {**blocks[-1], "cache_control": {"type": "ephemeral"}}
 
         return blocks
 
@@ -111,22 +209,19 @@ class AnthropicClient(BaseClient):
         self, messages: list[AnthropicMessageBlock]
     ) -> list[AnthropicMessageBlock]:
         """A method for adding a cache block to messages."""
-        cached_messages = messages
+        cached_messages = list(messages)
         if len(messages) > 1:
-            cached_messages[-1]["content"] = self._add_cache_to_final_block(
-                messages[-1]["content"]
+            cached_messages[-1] = AnthropicMessageBlock(
+                role=messages[-1]["role"],
+                content=self._add_cache_to_final_block(messages[-1]["content"]),
             )
         return cached_messages
 
-    def generate(self, payload: TextGenerationPayload) -> Message:
+    def complete(self, messages: list[Any], tools: list[Any]) -> Message:
         """A method for generating text using the Anthropic API.
 
         This method implements prompt caching for the Anthropic API.
         """
-        adapter = AnthropicTextGenerationPayloadAdapter(payload)
-
-        messages, tools = adapter.adapt()
-
         cached_tools = self.cache_tools(tools)
         cached_messages = self.cache_messages(messages)
 
@@ -169,7 +264,7 @@ class AnthropicClient(BaseClient):
 class OpenAIClient(BaseClient):
     """A client for performing text generation using the OpenAI client."""
 
-    def generate(self, payload: TextGenerationPayload) -> Message:
+    def complete(self, messages: list[Any], tools: list[Any]) -> Message:
         """A method for generating text using the OpenAI API."""
         raise NotImplementedError
 
@@ -177,17 +272,15 @@ class OpenAIClient(BaseClient):
 class GeminiClient(BaseClient):
     """A client for performing text generation using the Gemini client."""
 
+    payload_adapter = GeminiTextGenerationPayloadAdapter
+
     def __init__(self, settings: LLMSettings = LLMSettings()) -> None:
         """The constructor for the Gemini client."""
         super().__init__(settings)
         self.client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
-    def generate(self, payload: TextGenerationPayload) -> Message:
+    def complete(self, messages: list[Any], tools: list[Any]) -> Message:
         """A method for generating text using the Gemini API."""
-        adapter = GeminiTextGenerationPayloadAdapter(payload)
-
-        messages, tools = adapter.adapt()
-
         if not self.settings.max_tokens:
             raise ValueError("Max tokens configuration has not been set.")
 
@@ -234,6 +327,6 @@ class GeminiClient(BaseClient):
 class SelfHostedClient(BaseClient):
     """A client for performing text generation using a self-hosted model."""
 
-    def generate(self, payload: TextGenerationPayload) -> Message:
+    def complete(self, messages: list[Any], tools: list[Any]) -> Message:
         """A method for generating text using a self-hosted model."""
         raise NotImplementedError
@@ -0,0 +1,130 @@
+"""Server-side state for stateful conversations with the LLM."""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import uuid4
+
+from mcp.types import Tool
+
+from sre_agent.llm.utils.clients import BaseClient
+from sre_agent.shared.schemas import Message, MessageBlock
+
+
+class UnknownConversationError(KeyError):
+    """Raised for a catalog or conversation which does not exist or expired."""
+
+
+@dataclass
+class ConversationState:
+    """A conversation's provider-native messages and the catalog it uses."""
+
+    id: str
+    catalog_id: str
+    messages: list[Any]
+    last_used: float = field(default_factory=time.monotonic)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class ConversationStore:
+    """Keep adapted tool catalogs and conversations between requests.
+
+    Catalogs are content-addressed, so clients registering the same tools share
+    one adapted catalog. Conversations hold the provider-native messages, so
+    each turn only adapts the messages appended since the previous turn.
+    Conversations idle for longer than the TTL, or beyond the maximum number
+    kept, are dropped, least recently used first.
+    """
+
+    def __init__(
+        self,
+        client: BaseClient,
+        ttl_seconds: float = 3600,
+        max_conversations: int = 1000,
+    ) -> None:
+        """Initialise an empty store.
+
+        Args:
+            client: The LLM client used to adapt messages and generate text.
+            ttl_seconds: The idle time after which a conversation is dropped.
+            max_conversations: The number of conversations kept.
+        """
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.max_conversations = max_conversations
+        self._catalogs: dict[str, list[Any]] = {}
+        self._conversations: OrderedDict[str, ConversationState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register_catalog(self, tools: list[Tool]) -> str:
+        """Adapt and keep a tool catalog, returning its ID."""
+        canonical = json.dumps(
+            [tool.model_dump(mode="json") for tool in tools], sort_keys=True
+        )
+        catalog_id = hashlib.sha256(canonical.encode()).hexdigest()
+        with self._lock:
+            if catalog_id not in self._catalogs:
+                self._catalogs[catalog_id] = self.client.adapt_tools(tools)
+        return catalog_id
+
+    def create(self, catalog_id: str, messages: list[MessageBlock]) -> str:
+        """Open a conversation with its initial messages, returning its ID."""
+        if catalog_id not in self._catalogs:
+            raise UnknownConversationError(f"Unknown tool catalog {catalog_id}.")
+
+        conversation = ConversationState(
+            id=uuid4().hex,
+            catalog_id=catalog_id,
+            messages=self.client.adapt_messages(messages),
+        )
+        with self._lock:
+            self._conversations[conversation.id] = conversation
+            self._evict()
+        return conversation.id
+
+    def generate(self, conversation_id: str, messages: list[MessageBlock]) -> Message:
+        """Append new messages to a conversation and generate the next message.
+
+        The new messages are only kept if generation succeeds, so a failed turn
+        can be retried.
+        """
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                raise UnknownConversationError(
+                    f"Unknown conversation {conversation_id}."
+                )
+            self._conversations.move_to_end(conversation_id)
+
+        with conversation.lock:
+            native = conversation.messages + self.client.adapt_messages(messages)
+            response = self.client.complete(
+                native, self._catalogs[conversation.catalog_id]
+            )
+            conversation.messages = native
+            conversation.last_used = time.monotonic()
+        return response
+
+    def delete(self, conversation_id: str) -> None:
+        """Drop a conversation."""
+        with self._lock:
+            self._conversations.pop(conversation_id, None)
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of catalogs and conversations kept."""
+        return {
+            "catalogs": len(self._catalogs),
+            "conversations": len(self._conversations),
+        }
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for conversation_id, conversation in list(self._conversations.items()):
+            if now - conversation.last_used > self.ttl_seconds:
+                del self._conversations[conversation_id]
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
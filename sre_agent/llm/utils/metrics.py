@@ -0,0 +1,22 @@
+"""Prometheus metrics of the LLM server."""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from sre_agent.shared.metrics import LATENCY_BUCKETS
+
+GENERATE_DURATION = Histogram(
+    "llm_server_generate_duration_seconds",
+    "Duration of a text generation request to the provider.",
+    ["provider", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+GENERATE_IN_PROGRESS = Gauge(
+    "llm_server_generate_in_progress",
+    "Text generation requests currently waiting on the provider.",
+    ["provider"],
+)
+TOKENS = Counter(
+    "llm_server_tokens",
+    "Tokens reported by the provider, by type.",
+    ["provider", "model", "type"],
+)
@@ -1,10 +1,15 @@
 """Schemas for the LLM server."""
 
+import math
+import random
 from enum import StrEnum
+from typing import Any, Literal
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from sre_agent.shared.schemas import Usage
+
 
 class Provider(StrEnum):
     """An enum containing the different LLM providers supported."""
@@ -29,3 +34,78 @@ class LLMSettings(BaseSettings):
     max_tokens: int | None = Field(
         description="The maximum number of tokens for generation.", default=10000
     )
+    conversation_ttl: float = Field(
+        description="Seconds an idle conversation is kept for.", default=3600
+    )
+    max_conversations: int = Field(
+        description="The maximum number of conversations kept.", default=1000
+    )
+    mock_scenario: str | None = Field(
+        description="A JSON scenario file the mock provider replays.", default=None
+    )
+
+
+class LatencyDistribution(BaseModel):
+    """The distribution of the seconds a mock turn takes."""
+
+    distribution: Literal["constant", "uniform", "normal", "lognormal"] = "constant"
+    seconds: float = Field(
+        description="The constant latency, or the mean of uniform and normal "
+        "latencies and the median of lognormal ones.",
+        default=0.0,
+        ge=0,
+    )
+    spread: float = Field(
+        description="The half-width of uniform latencies, the standard deviation "
+        "of normal ones and the sigma of lognormal ones.",
+        default=0.0,
+        ge=0,
+    )
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a latency, never below zero."""
+        if self.distribution == "uniform":
+            value = rng.uniform(self.seconds - self.spread, self.seconds + self.spread)
+        elif self.distribution == "normal":
+            value = rng.gauss(self.seconds, self.spread)
+        elif self.distribution == "lognormal" and self.seconds > 0:
+            value = rng.lognormvariate(math.log(self.seconds), self.spread)
+        else:
+            value = self.seconds
+        return max(0.0, value)
+
+
+class ScenarioToolUse(BaseModel):
+    """A tool call the mock provider requests."""
+
+    name: str = Field(description="The name of the tool.")
+    arguments: dict[str, Any] = Field(
+        default_factory=dict, description="The arguments of the call."
+    )
+
+
+class ScenarioTurn(BaseModel):
+    """A response of the mock provider."""
+
+    text: str | None = Field(default=None, description="Text emitted before tools.")
+    tool_uses: list[ScenarioToolUse] = Field(
+        default_factory=list, description="The tools requested; none ends the turn."
+    )
+    latency: LatencyDistribution | None = Field(
+        default=None, description="Overrides the scenario's latency for this turn."
+    )
+    usage: Usage | None = Field(default=None, description="The usage reported.")
+
+
+class MockScenario(BaseModel):
+    """A script of turns for the mock provider to replay."""
+
+    model: str | None = Field(default=None, description="The model reported.")
+    seed: int | None = Field(default=None, description="Seeds the latency draws.")
+    latency: LatencyDistribution = Field(
+        default_factory=LatencyDistribution, description="The latency of each turn."
+    )
+    turns: list[ScenarioTurn] = Field(
+        default_factory=list,
+        description="The responses in order; once exhausted, the turn ends.",
+    )
@@ -0,0 +1,33 @@
+"""Helpers for the Prometheus metrics of the services."""
+
+from .schemas import Usage
+
+# The response header in which the LLM server names its provider
+PROVIDER_HEADER = "X-LLM-Provider"
+
+# Latency buckets in seconds, from a fast cached call to a slow LLM turn
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def usage_tokens(usage: Usage) -> dict[str, int]:
+    """Return the tokens of a response by type, as used for the `type` label."""
+    return {
+        "input": usage.input_tokens,
+        "output": usage.output_tokens,
+        "cache_creation": usage.cache_creation_input_tokens or 0,
+        "cache_read": usage.cache_read_input_tokens or 0,
+    }
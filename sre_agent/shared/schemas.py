@@ -79,6 +79,42 @@ class TextGenerationPayload(BaseModel):
     )
 
 
+class ToolCatalogPayload(BaseModel):
+    """The payload for registering a tool catalog for conversations."""
+
+    tools: list[Tool] = Field(description="Tools available for the LLM to use.")
+
+
+class ToolCatalog(BaseModel):
+    """A registered tool catalog."""
+
+    catalog_id: str = Field(description="Content-derived identifier of the catalog.")
+
+
+class ConversationPayload(BaseModel):
+    """The payload for opening a conversation."""
+
+    catalog_id: str = Field(description="The tool catalog the conversation uses.")
+    messages: list[MessageBlock] = Field(
+        description="The initial messages of the conversation."
+    )
+
+
+class Conversation(BaseModel):
+    """An open conversation."""
+
+    conversation_id: str = Field(description="Unique identifier of the conversation.")
+
+
+class ConversationTurnPayload(BaseModel):
+    """The payload for a turn of a conversation."""
+
+    messages: list[MessageBlock] = Field(
+        default_factory=list,
+        description="Messages appended to the conversation since the last turn.",
+    )
+
+
 class Message(BaseModel):
     """A message containing content and metadata."""
 
@@ -0,0 +1,96 @@
+"""OpenTelemetry tracing set-up shared by the services."""
+
+import os
+import threading
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from enum import StrEnum
+
+from opentelemetry import trace
+from opentelemetry.propagate import extract
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+
+from .logger import logger
+
+DEFAULT_TRACES_FILE = "traces.jsonl"
+
+
+class TracesExporter(StrEnum):
+    """Where finished spans are sent."""
+
+    NONE = "none"
+    OTLP = "otlp"
+    FILE = "file"
+
+
+class FileSpanExporter(SpanExporter):
+    """Append each finished span to a file as a line of JSON."""
+
+    def __init__(self, path: str) -> None:
+        """Initialise the exporter.
+
+        Args:
+            path: The file the spans are appended to.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        """Write a batch of spans."""
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        with self._lock, open(self.path, "a") as f:
+            f.write(lines)
+        return SpanExportResult.SUCCESS
+
+
+def configure_tracing(service_name: str) -> TracerProvider | None:
+    """Install a tracer provider exporting spans as `OTEL_TRACES_EXPORTER` says.
+
+    `otlp` sends spans to the collector at `OTEL_EXPORTER_OTLP_ENDPOINT`, and
+    `file` appends them to `TRACES_FILE` for offline analysis. By default
+    tracing is off and spans cost next to nothing.
+
+    Args:
+        service_name: The name the service's spans are reported under.
+
+    Returns:
+        The installed provider, or None if tracing is off.
+    """
+    exporter_name = TracesExporter(
+        os.getenv("OTEL_TRACES_EXPORTER", TracesExporter.NONE).lower()
+    )
+    exporter: SpanExporter
+    if exporter_name == TracesExporter.NONE:
+        return None
+    if exporter_name == TracesExporter.OTLP:
+        # Only needed when spans go to a collector
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (  # noqa: PLC0415
+            OTLPSpanExporter,
+        )
+
+        exporter = OTLPSpanExporter()
+    else:
+        exporter = FileSpanExporter(os.getenv("TRACES_FILE", DEFAULT_TRACES_FILE))
+
+    provider = TracerProvider(resource=Resource.create({SERVICE_NAME: service_name}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    logger.info("Exporting %s traces with the %s exporter", service_name, exporter_name)
+    return provider
+
+
+@contextmanager
+def server_span(
+    tracer: trace.Tracer, name: str, headers: Mapping[str, str]
+) -> Iterator[trace.Span]:
+    """Trace a request as a child of the caller's span from its `traceparent`."""
+    with tracer.start_as_current_span(
+        name, context=extract(headers), kind=trace.SpanKind.SERVER
+    ) as span:
+        yield span
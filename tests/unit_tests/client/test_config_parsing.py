@@ -30,3 +30,16 @@ def test_services_tools_csv_and_empty():
     cfg = client_schemas.ClientConfig()
     assert cfg.services == ["a", "b", "c"]
     assert cfg.tools == []
+
+
+def test_mcp_server_urls_json_object():
+    """MCP_SERVER_URLS maps server names to URLs; invalid values are ignored."""
+    os.environ["MCP_SERVER_URLS"] = '{"slack": "http://127.0.0.1:9000/sse"}'
+    try:
+        assert client_schemas.ClientConfig().mcp_server_urls == {
+            "slack": "http://127.0.0.1:9000/sse"
+        }
+        os.environ["MCP_SERVER_URLS"] = "not json"
+        assert client_schemas.ClientConfig().mcp_server_urls == {}
+    finally:
+        os.environ.pop("MCP_SERVER_URLS")
@@ -0,0 +1,90 @@
+"""Unit tests for conversation compaction in sre_agent/client/utils/context.py."""
+
+import copy
+from typing import Any
+
+from sre_agent.client.utils.context import ContextCompactor, estimate_tokens
+
+
+def _conversation(turns: int, result_chars: int = 4000) -> list[dict[str, Any]]:
+    messages: list[dict[str, Any]] = [
+        {"role": "user", "content": [{"type": "text", "text": "Diagnose cartservice"}]}
+    ]
+    for i in range(turns):
+        messages.append(
+            {
+                "role": "assistant",
+                "content": [
+                    {
+                        "type": "tool_use",
+                        "id": f"t{i}",
+                        "name": "get_logs",
+                        "arguments": {},
+                    }
+                ],
+            }
+        )
+        messages.append(
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": f"t{i}",
+                        "name": "get_logs",
+                        "content": [{"type": "text", "text": f"{i}" * result_chars}],
+                        "is_error": False,
+                    }
+                ],
+            }
+        )
+    return messages
+
+
+def test_under_budget_is_untouched():
+    """Messages within the budget are sent as they are."""
+    messages = _conversation(turns=3)
+    original = copy.deepcopy(messages)
+
+    report = ContextCompactor(budget_tokens=100_000).compact(messages)
+
+    assert messages == original
+    assert report.tokens_before == report.tokens_after
+    assert report.compacted == 0
+
+
+def test_old_results_are_compacted_and_recent_turns_kept():
+    """Old tool results become excerpts; the prompt and recent turns stay."""
+    messages = _conversation(turns=5)
+    original = copy.deepcopy(messages)
+    compactor = ContextCompactor(
+        budget_tokens=estimate_tokens(messages) - 100,
+        keep_recent_turns=2,
+        excerpt_chars=100,
+    )
+
+    report = compactor.compact(messages)
+
+    assert report.compacted >= 1
+    assert report.tokens_after <= compactor.budget_tokens * compactor.target_ratio
+    assert messages[0] == original[0]
+    assert messages[-4:] == original[-4:]
+    excerpt = messages[2]["content"][0]["content"][0]["text"]
+    assert excerpt.startswith("[Earlier get_logs result compacted: 4000 characters")
+
+
+def test_compaction_is_sticky():
+    """Compacted results are not rewritten on later turns, keeping the prefix."""
+    messages = _conversation(turns=4)
+    compactor = ContextCompactor(
+        budget_tokens=estimate_tokens(messages) - 100, excerpt_chars=100
+    )
+    compactor.compact(messages)
+    prefix = copy.deepcopy(messages)
+
+    messages.extend(_conversation(turns=1)[1:])
+    report = compactor.compact(messages)
+
+    assert messages[: len(prefix)] == prefix
+    assert report.turn == 2  # noqa: PLR2004
+    assert report.compacted == 0
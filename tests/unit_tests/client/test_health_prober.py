@@ -0,0 +1,82 @@
+"""Unit tests for the health prober in sre_agent/client/utils/health.py."""
+
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from sre_agent.client.utils.health import HealthProber, HealthStatus
+
+
+class TestHealthProber(IsolatedAsyncioTestCase):
+    """Test that dependencies are checked in the background and cached."""
+
+    async def test_snapshot_reports_each_dependency(self):
+        """Each check records its status, latency and age."""
+        calls = {"ok": 0}
+
+        async def _ok() -> None:
+            calls["ok"] += 1
+
+        async def _down() -> None:
+            raise ConnectionError("refused")
+
+        prober = HealthProber({"llm-server": _ok, "slack": _down})
+        self.assertEqual(prober.snapshot()["status"], "Starting")
+
+        await prober.check_all()
+        snapshot = prober.snapshot()
+        for _ in range(3):
+            prober.snapshot()
+
+        self.assertFalse(prober.healthy)
+        self.assertEqual(calls["ok"], 1)
+        self.assertEqual(snapshot["status"], "Partially Available")
+        slack = snapshot["dependencies"]["slack"]
+        self.assertEqual(slack["status"], HealthStatus.DOWN)
+        self.assertEqual(slack["error"], "ConnectionError - refused")
+        self.assertGreaterEqual(
+            snapshot["dependencies"]["llm-server"]["age_seconds"], 0
+        )
+        self.assertIsNotNone(snapshot["dependencies"]["llm-server"]["latency_seconds"])
+
+    async def test_slow_checks_time_out(self):
+        """A check which outlasts the timeout marks the dependency down."""
+
+        async def _hang() -> None:
+            await asyncio.sleep(10)
+
+        prober = HealthProber({"llama-firewall": _hang}, timeout=0.01)
+        await prober.check_all()
+
+        self.assertEqual(prober.snapshot()["status"], "Unavailable")
+        self.assertEqual(prober.results["llama-firewall"].error, "TimeoutError")
+
+    async def test_background_checks_repeat_on_the_interval(self):
+        """Started probers keep checking until closed."""
+        calls: list[int] = []
+
+        async def _ok() -> None:
+            calls.append(1)
+
+        prober = HealthProber({"github": _ok}, interval=0.01)
+        prober.start()
+        await asyncio.sleep(0.05)
+        await prober.close()
+
+        self.assertGreater(len(calls), 1)
+        self.assertTrue(prober.healthy)
+
+    async def test_liveness_only_fails_on_a_failed_check(self):
+        """Dependencies not yet checked are not down, and subsets report alone."""
+
+        async def _down() -> None:
+            raise ConnectionError("refused")
+
+        prober = HealthProber({"slack": _down, "llm-server": _down})
+        self.assertEqual(prober.down(["slack"]), [])
+
+        await prober.check_all()
+
+        self.assertEqual(prober.down(["slack"]), ["slack"])
+        snapshot = prober.snapshot(["slack"])
+        self.assertEqual(list(snapshot["dependencies"]), ["slack"])
+        self.assertEqual(snapshot["status"], "Unavailable")
@@ -0,0 +1,96 @@
+"""Unit tests for the diagnosis job queue in sre_agent/client/utils/jobs.py."""
+
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from sre_agent.client.utils.jobs import JobQueue, JobStatus, QueueFullError
+
+
+class Runner:
+    """A job runner which holds every job until it is released."""
+
+    def __init__(self) -> None:
+        """Initialise the counters."""
+        self.release = asyncio.Event()
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, service: str) -> str:
+        """Run a job, failing for the service called `broken`."""
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await self.release.wait()
+            if service == "broken":
+                raise RuntimeError("diagnosis failed")
+            return f"diagnosed {service}"
+        finally:
+            self.running -= 1
+
+
+class TestJobQueue(IsolatedAsyncioTestCase):
+    """Test the job queue, its workers and its status reporting."""
+
+    async def asyncSetUp(self) -> None:
+        """Start a queue with two workers and room for two waiting jobs."""
+        self.runner = Runner()
+        self.queue = JobQueue(self.runner, workers=2, max_queued=2)
+        self.queue.start()
+
+    async def asyncTearDown(self) -> None:
+        """Stop the workers."""
+        await self.queue.close()
+
+    async def test_workers_bound_concurrency(self):
+        """No more jobs run at once than there are workers."""
+        jobs = [self.queue.submit(name, service=name)[0] for name in "ab"]
+        await asyncio.sleep(0)
+        jobs += [self.queue.submit(name, service=name)[0] for name in "cd"]
+        await asyncio.sleep(0)
+
+        self.assertEqual(
+            [job.status for job in jobs],
+            [JobStatus.RUNNING] * 2 + [JobStatus.QUEUED] * 2,
+        )
+        self.runner.release.set()
+        await asyncio.gather(*(job.done.wait() for job in jobs))
+
+        self.assertEqual(self.runner.max_running, 2)
+        self.assertEqual(jobs[3].result, "diagnosed d")
+        self.assertEqual(self.queue.stats()["finished"], 4)  # noqa: PLR2004
+
+    async def test_full_queue_rejects_jobs(self):
+        """Submissions beyond the queue's capacity are rejected."""
+        self.queue.submit("a", service="a")
+        self.queue.submit("b", service="b")
+
+        with self.assertRaises(QueueFullError):
+            self.queue.submit("c", service="c")
+        self.assertEqual(self.queue.stats()["rejected"], 1)
+
+    async def test_duplicate_jobs_are_coalesced(self):
+        """A job with the key of an unfinished job attaches to it."""
+        first, coalesced_first = self.queue.submit("a", service="a")
+        second, coalesced_second = self.queue.submit("a", service="a")
+
+        self.assertIs(first, second)
+        self.assertEqual((coalesced_first, coalesced_second), (False, True))
+        self.runner.release.set()
+        await first.done.wait()
+
+        third, coalesced_third = self.queue.submit("a", service="a")
+        self.assertIsNot(third, first)
+        self.assertFalse(coalesced_third)
+        self.assertEqual(self.queue.stats()["coalesced"], 1)
+
+    async def test_failures_and_timings_are_reported(self):
+        """A failed job records its error and timings."""
+        job, _ = self.queue.submit("broken", service="broken")
+        self.runner.release.set()
+        await job.done.wait()
+
+        summary = self.queue.get(job.id).summary()
+        self.assertEqual(summary["status"], JobStatus.FAILED)
+        self.assertEqual(summary["error"], "RuntimeError: diagnosis failed")
+        self.assertGreaterEqual(summary["run_seconds"], 0)
+        self.assertGreaterEqual(summary["queued_seconds"], 0)
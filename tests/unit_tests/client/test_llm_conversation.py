@@ -0,0 +1,138 @@
+"""Unit tests for LLM conversations in sre_agent/client/utils/conversation.py."""
+
+# ruff: noqa: E402
+
+import json
+import os
+import sys
+from typing import Any
+from unittest import IsolatedAsyncioTestCase
+
+import httpx
+
+sys.path.insert(0, os.path.abspath("sre_agent"))
+sys.path.insert(0, os.path.abspath("sre_agent/client"))
+
+from utils.conversation import LLMConversation  # type: ignore
+
+REPLY = {"id": "1", "model": "test", "content": [{"type": "text", "text": "ok"}]}
+
+
+class FakeServer:
+    """A fake LLM server recording the requests it receives."""
+
+    def __init__(self, conversations: bool = True) -> None:
+        """Initialise the request log."""
+        self.conversations = conversations
+        self.requests: list[tuple[str, str, Any]] = []
+        self.known: set[str] = set()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:  # noqa: PLR0911
+        """Answer a request like the LLM server would."""
+        body = json.loads(request.content) if request.content else None
+        path = request.url.path
+        self.requests.append((request.method, path, body))
+        if path == "/generate":
+            return httpx.Response(
+                200, json=REPLY, headers={"X-LLM-Provider": "anthropic"}
+            )
+        if not self.conversations:
+            return httpx.Response(404)
+        if path == "/catalogs":
+            return httpx.Response(200, json={"catalog_id": "c"})
+        if path == "/conversations":
+            conversation_id = f"conv-{len(self.known)}"
+            self.known.add(conversation_id)
+            return httpx.Response(200, json={"conversation_id": conversation_id})
+        conversation_id = path.split("/")[2]
+        if request.method == "DELETE":
+            self.known.discard(conversation_id)
+            return httpx.Response(200, json={"status": "deleted"})
+        if conversation_id not in self.known:
+            return httpx.Response(404)
+        return httpx.Response(200, json=REPLY)
+
+    def sent(self, path_suffix: str) -> list[int]:
+        """The number of messages sent in each request to a path."""
+        return [
+            len(body["messages"])
+            for method, path, body in self.requests
+            if method == "POST" and path.endswith(path_suffix)
+        ]
+
+
+def _message(text: str) -> dict[str, Any]:
+    return {"role": "user", "content": [{"type": "text", "text": text}]}
+
+
+def _conversation(server: FakeServer) -> LLMConversation:
+    http = httpx.AsyncClient(
+        transport=httpx.MockTransport(server), base_url="http://llm"
+    )
+    return LLMConversation(http, tools=[{"name": "list_pods", "inputSchema": {}}])
+
+
+class TestLLMConversation(IsolatedAsyncioTestCase):
+    """Test which messages each turn sends to the LLM server."""
+
+    async def test_turns_send_only_new_messages(self):
+        """The catalog and history are sent once, then only new messages."""
+        server = FakeServer()
+        conversation = _conversation(server)
+        messages = [_message("prompt")]
+
+        await conversation.generate(messages)
+        messages += [_message("a"), _message("b")]
+        await conversation.generate(messages)
+
+        self.assertEqual(server.sent("/conversations"), [1])
+        self.assertEqual(server.sent("/generate"), [0, 2])
+        self.assertEqual([path for _, path, _ in server.requests].count("/catalogs"), 1)
+
+    async def test_rewritten_history_opens_a_new_conversation(self):
+        """After compaction the full history goes to a new conversation."""
+        server = FakeServer()
+        conversation = _conversation(server)
+        messages = [_message("prompt"), _message("a")]
+        await conversation.generate(messages)
+
+        messages.append(_message("b"))
+        await conversation.generate(messages, rewritten=True)
+
+        self.assertEqual(server.sent("/conversations"), [2, 3])
+        self.assertIn(("DELETE", "/conversations/conv-0", None), server.requests)
+
+    async def test_expired_conversation_is_reopened(self):
+        """A conversation the server forgot is opened again with the history."""
+        server = FakeServer()
+        conversation = _conversation(server)
+        await conversation.generate([_message("prompt")])
+        server.known.clear()
+
+        response = await conversation.generate([_message("prompt"), _message("a")])
+
+        self.assertEqual(response.content[0].text, "ok")
+        self.assertEqual(server.sent("/conversations"), [1, 2])
+
+    async def test_falls_back_to_generate(self):
+        """Servers without the conversation API get the full payload."""
+        server = FakeServer(conversations=False)
+        conversation = _conversation(server)
+
+        await conversation.generate([_message("prompt")])
+        await conversation.generate([_message("prompt"), _message("a")])
+
+        self.assertFalse(conversation.stateful)
+        self.assertEqual(
+            [path for _, path, _ in server.requests],
+            ["/catalogs", "/generate", "/generate"],
+        )
+
+    async def test_provider_is_read_from_the_response(self):
+        """The provider the server names is kept for labelling metrics."""
+        conversation = _conversation(FakeServer(conversations=False))
+        self.assertEqual(conversation.provider, "unknown")
+
+        await conversation.generate([_message("prompt")])
+
+        self.assertEqual(conversation.provider, "anthropic")
@@ -0,0 +1,46 @@
+"""Unit tests for log template mining in sre_agent/client/utils/logs.py."""
+
+from sre_agent.client.utils.logs import WILDCARD, LogTemplateMiner, compress_logs
+
+
+def test_similar_lines_share_a_template():
+    """Lines differing only in variable tokens collapse into one template."""
+    miner = LogTemplateMiner()
+    for i in range(5):
+        miner.add(f"GET /cart/{i} took {10 + i}ms status 200")
+    miner.add("Failed to connect to redis at 10.0.0.1:6379")
+
+    assert miner.lines == 6  # noqa: PLR2004
+    assert len(miner.templates) == 2  # noqa: PLR2004
+    template = miner.templates[0]
+    assert template.count == 5  # noqa: PLR2004
+    assert template.tokens == ["GET", WILDCARD, "took", WILDCARD, "status", "200"]
+    assert template.samples[1] == ["/cart/0", "/cart/1", "/cart/2"]
+
+
+def test_timestamps_are_stripped_and_tracked():
+    """Leading timestamps do not affect matching and bound each template."""
+    miner = LogTemplateMiner()
+    miner.add("2024-05-01T10:00:00.000Z Processing order 1")
+    miner.add("2024-05-01T10:00:05.000Z Processing order 2")
+    miner.add("[2024-05-01 10:00:09,120] Processing order 3")
+
+    (template,) = miner.templates
+    assert template.first_timestamp == "2024-05-01T10:00:00.000Z"
+    assert template.last_timestamp == "2024-05-01 10:00:09,120"
+
+
+def test_rendered_output_is_shorter_than_repetitive_logs():
+    """Rendering a repetitive log keeps one line per template."""
+    lines = [
+        f"2024-05-01T10:00:{i % 60:02d}Z INFO request id={i} served in {i % 7}ms"
+        for i in range(500)
+    ]
+    lines.insert(250, "2024-05-01T10:04:10Z ERROR cart store unavailable")
+
+    rendered, miner = compress_logs(lines)
+
+    assert len(miner.templates) == 2  # noqa: PLR2004
+    assert "[x500]" in rendered
+    assert "ERROR cart store unavailable" in rendered
+    assert len(rendered) < len("\n".join(lines)) / 20
@@ -0,0 +1,138 @@
+"""Unit tests for recording and replaying diagnoses in utils/replay.py."""
+
+import os
+import tempfile
+from typing import Any
+from unittest import IsolatedAsyncioTestCase
+
+import httpx
+from mcp.types import CallToolResult, GetPromptResult, PromptMessage, TextContent
+
+from sre_agent.client.utils.replay import Trace, record_exchange, record_trace
+from sre_agent.client.utils.schemas import MCPServer, ServerSession
+
+HTTP_OK = 200
+
+
+class FakeSession:
+    """An MCP session answering every call with its name and arguments."""
+
+    async def call_tool(
+        self, name: str, arguments: dict[str, Any] | None = None
+    ) -> CallToolResult:
+        """Echo the call."""
+        return CallToolResult(
+            content=[TextContent(type="text", text=f"{name} {arguments}")]
+        )
+
+    async def get_prompt(
+        self, name: str, arguments: dict[str, str] | None = None
+    ) -> GetPromptResult:
+        """Return a fixed prompt."""
+        return GetPromptResult(
+            messages=[
+                PromptMessage(
+                    role="user", content=TextContent(type="text", text="Diagnose.")
+                )
+            ]
+        )
+
+
+def _llm(replies: list[str]) -> httpx.AsyncClient:
+    """A client whose server answers each request with the next reply."""
+    answers = iter(replies)
+    return httpx.AsyncClient(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(HTTP_OK, json={"text": next(answers)})
+        ),
+        base_url="http://llm-server",
+        event_hooks={"response": [record_exchange("llm")]},
+    )
+
+
+class TestReplay(IsolatedAsyncioTestCase):
+    """Record a diagnosis' exchanges, then replay them from the trace."""
+
+    def setUp(self) -> None:
+        """Record to a temporary directory."""
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+
+    def tearDown(self) -> None:
+        """Remove the traces."""
+        self._directory.cleanup()
+
+    async def _record(self) -> Trace:
+        async with (
+            record_trace(self.directory, {"service": "cartservice"}) as recorder,
+            _llm(["first", "second"]) as llm,
+        ):
+            assert recorder is not None
+            sessions = recorder.wrap_sessions(
+                {MCPServer.KUBERNETES: ServerSession(tools=[], session=FakeSession())}
+            )
+            session = sessions[MCPServer.KUBERNETES].session
+            await session.get_prompt("diagnose", {"service": "cartservice"})
+            await llm.post("/generate", json={"turn": 1})
+            await session.call_tool("get_logs", {"name": "cartservice"})
+            await llm.post("/generate", json={"turn": 2})
+            recorder.result = {"response": "done"}
+
+        (path,) = os.listdir(self.directory)
+        return Trace.load(os.path.join(self.directory, path))
+
+    async def test_a_recorded_diagnosis_is_replayed_from_its_trace(self):
+        """The replay answers each prompt, tool call and request as recorded."""
+        trace = await self._record()
+        self.assertEqual(trace.metadata["service"], "cartservice")
+        self.assertEqual(trace.result["response"], "done")
+
+        replayer = trace.replayer()
+        session = replayer.sessions()[MCPServer.KUBERNETES].session
+        async with httpx.AsyncClient(
+            transport=replayer.transport("llm"), base_url="http://llm-server"
+        ) as llm:
+            prompt = await session.get_prompt("diagnose")
+            replies = [
+                (await llm.post("/generate", json={"turn": turn})).json()["text"]
+                for turn in (1, 2)
+            ]
+            result = await session.call_tool("get_logs", {"name": "cartservice"})
+
+        self.assertEqual(
+            prompt.messages[0].content, TextContent(type="text", text="Diagnose.")
+        )
+        self.assertEqual(replies, ["first", "second"])
+        self.assertEqual(
+            result.content,
+            [TextContent(type="text", text="get_logs {'name': 'cartservice'}")],
+        )
+        self.assertEqual(replayer.diverged, 0)
+
+    async def test_changed_requests_get_the_next_recording_and_diverge(self):
+        """A request with a body the trace lacks still gets an answer."""
+        replayer = (await self._record()).replayer()
+
+        async with httpx.AsyncClient(
+            transport=replayer.transport("llm"), base_url="http://llm-server"
+        ) as llm:
+            response = await llm.post("/generate", json={"turn": "changed"})
+
+        self.assertEqual(response.json()["text"], "first")
+        self.assertEqual(replayer.diverged, 1)
+
+    async def test_exchanges_outside_a_recording_are_not_kept(self):
+        """Without an active recorder the response hook does nothing."""
+        async with _llm(["only"]) as llm:
+            response = await llm.post("/generate", json={})
+
+        self.assertEqual(response.status_code, HTTP_OK)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    async def test_a_missing_trace_directory_is_created(self):
+        """Recording into a directory which does not exist yet still works."""
+        self.directory = os.path.join(self.directory, "traces")
+
+        trace = await self._record()
+
+        self.assertEqual(trace.result["response"], "done")
@@ -0,0 +1,109 @@
+"""Unit tests for the diagnosis run store in sre_agent/client/utils/runs.py."""
+
+from pathlib import Path
+from typing import Any
+
+from sre_agent.client.utils.runs import RunStore, percentiles
+
+
+def _result(llm_seconds: list[float], tool_seconds: float | None) -> dict[str, Any]:
+    return {
+        "token_usage": {"input_tokens": 100, "output_tokens": 10},
+        "timing": {"total_duration": 5.0, "firewall_duration": 0.5},
+        "turns": [
+            {
+                "turn": i,
+                "model": "mock",
+                "llm_seconds": seconds,
+                "tokens": {"input": 50, "output": 5},
+                "firewall_seconds": 0.25,
+                "tools": [
+                    {
+                        "name": "get_logs",
+                        "seconds": tool_seconds,
+                        "result_chars": 400,
+                        "is_error": False,
+                        "blocked": False,
+                    }
+                ],
+            }
+            for i, seconds in enumerate(llm_seconds)
+        ],
+    }
+
+
+def _record(store: RunStore, service: str, started_at: float, **kwargs: Any) -> str:
+    return store.record(
+        service,
+        namespace="default",
+        container=None,
+        started_at=started_at,
+        duration=kwargs.get("duration", 5.0),
+        outcome=kwargs.get("outcome", "ok"),
+        result=kwargs.get("result", _result([1.0, 2.0], 0.5)),
+    )
+
+
+def test_runs_keep_their_per_turn_breakdown():
+    """A stored run has totals for listing and the turns for analysis."""
+    store = RunStore(":memory:")
+    run_id = _record(store, "cartservice", 100.0)
+
+    run = store.get(run_id)
+
+    assert run is not None
+    assert (run["turns"], run["llm_seconds"], run["tool_seconds"]) == (2, 3.0, 1.0)
+    assert run["breakdown"][1]["tools"][0]["result_chars"] == 400  # noqa: PLR2004
+    assert store.runs()[0]["id"] == run_id
+    assert store.get("missing") is None
+
+
+def test_stats_aggregate_per_service():
+    """Percentiles and totals are computed for each service separately."""
+    store = RunStore(":memory:")
+    _record(store, "cartservice", 100.0, duration=4.0)
+    _record(store, "cartservice", 200.0, result=_result([3.0], None))
+    _record(store, "currencyservice", 300.0, outcome="timeout", result=None)
+
+    stats = store.stats()["services"]
+    cart = stats["cartservice"]
+
+    assert cart["runs"] == 2  # noqa: PLR2004
+    assert cart["duration_seconds"]["p50"] == 4.0  # noqa: PLR2004
+    assert cart["llm_seconds_per_turn"]["max"] == 3.0  # noqa: PLR2004
+    assert cart["tools"]["get_logs"]["calls"] == 2  # noqa: PLR2004
+    assert cart["tools"]["get_logs"]["cached"] == 1
+    assert cart["tokens"]["input"] == 200  # noqa: PLR2004
+    assert stats["currencyservice"]["outcomes"] == {"timeout": 1}
+    assert list(store.stats(since=250.0)["services"]) == ["currencyservice"]
+
+
+def test_only_the_most_recent_runs_are_kept():
+    """The oldest runs are dropped beyond the limit."""
+    store = RunStore(":memory:", max_runs=2)
+    for started_at in (1.0, 2.0, 3.0):
+        _record(store, "cartservice", started_at)
+
+    assert [run["started_at"] for run in store.runs()] == [3.0, 2.0]
+
+
+def test_runs_survive_reopening_the_store(tmp_path: Path):
+    """Runs are kept on disk, in a directory created for them."""
+    path = str(tmp_path / "data" / "runs.db")
+    store = RunStore(path)
+    run_id = _record(store, "cartservice", 1.0)
+    store.close()
+
+    assert RunStore(path).get(run_id) is not None
+
+
+def test_percentiles_use_the_nearest_rank():
+    """Percentiles pick observed values."""
+    assert percentiles([]) is None
+    assert percentiles([float(v) for v in range(1, 101)]) == {
+        "p50": 50.0,
+        "p90": 90.0,
+        "p99": 99.0,
+        "mean": 50.5,
+        "max": 100.0,
+    }
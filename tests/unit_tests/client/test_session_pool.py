@@ -0,0 +1,126 @@
+"""Unit tests for the pooled MCP sessions in sre_agent/client/utils/pool.py."""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+from unittest import IsolatedAsyncioTestCase
+
+import anyio
+from mcp.types import (
+    CallToolResult,
+    ListToolsResult,
+    ServerNotification,
+    TextContent,
+    Tool,
+    ToolListChangedNotification,
+)
+
+from sre_agent.client.utils.pool import MCPSessionPool
+from sre_agent.client.utils.schemas import MCPServer
+
+
+class FakeSession:
+    """A stand-in for an initialised `ClientSession`."""
+
+    def __init__(self, closed: bool = False) -> None:
+        """Record the calls made on the session."""
+        self.closed = closed
+        self.list_tools_calls = 0
+        self.tool_calls: list[str] = []
+
+    async def list_tools(self) -> ListToolsResult:
+        """Return a single tool."""
+        self.list_tools_calls += 1
+        return ListToolsResult(
+            tools=[Tool(name="list_pods", inputSchema={"type": "object"})]
+        )
+
+    async def call_tool(self, name: str, arguments: Any) -> CallToolResult:
+        """Fail like a dropped transport if closed, otherwise echo the call."""
+        if self.closed:
+            raise anyio.ClosedResourceError
+        self.tool_calls.append(name)
+        return CallToolResult(content=[TextContent(type="text", text=name)])
+
+
+class FakeFactory:
+    """A session factory handing out a scripted sequence of sessions."""
+
+    def __init__(self, *sessions: FakeSession) -> None:
+        """Store the sessions to hand out in order."""
+        self.sessions = list(sessions)
+        self.opened: list[FakeSession] = []
+        self.handler: Any = None
+
+    @asynccontextmanager
+    async def __call__(self, url: str, handler: Any) -> AsyncIterator[FakeSession]:
+        """Open the next session."""
+        self.handler = handler
+        session = self.sessions.pop(0)
+        self.opened.append(session)
+        yield session
+
+
+def _pool(factory: FakeFactory) -> MCPSessionPool:
+    return MCPSessionPool(
+        {MCPServer.KUBERNETES: "http://kubernetes:3001/sse"},
+        session_factory=factory,  # type: ignore[arg-type]
+        initial_backoff=0,
+    )
+
+
+class TestSessionPool(IsolatedAsyncioTestCase):
+    """Test the pooled MCP sessions."""
+
+    async def test_sessions_are_shared_and_tools_cached(self):
+        """Concurrent diagnoses share one session and one list_tools call."""
+        session = FakeSession()
+        pool = _pool(FakeFactory(session))
+        pool.start()
+
+        first, second = await asyncio.gather(
+            pool.sessions(timeout=1), pool.sessions(timeout=1)
+        )
+
+        self.assertEqual(session.list_tools_calls, 1)
+        self.assertEqual(
+            [t.name for t in first[MCPServer.KUBERNETES].tools], ["list_pods"]
+        )
+        await first[MCPServer.KUBERNETES].session.call_tool("list_pods", {})
+        await second[MCPServer.KUBERNETES].session.call_tool("list_pods", {})
+        self.assertEqual(session.tool_calls, ["list_pods", "list_pods"])
+        await pool.close()
+
+    async def test_tool_list_changed_invalidates_cache(self):
+        """A tools/list_changed notification forces the tools to be re-listed."""
+        session = FakeSession()
+        factory = FakeFactory(session)
+        pool = _pool(factory)
+        pool.start()
+
+        await pool.sessions(timeout=1)
+        await factory.handler(
+            ServerNotification(
+                ToolListChangedNotification(method="notifications/tools/list_changed")
+            )
+        )
+        await pool.sessions(timeout=1)
+
+        self.assertEqual(session.list_tools_calls, 2)
+        await pool.close()
+
+    async def test_reconnects_and_retries_unsent_request(self):
+        """A request on a dropped transport is retried on a fresh session."""
+        dropped, fresh = FakeSession(closed=True), FakeSession()
+        factory = FakeFactory(dropped, fresh)
+        pool = _pool(factory)
+        pool.start()
+
+        sessions = await pool.sessions(timeout=1)
+        result = await sessions[MCPServer.KUBERNETES].session.call_tool("list_pods", {})
+
+        self.assertEqual(result.content[0].text, "list_pods")
+        self.assertEqual(factory.opened, [dropped, fresh])
+        self.assertEqual(pool.connections[MCPServer.KUBERNETES].reconnects, 1)
+        await pool.close()
@@ -0,0 +1,66 @@
+"""Unit tests for the tool result cache in sre_agent/client/utils/cache.py."""
+
+from sre_agent.client.utils.cache import ToolResultCache
+
+
+class FakeClock:
+    """A manually advanced clock."""
+
+    def __init__(self) -> None:
+        """Start the clock at zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+def test_only_allowlisted_tools_are_cached():
+    """Tools without a TTL policy are never cached or counted."""
+    cache = ToolResultCache({"list_pods": 10})
+    cache.put("slack_post_message", {"text": "hi"}, ["posted"])
+
+    assert cache.get("slack_post_message", {"text": "hi"}) is None
+    assert cache.stats()["misses"] == 0
+
+
+def test_arguments_are_normalised():
+    """Key order and None-valued arguments do not change the key."""
+    cache = ToolResultCache({"get_logs": 10})
+    cache.put("get_logs", {"name": "pod", "namespace": "default"}, ["logs"])
+
+    assert cache.get("get_logs", {"namespace": "default", "name": "pod"}) == ["logs"]
+    assert cache.get(
+        "get_logs", {"namespace": "default", "name": "pod", "container": None}
+    ) == ["logs"]
+    assert cache.get("get_logs", {"namespace": "other", "name": "pod"}) is None
+    assert cache.stats()["hits"] == 2  # noqa: PLR2004
+
+
+def test_results_expire_after_their_ttl():
+    """Each tool's results expire after its own TTL."""
+    clock = FakeClock()
+    cache = ToolResultCache({"list_pods": 10, "get_file_contents": 300}, clock=clock)
+    cache.put("list_pods", {}, ["pods"])
+    cache.put("get_file_contents", {"path": "a.py"}, ["code"])
+
+    clock.now = 11
+    assert cache.get("list_pods", {}) is None
+    assert cache.get("get_file_contents", {"path": "a.py"}) == ["code"]
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_result_is_evicted():
+    """The cache evicts the least recently used result when it is full."""
+    cache = ToolResultCache({"get_file_contents": 300}, max_entries=2)
+    cache.put("get_file_contents", {"path": "a.py"}, ["a"])
+    cache.put("get_file_contents", {"path": "b.py"}, ["b"])
+    cache.get("get_file_contents", {"path": "a.py"})
+    cache.put("get_file_contents", {"path": "c.py"}, ["c"])
+
+    assert cache.get("get_file_contents", {"path": "b.py"}) is None
+    assert cache.get("get_file_contents", {"path": "a.py"}) == ["a"]
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["size"] == 2  # noqa: PLR2004
+    assert stats["tools"]["get_file_contents"]["hits"] == 2  # noqa: PLR2004
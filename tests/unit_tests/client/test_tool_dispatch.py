@@ -0,0 +1,295 @@
+"""Unit tests for concurrent tool dispatch in sre_agent/client/client.py."""
+
+# ruff: noqa: E402
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from typing import Any
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import httpx
+from mcp.types import CallToolResult, TextContent, Tool
+
+sys.path.insert(0, os.path.abspath("sre_agent"))
+sys.path.insert(0, os.path.abspath("sre_agent/client"))
+
+from client import MCPClient  # type: ignore
+from shared.schemas import ToolUseBlock  # type: ignore
+from utils.cache import ToolResultCache  # type: ignore
+from utils.http_clients import DownstreamClients  # type: ignore
+from utils.replay import Trace, record_exchange, record_trace  # type: ignore
+from utils.schemas import ClientConfig, MCPServer, ServerSession  # type: ignore
+
+
+class RecordingSession:
+    """A fake MCP session which records how many calls overlap."""
+
+    def __init__(self, delays: dict[str, float] | None = None) -> None:
+        """Initialise the counters and any per-tool delays."""
+        self.delays = delays or {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.order: list[str] = []
+
+    async def call_tool(self, name: str, arguments: Any) -> CallToolResult:
+        """Simulate a slow tool call."""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.order.append(f"start:{name}")
+        await asyncio.sleep(self.delays.get(name, 0.01))
+        self.order.append(f"end:{name}")
+        self.in_flight -= 1
+        return CallToolResult(content=[TextContent(type="text", text=name)])
+
+
+def _firewall(
+    blocked: set[str] | None = None,
+    requests: list[int] | None = None,
+    order: list[str] | None = None,
+    fail: bool = False,
+) -> httpx.AsyncClient:
+    def _result(content: str) -> dict[str, Any]:
+        block = any(text in content for text in blocked or set())
+        return {"block": block, "result": {"reason": "test"}}
+
+    async def _handler(request: httpx.Request) -> httpx.Response:
+        items = json.loads(request.content)["items"]
+        if requests is not None:
+            requests.append(len(items))
+        if order is not None:
+            # Let speculative calls start, then record when the check answers
+            await asyncio.sleep(0.005)
+            order.append("checked")
+        if fail:
+            raise httpx.ConnectError("firewall unavailable", request=request)
+        return httpx.Response(
+            200, json={"results": [_result(item["content"]) for item in items]}
+        )
+
+    return httpx.AsyncClient(
+        transport=httpx.MockTransport(_handler), base_url="http://firewall"
+    )
+
+
+def _client(
+    session: RecordingSession,
+    tool_cache: ToolResultCache | None = None,
+    **firewall: Any,
+) -> MCPClient:
+    tools = ["list_pods", "get_logs", "describe_pod", "slack_post_message"]
+    client = MCPClient(
+        DownstreamClients(llm=httpx.AsyncClient(), firewall=_firewall(**firewall)),
+        tool_cache,
+    )
+    client.sessions = {
+        MCPServer.KUBERNETES: ServerSession(
+            tools=[Tool(name=name, inputSchema={}) for name in tools],
+            session=session,
+        )
+    }
+    return client
+
+
+def _tool_use(name: str) -> ToolUseBlock:
+    return ToolUseBlock(id=f"id-{name}", name=name, arguments={})
+
+
+class TestToolDispatch(IsolatedAsyncioTestCase):
+    """Test concurrent dispatch of the tool calls in a single LLM turn."""
+
+    def setUp(self) -> None:
+        """Give the client an explicit config, whatever the environment holds."""
+        patcher = patch(
+            "client._get_client_config",
+            return_value=ClientConfig(slack_channel_id="C1"),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_read_only_calls_overlap_and_keep_order(self):
+        """Independent tool calls run concurrently but outcomes keep their order."""
+        session = RecordingSession()
+        client = _client(session)
+
+        outcomes = await client._call_tools(
+            [_tool_use("get_logs"), _tool_use("list_pods")]
+        )
+
+        self.assertEqual(session.max_in_flight, 2)
+        self.assertEqual([o.content.name for o in outcomes], ["get_logs", "list_pods"])
+        self.assertEqual(
+            [o.result_content[0].text for o in outcomes], ["get_logs", "list_pods"]
+        )
+
+    async def test_side_effecting_tools_run_alone(self):
+        """Opted-out tools wait for earlier calls and block later ones."""
+        session = RecordingSession()
+        client = _client(session)
+
+        await client._call_tools(
+            [
+                _tool_use("get_logs"),
+                _tool_use("slack_post_message"),
+                _tool_use("list_pods"),
+            ]
+        )
+
+        self.assertEqual(session.max_in_flight, 1)
+        self.assertEqual(
+            session.order,
+            [
+                "start:get_logs",
+                "end:get_logs",
+                "start:slack_post_message",
+                "end:slack_post_message",
+                "start:list_pods",
+                "end:list_pods",
+            ],
+        )
+
+    async def test_blocked_call_stops_the_turn(self):
+        """A call blocked by the firewall ends the turn before later segments."""
+        session = RecordingSession()
+        client = _client(session, blocked={"slack_post_message"})
+
+        outcomes = await client._call_tools(
+            [_tool_use("slack_post_message"), _tool_use("list_pods")]
+        )
+
+        self.assertEqual([o.blocked for o in outcomes], [True])
+        self.assertEqual(session.order, [])
+        self.assertEqual(client.stop_reason, "end_turn")
+
+    async def test_cached_results_skip_the_session(self):
+        """A repeated read-only call is answered from the shared cache."""
+        session = RecordingSession()
+        cache = ToolResultCache({"list_pods": 60})
+
+        await _client(session, cache)._call_tools([_tool_use("list_pods")])
+        outcomes = await _client(session, cache)._call_tools([_tool_use("list_pods")])
+
+        self.assertEqual(session.order, ["start:list_pods", "end:list_pods"])
+        self.assertEqual(outcomes[0].result_content[0].text, "list_pods")
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    async def test_cached_logs_keep_the_fallback(self):
+        """A cached get_logs result still provides the logs fallback."""
+        session = RecordingSession()
+        cache = ToolResultCache({"get_logs": 60})
+
+        await _client(session, cache)._call_tools([_tool_use("get_logs")])
+        client = _client(session, cache)
+        await client._call_tools([_tool_use("get_logs")])
+
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertIn("get_logs", client.logs_fallback_text)
+
+    async def test_firewall_checks_are_batched_per_turn(self):
+        """All calls are checked in one request, then all results in another."""
+        session = RecordingSession()
+        requests: list[int] = []
+        client = _client(session, requests=requests)
+
+        await client._call_tools(
+            [_tool_use("get_logs"), _tool_use("list_pods"), _tool_use("list_pods")]
+        )
+
+        self.assertEqual(requests, [3, 3])
+
+    async def test_read_only_calls_start_during_the_call_check(self):
+        """Allowlisted calls overlap the check; the others wait for it."""
+        session = RecordingSession()
+        client = _client(session, order=session.order)
+
+        outcomes = await client._call_tools(
+            [_tool_use("get_logs"), _tool_use("slack_post_message")]
+        )
+
+        self.assertEqual(
+            session.order[:3], ["start:get_logs", "checked", "end:get_logs"]
+        )
+        self.assertEqual(session.order[3], "start:slack_post_message")
+        self.assertEqual(
+            [o.content.name for o in outcomes], ["get_logs", "slack_post_message"]
+        )
+
+    async def test_blocked_check_discards_speculative_calls(self):
+        """Speculative results never reach the LLM when the check blocks."""
+        session = RecordingSession()
+        client = _client(session, blocked={"list_pods"}, order=session.order)
+
+        outcomes = await client._call_tools([_tool_use("list_pods")])
+
+        self.assertEqual([o.blocked for o in outcomes], [True])
+        self.assertEqual(session.order, ["start:list_pods", "checked"])
+        self.assertEqual(client.stop_reason, "end_turn")
+
+    async def test_failed_check_cancels_speculative_calls(self):
+        """Speculative calls do not outlive a firewall check which raises."""
+        session = RecordingSession()
+        client = _client(session, order=session.order, fail=True)
+
+        with self.assertRaises(httpx.ConnectError):
+            await client._call_tools([_tool_use("list_pods")])
+        await asyncio.sleep(0.02)
+
+        self.assertEqual(session.order, ["start:list_pods", "checked"])
+
+    async def test_sequential_tools_wait_for_speculative_calls(self):
+        """A later sequential tool starts only once the speculative calls end."""
+        session = RecordingSession(delays={"get_logs": 0.05})
+        client = _client(session)
+
+        outcomes = await client._call_tools(
+            [
+                _tool_use("get_logs"),
+                _tool_use("describe_pod"),
+                _tool_use("slack_post_message"),
+            ]
+        )
+
+        self.assertLess(
+            session.order.index("end:get_logs"),
+            session.order.index("start:slack_post_message"),
+        )
+        self.assertEqual(
+            [o.content.name for o in outcomes],
+            ["get_logs", "describe_pod", "slack_post_message"],
+        )
+
+    async def test_blocked_turn_is_recorded_and_replayed(self):
+        """Cancelled speculative calls are recorded so the turn replays."""
+        session = RecordingSession()
+        with tempfile.TemporaryDirectory() as directory:
+            async with record_trace(directory, {"service": "cartservice"}) as recorder:
+                client = _client(session, blocked={"list_pods"}, order=session.order)
+                client.http.firewall.event_hooks = {
+                    "response": [record_exchange("firewall")]
+                }
+                client.sessions = recorder.wrap_sessions(client.sessions)
+                await client._call_tools([_tool_use("list_pods")])
+            (path,) = os.listdir(directory)
+            trace = Trace.load(os.path.join(directory, path))
+
+        replayer = trace.replayer()
+        client = MCPClient(
+            DownstreamClients(
+                llm=httpx.AsyncClient(),
+                firewall=httpx.AsyncClient(
+                    transport=replayer.transport("firewall"),
+                    base_url="http://firewall",
+                ),
+            ),
+            None,
+        )
+        client.sessions = replayer.sessions()
+        outcomes = await client._call_tools([_tool_use("list_pods")])
+
+        (call,) = [event for event in trace.events if event["type"] == "tool"]
+        self.assertTrue(call["cancelled"])
+        self.assertEqual([o.blocked for o in outcomes], [True])
+        self.assertEqual(replayer.diverged, 0)
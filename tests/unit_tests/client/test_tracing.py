@@ -0,0 +1,69 @@
+"""Unit tests for trace propagation between the orchestrator and its services."""
+
+import json
+from unittest import IsolatedAsyncioTestCase
+
+import httpx
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from sre_agent.client.utils.http_clients import inject_trace_context
+from sre_agent.shared.tracing import FileSpanExporter, server_span
+
+
+class TestTracePropagation(IsolatedAsyncioTestCase):
+    """Test that downstream spans join the diagnosis trace."""
+
+    def setUp(self) -> None:
+        """Record spans in memory."""
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.tracer = provider.get_tracer(__name__)
+
+    async def test_requests_carry_the_current_trace(self):
+        """A downstream request span is a child of the caller's span."""
+        headers: dict[str, str] = {}
+
+        async def _handler(request: httpx.Request) -> httpx.Response:
+            headers.update(request.headers)
+            with server_span(self.tracer, "POST /check_batch", request.headers):
+                pass
+            return httpx.Response(200)
+
+        client = httpx.AsyncClient(
+            transport=httpx.MockTransport(_handler),
+            event_hooks={"request": [inject_trace_context]},
+        )
+        with self.tracer.start_as_current_span("diagnosis") as parent:
+            await client.post("http://firewall/check_batch")
+
+        server = self.exporter.get_finished_spans()[0]
+        self.assertIn("traceparent", headers)
+        self.assertEqual(server.context.trace_id, parent.get_span_context().trace_id)
+        self.assertEqual(server.parent.span_id, parent.get_span_context().span_id)
+
+    async def test_requests_outside_a_trace_have_no_traceparent(self):
+        """Without a current span nothing is propagated."""
+        request = httpx.Request("POST", "http://llm-server/generate")
+
+        await inject_trace_context(request)
+
+        self.assertNotIn("traceparent", request.headers)
+
+
+def test_file_exporter_writes_a_line_per_span(tmp_path):
+    """Spans are appended as JSON lines for offline analysis."""
+    path = tmp_path / "traces.jsonl"
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(FileSpanExporter(str(path))))
+    tracer = provider.get_tracer(__name__)
+
+    with tracer.start_as_current_span("diagnosis"), tracer.start_span("llm.turn"):
+        pass
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["llm.turn", "diagnosis"]
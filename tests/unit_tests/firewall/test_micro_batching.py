@@ -0,0 +1,109 @@
+"""Unit tests for the micro-batcher in sre_agent/firewall/utils/batching.py."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import IsolatedAsyncioTestCase
+
+from sre_agent.firewall.utils.batching import Histogram, MicroBatcher
+
+
+class RecordingModel:
+    """A fake model which doubles its inputs and records each batch."""
+
+    def __init__(self, fail: bool = False) -> None:
+        """Initialise the record of batches."""
+        self.batches: list[list[int]] = []
+        self.fail = fail
+
+    def __call__(self, items: list[int]) -> list[int]:
+        """Infer a batch."""
+        if self.fail:
+            raise RuntimeError("inference failed")
+        self.batches.append(items)
+        return [item * 2 for item in items]
+
+
+class TestMicroBatcher(IsolatedAsyncioTestCase):
+    """Test that concurrent requests share inference calls."""
+
+    async def _batcher(self, model: RecordingModel, **kwargs: float) -> MicroBatcher:
+        batcher: MicroBatcher[int, int] = MicroBatcher(model, **kwargs)  # type: ignore[arg-type]
+        batcher.start()
+        self.addAsyncCleanup(batcher.close)
+        return batcher
+
+    async def test_concurrent_requests_share_a_batch(self):
+        """Requests within the wait window are inferred together."""
+        model = RecordingModel()
+        batcher = await self._batcher(model, max_batch_size=32, max_wait=0.05)
+
+        results = await asyncio.gather(
+            batcher.submit([1, 2]), batcher.submit([3]), batcher.submit([4, 5])
+        )
+
+        self.assertEqual(results, [[2, 4], [6], [8, 10]])
+        self.assertEqual(model.batches, [[1, 2, 3, 4, 5]])
+        self.assertEqual(batcher.stats()["batch_requests"]["count"], 1)
+
+    async def test_full_batches_do_not_wait(self):
+        """Requests beyond the batch size go to the next batch."""
+        model = RecordingModel()
+        batcher = await self._batcher(model, max_batch_size=2, max_wait=10)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.submit([1, 2]), batcher.submit([3, 4])), 1
+        )
+
+        self.assertEqual(results, [[2, 4], [6, 8]])
+        self.assertEqual(model.batches, [[1, 2], [3, 4]])
+
+    async def test_batches_run_concurrently_up_to_the_limit(self):
+        """With several workers, a batch starts while another is inferred."""
+        lock = threading.Lock()
+        in_flight = []
+
+        def _slow(items: list[int]) -> list[int]:
+            with lock:
+                in_flight.append(1)
+                overlap = len(in_flight)
+            time.sleep(0.05)
+            with lock:
+                in_flight.pop()
+            return [overlap] * len(items)
+
+        batcher: MicroBatcher[int, int] = MicroBatcher(
+            _slow,
+            max_batch_size=1,
+            max_wait=0,
+            executor=ThreadPoolExecutor(max_workers=2),
+            concurrency=2,
+        )
+        batcher.start()
+        self.addAsyncCleanup(batcher.close)
+
+        results = await asyncio.gather(*(batcher.submit([i]) for i in range(3)))
+
+        self.assertEqual(max(r[0] for r in results), 2)
+        self.assertLessEqual(batcher.stats()["inferring"], 2)
+
+    async def test_inference_errors_reach_every_request(self):
+        """A failed batch fails each of its requests."""
+        batcher = await self._batcher(RecordingModel(fail=True), max_wait=0.01)
+
+        results = await asyncio.gather(
+            batcher.submit([1]), batcher.submit([2]), return_exceptions=True
+        )
+
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+
+def test_histogram_buckets_are_cumulative():
+    """Each bucket counts the observations at or below its bound."""
+    histogram = Histogram((1, 4))
+    for value in (1, 2, 8):
+        histogram.observe(value)
+
+    assert histogram.to_dict()["buckets"] == {"1": 1, "4": 2, "+Inf": 3}
+    assert histogram.to_dict()["sum"] == 11  # noqa: PLR2004
@@ -0,0 +1,63 @@
+"""Unit tests for the local model store in sre_agent/firewall/utils/model_store.py."""
+
+from pathlib import Path
+
+import pytest
+
+from sre_agent.firewall.utils import model_store
+from sre_agent.firewall.utils.model_store import (
+    Verification,
+    ensure_model,
+    verify_manifest,
+    write_manifest,
+)
+
+MODEL = "meta-llama/Llama-Prompt-Guard-2-86M"
+
+
+def _save(path: Path) -> None:
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "model.safetensors").write_bytes(b"weights")
+    (path / "tokenizer.json").write_text("{}")
+
+
+def test_manifest_detects_changed_files(tmp_path: Path):
+    """A file changed in place fails the checksum but not the size check."""
+    _save(tmp_path)
+    write_manifest(str(tmp_path), MODEL)
+    assert verify_manifest(str(tmp_path), MODEL)
+
+    (tmp_path / "model.safetensors").write_bytes(b"Weights")
+
+    assert not verify_manifest(str(tmp_path), MODEL, Verification.HASH)
+    assert verify_manifest(str(tmp_path), MODEL, Verification.SIZE)
+
+
+def test_manifest_detects_missing_files_and_other_models(tmp_path: Path):
+    """A copy missing a file, or of another model, is not loaded."""
+    _save(tmp_path)
+    write_manifest(str(tmp_path), MODEL)
+
+    assert not verify_manifest(str(tmp_path), "another/model")
+    (tmp_path / "tokenizer.json").unlink()
+    assert not verify_manifest(str(tmp_path), MODEL)
+
+
+def test_verified_copy_is_used_without_downloading(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    """A restart with a verified copy never contacts the Hub."""
+    monkeypatch.setenv("HF_HOME", str(tmp_path))
+    downloads: list[str] = []
+
+    def _download(model_name: str, path: str) -> None:
+        downloads.append(model_name)
+        _save(Path(path))
+
+    monkeypatch.setattr(model_store, "_download", _download)
+
+    first = ensure_model(MODEL)
+    second = ensure_model(MODEL)
+
+    assert first == second == str(tmp_path / "meta-llama--Llama-Prompt-Guard-2-86M")
+    assert downloads == [MODEL]
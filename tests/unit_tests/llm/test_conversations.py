@@ -0,0 +1,91 @@
+"""Unit tests for stateful conversations in sre_agent/llm/utils/conversations.py."""
+
+from typing import Any
+
+import pytest
+from mcp.types import Tool
+
+from sre_agent.llm.utils.clients import BaseClient
+from sre_agent.llm.utils.conversations import (
+    ConversationStore,
+    UnknownConversationError,
+)
+from sre_agent.shared.schemas import Message, MessageBlock, TextBlock
+
+
+class RecordingClient(BaseClient):
+    """A client recording what it adapts and completes."""
+
+    def __init__(self) -> None:
+        """Initialise the records."""
+        super().__init__()
+        self.adapted: list[int] = []
+        self.completed: list[list[Any]] = []
+        self.fail = False
+
+    def adapt_messages(self, messages: list[MessageBlock]) -> list[Any]:
+        """Record how many messages are adapted."""
+        self.adapted.append(len(messages))
+        return [m.content[0].text for m in messages]  # type: ignore[union-attr]
+
+    def complete(self, messages: list[Any], tools: list[Any]) -> Message:
+        """Record the native messages and return a fixed reply."""
+        if self.fail:
+            raise RuntimeError("provider error")
+        self.completed.append(list(messages))
+        return Message(id="1", model="test", content=[TextBlock(text="ok")])
+
+
+def _message(text: str) -> MessageBlock:
+    return MessageBlock(role="user", content=[TextBlock(text=text)])
+
+
+def test_turns_only_adapt_new_messages():
+    """Each turn adapts only its new messages and completes from the full list."""
+    client = RecordingClient()
+    store = ConversationStore(client)
+    catalog_id = store.register_catalog([Tool(name="list_pods", inputSchema={})])
+    conversation_id = store.create(catalog_id, [_message("prompt")])
+
+    store.generate(conversation_id, [])
+    store.generate(conversation_id, [_message("a"), _message("b")])
+
+    assert client.adapted == [1, 0, 2]
+    assert client.completed[-1] == ["prompt", "a", "b"]
+
+
+def test_catalogs_are_content_addressed():
+    """Registering the same tools twice returns the same catalog."""
+    store = ConversationStore(RecordingClient())
+    tools = [Tool(name="list_pods", inputSchema={})]
+
+    assert store.register_catalog(tools) == store.register_catalog(list(tools))
+    assert store.stats()["catalogs"] == 1
+
+
+def test_failed_turns_are_not_kept():
+    """Messages of a turn which failed are dropped so it can be retried."""
+    client = RecordingClient()
+    store = ConversationStore(client)
+    conversation_id = store.create(store.register_catalog([]), [_message("prompt")])
+
+    client.fail = True
+    with pytest.raises(RuntimeError):
+        store.generate(conversation_id, [_message("a")])
+    client.fail = False
+    store.generate(conversation_id, [_message("a")])
+
+    assert client.completed[-1] == ["prompt", "a"]
+
+
+def test_unknown_and_evicted_conversations_are_rejected():
+    """Conversations beyond the maximum are evicted, oldest first."""
+    store = ConversationStore(RecordingClient(), max_conversations=1)
+    catalog_id = store.register_catalog([])
+    first = store.create(catalog_id, [_message("one")])
+    store.create(catalog_id, [_message("two")])
+
+    with pytest.raises(UnknownConversationError):
+        store.generate(first, [])
+    with pytest.raises(UnknownConversationError):
+        store.create("missing", [])
@@ -0,0 +1,43 @@
+"""Unit tests for the Prometheus metrics of the LLM server."""
+
+import os
+
+from fastapi.testclient import TestClient
+
+from sre_agent.llm.main import app
+from sre_agent.shared.metrics import usage_tokens
+from sre_agent.shared.schemas import Usage
+
+HTTP_OK = 200
+
+
+def test_generate_requests_are_timed_by_provider():
+    """Each generation is observed in the latency histogram of its provider."""
+    os.environ["PROVIDER"] = "mock"
+    with TestClient(app) as client:
+        client.post(
+            "/generate",
+            json={
+                "messages": [
+                    {"role": "user", "content": [{"type": "text", "text": "Hi"}]}
+                ]
+            },
+        )
+        r = client.get("/metrics")
+
+    assert r.status_code == HTTP_OK
+    assert 'llm_server_generate_duration_seconds_count{model="",provider="mock"}' in (
+        r.text
+    )
+
+
+def test_usage_tokens_are_split_by_type():
+    """Missing cache token counts are reported as zero."""
+    usage = Usage(input_tokens=10, output_tokens=5, cache_read_input_tokens=3)
+
+    assert usage_tokens(usage) == {
+        "input": 10,
+        "output": 5,
+        "cache_creation": 0,
+        "cache_read": 3,
+    }
@@ -0,0 +1,114 @@
+"""Unit tests for the mock provider replaying a scenario file."""
+
+import json
+import random
+from pathlib import Path
+
+from sre_agent.llm.utils.clients import DummyClient
+from sre_agent.llm.utils.schemas import LatencyDistribution, LLMSettings
+from sre_agent.shared.schemas import (
+    MessageBlock,
+    TextBlock,
+    TextGenerationPayload,
+    ToolResultBlock,
+    ToolUseBlock,
+)
+
+CACHE_READ_TOKENS = 80
+SCENARIO = {
+    "model": "mock-diagnosis",
+    "turns": [
+        {
+            "tool_uses": [
+                {"name": "list_pods", "arguments": {"namespace": "default"}},
+                {"name": "get_logs"},
+            ],
+            "usage": {
+                "input_tokens": 100,
+                "output_tokens": 10,
+                "cache_read_input_tokens": CACHE_READ_TOKENS,
+            },
+        },
+        {"text": "The pod is crash looping."},
+    ],
+}
+
+
+def _client(tmp_path: Path) -> DummyClient:
+    path = tmp_path / "scenario.json"
+    path.write_text(json.dumps(SCENARIO))
+    return DummyClient(LLMSettings(mock_scenario=str(path)))
+
+
+def _payload(assistant_turns: int) -> TextGenerationPayload:
+    messages = [MessageBlock(role="user", content=[TextBlock(text="Diagnose.")])]
+    for turn in range(assistant_turns):
+        messages += [
+            MessageBlock(
+                role="assistant",
+                content=[ToolUseBlock(id=f"t{turn}", name="list_pods", arguments={})],
+            ),
+            MessageBlock(
+                role="user",
+                content=[
+                    ToolResultBlock(
+                        tool_use_id=f"t{turn}",
+                        name="list_pods",
+                        content="pod-1 Running",
+                        is_error=False,
+                    )
+                ],
+            ),
+        ]
+    return TextGenerationPayload(messages=messages)
+
+
+def test_turns_are_replayed_by_the_number_of_assistant_messages(tmp_path):
+    """Each turn emits its tool calls and usage, then the scenario ends the turn."""
+    client = _client(tmp_path)
+
+    first = client.generate(_payload(0))
+    assert first.stop_reason == "tool_use"
+    assert first.model == "mock-diagnosis"
+    assert [(b.id, b.name) for b in first.content] == [
+        ("toolu_mock_0_0", "list_pods"),
+        ("toolu_mock_0_1", "get_logs"),
+    ]
+    assert first.usage is not None
+    assert first.usage.cache_read_input_tokens == CACHE_READ_TOKENS
+
+    second = client.generate(_payload(1))
+    assert second.stop_reason == "end_turn"
+    assert second.content == [TextBlock(text="The pod is crash looping.")]
+
+    # Past the end of the scenario every turn ends the diagnosis
+    assert client.generate(_payload(5)).stop_reason == "end_turn"
+
+
+def test_without_a_scenario_the_template_response_is_returned():
+    """The mock provider keeps its single end_turn response by default."""
+    response = DummyClient(LLMSettings()).generate(_payload(0))
+
+    assert response.stop_reason == "end_turn"
+    assert response.usage is None
+
+
+def test_settings_are_read_when_the_client_is_created(tmp_path, monkeypatch):
+    """MOCK_SCENARIO set after import is picked up by a default client."""
+    path = tmp_path / "scenario.json"
+    path.write_text(json.dumps(SCENARIO))
+    monkeypatch.setenv("MOCK_SCENARIO", str(path))
+
+    assert DummyClient().scenario is not None
+
+
+def test_latency_distributions_are_bounded():
+    """Draws stay within a uniform range and never go negative."""
+    rng = random.Random(0)
+    low, high = 0.5, 1.5
+    uniform = LatencyDistribution(distribution="uniform", seconds=1.0, spread=0.5)
+    normal = LatencyDistribution(distribution="normal", seconds=0.0, spread=1.0)
+
+    assert all(low <= uniform.sample(rng) <= high for _ in range(100))
+    assert all(normal.sample(rng) >= 0 for _ in range(100))
+    assert LatencyDistribution(seconds=0.2).sample(rng) == 0.2  # noqa: PLR2004